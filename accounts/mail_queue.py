@@ -0,0 +1,154 @@
+# accounts/mail_queue.py
+"""
+Database-backed outbound mail queue.
+
+Views call enqueue_email(), which costs one INSERT and joins the caller's
+transaction, so a rolled back order never sends its confirmation. The
+send_queued_email management command delivers due messages in batches over a
+single backend connection and retries failures with exponential backoff.
+
+Delivery goes through Django's EMAIL_BACKEND, so the locmem or console
+backend can be used in tests and local development.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import BadHeaderError, EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAIL_QUEUE_BATCH_SIZE = getattr(settings, 'MAIL_QUEUE_BATCH_SIZE', 50)
+MAIL_QUEUE_MAX_ATTEMPTS = getattr(settings, 'MAIL_QUEUE_MAX_ATTEMPTS', 5)
+MAIL_QUEUE_RETRY_DELAY = getattr(settings, 'MAIL_QUEUE_RETRY_DELAY', 60)
+MAIL_QUEUE_MAX_RETRY_DELAY = 6 * 60 * 60
+
+# How long a claimed message stays hidden from other workers
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def enqueue_email(subject, body, to, html_body=None, from_email=None):
+    """Queue an email for delivery and return the OutboundEmail row"""
+    if '\n' in subject or '\r' in subject:
+        raise BadHeaderError(f"Header values can't contain newlines (got {subject!r})")
+
+    if isinstance(to, str):
+        to = [to]
+
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body or None,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+
+
+def _retry_delay(attempts):
+    return timedelta(seconds=min(MAIL_QUEUE_RETRY_DELAY * 2 ** (attempts - 1), MAIL_QUEUE_MAX_RETRY_DELAY))
+
+
+def claim_batch(batch_size=MAIL_QUEUE_BATCH_SIZE):
+    """
+    Claim up to batch_size due messages by pushing their next_attempt_at out
+    by CLAIM_LEASE. Messages of a worker that dies mid-batch become due again
+    once the lease runs out.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                status='pending', next_attempt_at__lte=now
+            ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        OutboundEmail.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + CLAIM_LEASE,
+        )
+    return list(OutboundEmail.objects.filter(id__in=ids).order_by('id'))
+
+
+def _build_message(outbound, connection):
+    message = EmailMultiAlternatives(
+        subject=outbound.subject,
+        body=outbound.body,
+        from_email=outbound.from_email,
+        to=outbound.to,
+        connection=connection,
+    )
+    if outbound.html_body:
+        message.attach_alternative(outbound.html_body, 'text/html')
+    return message
+
+
+def _mark_failed(outbound, error):
+    if outbound.attempts >= MAIL_QUEUE_MAX_ATTEMPTS:
+        OutboundEmail.objects.filter(id=outbound.id).update(status='failed', last_error=error)
+        logger.error(f"Giving up on email {outbound.id} after {outbound.attempts} attempts: {error}")
+    else:
+        OutboundEmail.objects.filter(id=outbound.id).update(
+            next_attempt_at=timezone.now() + _retry_delay(outbound.attempts),
+            last_error=error,
+        )
+        logger.warning(f"Email {outbound.id} failed (attempt {outbound.attempts}), will retry: {error}")
+
+
+def send_batch(batch_size=MAIL_QUEUE_BATCH_SIZE):
+    """Deliver one batch of due messages over a single connection. Returns (sent, failed)"""
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+        for outbound in batch:
+            try:
+                _build_message(outbound, connection).send(fail_silently=False)
+            except Exception as e:
+                failed += 1
+                _mark_failed(outbound, str(e))
+                # The SMTP session may be unusable after an error; start a new one
+                connection.close()
+                connection.open()
+                continue
+
+            sent += 1
+            OutboundEmail.objects.filter(id=outbound.id).update(
+                status='sent', sent_at=timezone.now(), last_error=None
+            )
+    except Exception as e:
+        # Could not (re)open the connection; every unsent message goes back with a backoff
+        logger.error(f"Mail connection failed: {str(e)}")
+        for outbound in batch[sent + failed:]:
+            failed += 1
+            _mark_failed(outbound, str(e))
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    return sent, failed
+
+
+def send_queued_email(batch_size=MAIL_QUEUE_BATCH_SIZE, max_batches=None):
+    """Send batches until nothing is due (or max_batches is reached). Returns (sent, failed)"""
+    total_sent = total_failed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        sent, failed = send_batch(batch_size)
+        if not sent and not failed:
+            break
+        total_sent += sent
+        total_failed += failed
+        batches += 1
+    return total_sent, total_failed
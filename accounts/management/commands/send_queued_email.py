@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.mail_queue import MAIL_QUEUE_BATCH_SIZE, send_queued_email
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails (run from cron, or with --loop as a long-running worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=MAIL_QUEUE_BATCH_SIZE, help='Messages per connection')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new messages')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_email(batch_size=options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Sent {sent} email(s), {failed} failed."))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
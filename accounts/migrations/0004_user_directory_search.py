@@ -0,0 +1,72 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+from accounts.directory import user_search_text
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+def backfill_search_text(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    users = CustomUser.objects.only('id', 'full_name', 'first_name', 'last_name', 'email', 'phone').order_by('id')
+    batch = []
+    for user in users.iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        user.search_text = user_search_text(user)
+        batch.append(user)
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            CustomUser.objects.bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        CustomUser.objects.bulk_update(batch, ['search_text'])
+
+
+def create_ngram_index(apps, schema_editor):
+    # Substring matches through the index instead of a LIKE scan (MySQL only).
+    # The ngram parser drops every token that contains a stopword, and the
+    # default InnoDB list has single letters such as 'a' and 'i', so most
+    # bigrams of names would never be indexed. An index takes the stopword
+    # setting in effect when it is built: build it with stopwords off, and do
+    # the same whenever it is rebuilt (OPTIMIZE TABLE, ALTER TABLE ... FORCE).
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('SET SESSION innodb_ft_enable_stopword = OFF')
+        try:
+            schema_editor.execute(
+                'ALTER TABLE users ADD FULLTEXT INDEX users_search_text_ft (search_text) WITH PARSER ngram'
+            )
+        finally:
+            schema_editor.execute('SET SESSION innodb_ft_enable_stopword = ON')
+
+
+def drop_ngram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE users DROP INDEX users_search_text_ft')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_outbound_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=512),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['phone'], name='users_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role_id', 'is_active'], name='users_role_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-date_joined'], name='users_date_joined_idx'),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_ngram_index, drop_ngram_index),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Permis
 from django.db import models
 from django.utils import timezone
 
+from accounts.directory import SEARCH_TEXT_MAX_LENGTH, user_search_text
+
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -53,6 +55,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     last_activity = models.DateTimeField(auto_now=True)
     date_joined = models.DateTimeField(auto_now_add=True)
     user_type = models.CharField(max_length=10, choices=USER_TYPES, default='guest')
+    # Normalized names/email/phone for the admin directory search (accounts.directory)
+    search_text = models.CharField(max_length=SEARCH_TEXT_MAX_LENGTH, blank=True, default='', editable=False)
 
     objects = CustomUserManager()
 
@@ -60,12 +64,27 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['full_name']  # email is already required by USERNAME_FIELD
 
+    # Fields search_text is built from
+    SEARCH_FIELDS = {'full_name', 'first_name', 'last_name', 'email', 'phone'}
+
     class Meta:
         db_table = 'users'
+        indexes = [
+            models.Index(fields=['phone'], name='users_phone_idx'),
+            models.Index(fields=['role_id', 'is_active'], name='users_role_active_idx'),
+            models.Index(fields=['-date_joined'], name='users_date_joined_idx'),
+        ]
 
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        self.search_text = user_search_text(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.SEARCH_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'search_text'}
+        super().save(*args, **kwargs)
+
     def get_full_name(self):
         return self.full_name or f"{self.first_name or ''} {self.last_name or ''}".strip()
 
@@ -254,4 +273,38 @@ class UserProfile(models.Model):
         if not self.pincode:
             missing.append("Pincode")
         
-        return missing
\ No newline at end of file
+        return missing
+
+class OutboundEmail(models.Model):
+    """Queued outgoing email, delivered by the send_queued_email command (see accounts.mail_queue)"""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(null=True, blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    # Due time while pending; also the claim lease while a worker is sending
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'outbound_emails'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
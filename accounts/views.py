@@ -13,6 +13,7 @@ from django.contrib.auth import logout as auth_logout
 from store.models import *
 from django.conf import settings
 from django.core.mail import send_mail
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.views.decorators.csrf import csrf_protect
@@ -22,12 +23,13 @@ from django.views.decorators.debug import sensitive_post_parameters
 import time
 import uuid
 import logging
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.urls import reverse
 logger = logging.getLogger(__name__)
 from rose_and_roots.encryption import enc, dec
+from accounts.mail_queue import enqueue_email
+from masters.catalog import attach_listings, get_active_occasions, get_category_summary, get_featured_bouquets
 
 # accounts/views.py
 
@@ -140,31 +142,16 @@ def login_view(request):
                     # ========== SET NEW SESSION FLAGS FOR AUTH FLOW ==========
                     request.session['auth_flow_completed'] = True
                     request.session['role_id'] = user.role_id
-                    request.session['logout_completed'] = False
-                    
-                    # Set expected next URL based on role
-                    if user.role_id == 1:  # Admin
-                        request.session['expected_next_url'] = '/admin-dashboard/'
-                    elif user.role_id == 2:  # Customer
-                        request.session['expected_next_url'] = '/dashboard/'
-                    
-                    # Clear any previous navigation flags
-                    if 'expected_next_url' in request.session:
-                        # Already set above
-                        pass
                     
                     # ========== SESSION SECURITY SETUP ==========
-                    import time
-                    import uuid
-                    
-                    # Set session markers for security tracking
-                    request.session['session_created_at'] = time.time()
-                    request.session['session_id'] = str(uuid.uuid4())
-                    request.session['ip_address'] = request.META.get('REMOTE_ADDR')
-                    request.session['user_agent'] = request.META.get('HTTP_USER_AGENT', 'Unknown')[:255]
-                    request.session['login_timestamp'] = time.time()
-                    request.session['login_email'] = user.email
-                    request.session['session_validated'] = True
+                    # Session markers for security tracking. Kept compact: the session is
+                    # cached and stored on every change, and the user/email already
+                    # come from _auth_user_id.
+                    request.session['session_created_at'] = int(time.time())
+                    request.session['login_meta'] = {
+                        'ip': request.META.get('REMOTE_ADDR'),
+                        'ua': request.META.get('HTTP_USER_AGENT', 'Unknown')[:120],
+                    }
                     
                     # Handle remember me
                     if not remember_me:
@@ -456,53 +443,19 @@ def register_view(request):
 def home(request):
     """Homepage view"""
     try:
-        # Get featured bouquets
-        featured_bouquets = Bouquet.objects.filter(
-            is_active=1, 
-            is_featured=1
-        ).prefetch_related('images', 'occasions')[:8]
-        
-        # Add encrypted IDs and primary images
-        bouquet_list = []
-        for bouquet in featured_bouquets:
-            bouquet.encrypted_id = enc(str(bouquet.id))
-            primary_image = bouquet.images.filter(is_active=1).first()
-            bouquet.primary_image = primary_image.image_path if primary_image else None
-            bouquet.occasion_names = [occ.name for occ in bouquet.occasions.all()]
-            bouquet.category_name = bouquet.category.parameter_value if bouquet.category else 'Uncategorized'
-            bouquet_list.append(bouquet)
+        # Get featured bouquets (encrypted IDs and primary images from the listing projection)
+        bouquet_list = get_featured_bouquets(8)
         
         # Get categories with counts
-        categories = parameter_master.objects.filter(
-            parameter_name='Product Categories',
-            isactive=1
-        ).order_by('parameter_value')
-        
-        category_list = []
-        for category in categories:
-            category.encrypted_id = enc(str(category.parameter_id))
-            category.bouquet_count = Bouquet.objects.filter(
-                category_id=category.parameter_id, 
-                is_active=1
-            ).count()
-            category_list.append(category)
+        category_list = get_category_summary()
         
         # Get occasions
-        occasions = Occasion.objects.filter(is_active=1).order_by('name')
-        occasion_list = []
-        for occasion in occasions:
-            occasion.encrypted_id = enc(str(occasion.id))
-            occasion_list.append(occasion)
-        
-        # Get admin WhatsApp
-        admin_user = CustomUser.objects.filter(role_id=1, is_active=True).first()
-        admin_whatsapp = admin_user.phone if admin_user else '918805433102'
+        occasion_list = get_active_occasions()
         
         context = {
             'bouquets': bouquet_list,
             'categories': category_list,
             'occasions': occasion_list,
-            'admin_whatsapp': admin_whatsapp,
             'MEDIA_URL': settings.MEDIA_URL,
         }
         
@@ -515,12 +468,11 @@ def home(request):
             'bouquets': [],
             'categories': [],
             'occasions': [],
-            'admin_whatsapp': '918805433102',
             'MEDIA_URL': settings.MEDIA_URL,
         })
 
 def send_order_confirmation_email(order, order_items, encrypted_order_id):
-    """Send order confirmation email to customer with HTML template"""
+    """Queue the order confirmation email (HTML + plain text) for the customer"""
     try:
         subject = f'Order Confirmation - #{order.order_number}'
         
@@ -539,21 +491,17 @@ def send_order_confirmation_email(order, order_items, encrypted_order_id):
         # Create plain text version from HTML
         text_content = strip_tags(html_content)
         
-        # Create email with both HTML and plain text versions
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,  # plain text version
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[order.email],
-        )
-        
-        # Attach HTML version
-        email.attach_alternative(html_content, "text/html")
-        
-        # Send email
-        email.send(fail_silently=False)
+        # Queue with both HTML and plain text versions; send_queued_email delivers it.
+        # The savepoint keeps a failed INSERT from rolling back the caller's order.
+        with transaction.atomic():
+            enqueue_email(
+                subject=subject,
+                body=text_content,  # plain text version
+                html_body=html_content,
+                to=[order.email],
+            )
         
-        logger.info(f"Order confirmation email sent for order #{order.order_number}")
+        logger.info(f"Order confirmation email queued for order #{order.order_number}")
         
     except Exception as e:
-        logger.warning(f"Failed to send confirmation email for order #{order.order_number}: {e}")
\ No newline at end of file
+        logger.warning(f"Failed to queue confirmation email for order #{order.order_number}: {e}")
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""
+Shop search autocomplete: lookup latency of the in-memory trie
+(store.search.AutocompleteIndex) over a synthetic catalog, compared with a
+linear scan of the same names, plus the rebuild cost.
+
+No database is needed; suggestions are generated in process.
+
+    python benchmarks/bench_autocomplete.py [--products 20000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rose_and_roots.settings')
+
+import django
+
+django.setup()
+
+from store import search
+
+WORDS = (
+    'red', 'white', 'pink', 'yellow', 'rose', 'roses', 'lily', 'tulip', 'orchid', 'sunflower',
+    'carnation', 'peony', 'daisy', 'bouquet', 'basket', 'box', 'deluxe', 'classic', 'garden',
+    'spring', 'romance', 'birthday', 'anniversary', 'mixed', 'premium', 'mini', 'grand',
+)
+PREFIXES = ('r', 'ro', 'ros', 'bou', 'pe', 'sunf', 'anniv', 'premium b', 'x', 'gard')
+
+
+def synthetic_suggestions(products, seed=7):
+    rng = random.Random(seed)
+    suggestions = []
+    for number in range(products):
+        label = ' '.join(rng.choice(WORDS).title() for _ in range(rng.randint(2, 4)))
+        suggestions.append({'label': f"{label} {number}", 'type': 'product', 'url': f"/product/?id={number}"})
+    return suggestions
+
+
+def linear_suggest(suggestions, prefix, limit=search.AUTOCOMPLETE_LIMIT):
+    key = prefix.lower()
+    found = []
+    for suggestion in suggestions:
+        label = suggestion['label'].lower()
+        if label.startswith(key) or f" {key}" in label:
+            found.append(suggestion)
+            if len(found) == limit:
+                break
+    return found
+
+
+def per_lookup_us(fn, repeat, number=200):
+    best = min(timeit.repeat(lambda: [fn(prefix) for prefix in PREFIXES], number=number, repeat=repeat))
+    return best / (number * len(PREFIXES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    suggestions = synthetic_suggestions(args.products)
+    index = search.AutocompleteIndex()
+
+    with mock.patch.object(index, '_load_suggestions', return_value=suggestions), \
+            mock.patch.object(search.cache, 'get', return_value=None):
+        rebuild_ms = min(timeit.repeat(index.rebuild, number=1, repeat=args.repeat)) * 1e3
+        trie_us = per_lookup_us(index.suggest, args.repeat)
+
+    scan_us = per_lookup_us(lambda prefix: linear_suggest(suggestions, prefix), args.repeat, number=5)
+
+    print(f"{args.products} products, best of {args.repeat}")
+    print(f"  {'trie lookup':<22} {trie_us:10.2f} us/lookup")
+    print(f"  {'linear scan':<22} {scan_us:10.2f} us/lookup")
+    print(f"  {'trie rebuild':<22} {rebuild_ms:10.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
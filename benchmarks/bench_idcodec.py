@@ -0,0 +1,79 @@
+"""
+Per-ID cost of the opaque-ID codec (rose_and_roots.encryption) compared with
+the previous implementation, which built a Fernet object on every call.
+
+    python benchmarks/bench_idcodec.py [--ids 2000] [--repeat 5]
+"""
+import argparse
+import base64
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rose_and_roots.settings')
+
+from cryptography.fernet import Fernet
+from django.conf import settings
+
+from rose_and_roots import encryption
+
+
+def legacy_enc(parameter):
+    cipher_suite = Fernet(settings.ENCRYPTION_KEY.encode())
+    cipher_text = cipher_suite.encrypt(parameter.encode())
+    return base64.urlsafe_b64encode(cipher_text).decode()
+
+
+def legacy_dec(encoded_cipher_text):
+    cipher_text = base64.urlsafe_b64decode(encoded_cipher_text.encode())
+    cipher_suite = Fernet(settings.ENCRYPTION_KEY.encode())
+    return cipher_suite.decrypt(cipher_text).decode()
+
+
+def per_id_us(fn, values, repeat):
+    best = min(timeit.repeat(lambda: [fn(v) for v in values], number=1, repeat=repeat))
+    return best / len(values) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ids', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    ids = [str(i) for i in range(1, args.ids + 1)]
+    legacy_tokens = [legacy_enc(i) for i in ids]
+    tokens = [encryption.enc(i) for i in ids]
+
+    def enc_uncached(value):
+        encryption.enc.cache_clear()
+        return encryption.enc(value)
+
+    def dec_uncached(value):
+        encryption.dec.cache_clear()
+        return encryption.dec(value)
+
+    # Warm the caches the way a page re-render would
+    for token in tokens:
+        encryption.dec(token)
+
+    rows = [
+        ('legacy enc (Fernet per call)', per_id_us(legacy_enc, ids, args.repeat)),
+        ('legacy dec (Fernet per call)', per_id_us(legacy_dec, legacy_tokens, args.repeat)),
+        ('enc, cache miss', per_id_us(enc_uncached, ids, args.repeat)),
+        ('enc, cache hit', per_id_us(encryption.enc, ids, args.repeat)),
+        ('dec, cache miss', per_id_us(dec_uncached, tokens, args.repeat)),
+        ('dec, cache hit', per_id_us(encryption.dec, tokens, args.repeat)),
+        ('dec of legacy token, cache miss', per_id_us(dec_uncached, legacy_tokens, args.repeat)),
+    ]
+
+    print(f"{args.ids} IDs, best of {args.repeat}")
+    for label, cost in rows:
+        print(f"  {label:<34} {cost:8.2f} us/id")
+    print(f"  token length: legacy {len(legacy_tokens[0])} chars, now {len(tokens[0])} chars")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Admin order search on a seeded orders table: the previous five-column
+icontains filter compared with store.order_search for the query shapes
+support staff use (order number, phone, email, name), plus the status and
+customer listings the composite indexes serve. Each row reports the best
+time to count the matches and fetch the first page.
+
+Runs against a throwaway test database (seeding 1M orders takes a few
+minutes; use --orders for a quicker run).
+
+    python benchmarks/bench_order_search.py [--orders 1000000] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rose_and_roots.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from store.models import Order
+from store.order_search import search_orders
+
+FIRST_NAMES = ('Aarav', 'Diya', 'Ishaan', 'Meera', 'Rohan', 'Ananya', 'Kabir', 'Saanvi', 'Vihaan', 'Priya')
+LAST_NAMES = ('Sharma', 'Patel', 'Iyer', 'Reddy', 'Gupta', 'Nair', 'Singh', 'Mehta', 'Das', 'Kapoor')
+STATUSES = [status for status, _ in Order.ORDER_STATUS]
+ORDERS_PER_DAY = 9000
+PAGE_SIZE = 15
+
+
+def seed(total, batch_size=5000, seed=11):
+    rng = random.Random(seed)
+    users = CustomUser.objects.bulk_create(
+        CustomUser(email=f"customer{n}@example.com", full_name=f"Customer {n}") for n in range(1000)
+    )
+    today = timezone.now()
+    # Keep the generated order dates (auto_now_add would stamp them all "now")
+    order_date = Order._meta.get_field('order_date')
+    order_date.auto_now_add = False
+    batch = []
+    for number in range(total):
+        day = today - timedelta(days=number // ORDERS_PER_DAY)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        batch.append(Order(
+            user=rng.choice(users),
+            order_number=f"ORD-{day:%Y%m%d}-{1000 + number % ORDERS_PER_DAY}",
+            order_date=day,
+            email=f"{first}.{last}{number}@example.com".lower(),
+            phone=f"9{number:09d}",
+            first_name=first,
+            last_name=last,
+            address_line1='1 Flower Street',
+            city='Pune',
+            state='MH',
+            pincode='411001',
+            subtotal=Decimal('499.00'),
+            total=Decimal('549.00'),
+            status=rng.choice(STATUSES),
+        ))
+        if len(batch) == batch_size:
+            Order.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Order.objects.bulk_create(batch)
+    order_date.auto_now_add = True
+    return users
+
+
+def legacy_search(orders, search):
+    return orders.filter(
+        Q(order_number__icontains=search) |
+        Q(first_name__icontains=search) |
+        Q(last_name__icontains=search) |
+        Q(email__icontains=search) |
+        Q(phone__icontains=search)
+    )
+
+
+def best_ms(build, repeat):
+    def run():
+        orders = build().order_by('-order_date')
+        orders.count()
+        list(orders[:PAGE_SIZE])
+    return min(timeit.repeat(run, number=1, repeat=repeat)) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        users = seed(args.orders)
+        sample = Order.objects.order_by('id')[args.orders // 2]
+        queries = [
+            ('order number', sample.order_number),
+            ('phone', sample.phone),
+            ('email', sample.email.upper()),
+            ('name', f"{sample.first_name[:3]} {sample.last_name}"),
+        ]
+
+        print(f"{args.orders} orders, best of {args.repeat}, count + first page")
+        for label, query in queries:
+            legacy = best_ms(lambda: legacy_search(Order.objects.all(), query), args.repeat)
+            indexed = best_ms(lambda: search_orders(Order.objects.all(), query), args.repeat)
+            print(f"  {label:<14} icontains {legacy:9.1f} ms   indexed {indexed:9.1f} ms   ({query})")
+
+        status_ms = best_ms(lambda: Order.objects.filter(status='pending'), args.repeat)
+        customer_ms = best_ms(lambda: Order.objects.filter(user=users[0]), args.repeat)
+        print(f"  {'status list':<14} {status_ms:9.1f} ms")
+        print(f"  {'customer list':<14} {customer_ms:9.1f} ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
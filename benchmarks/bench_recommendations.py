@@ -0,0 +1,104 @@
+"""
+Recommendation build: time of masters.recommendations.compute_recommendations
+(vectorized NumPy co-occurrence) over a synthetic 50k-order history, compared
+with counting the same pairs with Python dicts.
+
+No database is needed; the signals are generated in process with the shape
+load_signals() returns.
+
+    python benchmarks/bench_recommendations.py [--orders 50000] [--bouquets 2000] [--repeat 3]
+"""
+import argparse
+import itertools
+import os
+import sys
+import timeit
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rose_and_roots.settings')
+
+import django
+
+django.setup()
+
+import numpy as np
+
+from masters.recommendations import RECOMMENDATIONS_PER_BOUQUET, SIGNAL_WEIGHTS, compute_recommendations
+
+OCCASIONS = 25
+OCCASIONS_PER_BOUQUET = 3
+CUSTOMERS_PER_ORDER = 0.4
+VIEWS_PER_CUSTOMER = 20
+
+
+def synthetic_signals(orders, bouquets, seed=5):
+    """(baskets, items) per signal; popularity is skewed like a real catalog"""
+    rng = np.random.default_rng(seed)
+    popularity = 1 / np.arange(1, bouquets + 1) ** 0.8
+    popularity /= popularity.sum()
+
+    occasion_items = np.repeat(np.arange(bouquets), OCCASIONS_PER_BOUQUET)
+    occasion_baskets = rng.integers(0, OCCASIONS, len(occasion_items))
+
+    sizes = rng.integers(1, 5, orders)
+    purchase_baskets = np.repeat(np.arange(orders), sizes)
+    purchase_items = rng.choice(bouquets, len(purchase_baskets), p=popularity)
+
+    customers = int(orders * CUSTOMERS_PER_ORDER)
+    view_baskets = np.repeat(np.arange(customers), VIEWS_PER_CUSTOMER)
+    view_items = rng.choice(bouquets, len(view_baskets), p=popularity)
+
+    return {
+        'occasion': (occasion_baskets, occasion_items),
+        'view': (view_baskets, view_items),
+        'purchase': (purchase_baskets, purchase_items),
+    }
+
+
+def python_recommendations(signals, limit):
+    """The same scores with dicts and itertools, for comparison"""
+    related = Counter()
+    for name, (baskets, items) in signals.items():
+        members = {}
+        for basket, item in zip(baskets.tolist(), items.tolist()):
+            members.setdefault(basket, set()).add(item)
+        frequency = Counter(item for basket_items in members.values() for item in basket_items)
+        for basket_items in members.values():
+            for a, b in itertools.permutations(basket_items, 2):
+                related[a, b] += SIGNAL_WEIGHTS[name] / (frequency[a] * frequency[b]) ** 0.5
+
+    neighbours = {}
+    for (a, b), score in related.items():
+        neighbours.setdefault(a, []).append((-score, b))
+    return {a: sorted(scores)[:limit] for a, scores in neighbours.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--bouquets', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    signals = synthetic_signals(args.orders, args.bouquets)
+    bouquet_ids = np.arange(1, args.bouquets + 1, dtype=np.int64)
+
+    numpy_s = min(timeit.repeat(
+        lambda: compute_recommendations(bouquet_ids, signals, RECOMMENDATIONS_PER_BOUQUET),
+        number=1, repeat=args.repeat,
+    ))
+    python_s = min(timeit.repeat(
+        lambda: python_recommendations(signals, RECOMMENDATIONS_PER_BOUQUET), number=1, repeat=1,
+    ))
+    related = compute_recommendations(bouquet_ids, signals)['related']
+
+    print(f"{args.orders} orders, {args.bouquets} bouquets, best of {args.repeat}")
+    print(f"  {'numpy build':<16} {numpy_s * 1e3:10.1f} ms")
+    print(f"  {'python dicts':<16} {python_s * 1e3:10.1f} ms")
+    print(f"  {'rows (related)':<16} {len(related[0]):10d}")
+
+
+if __name__ == '__main__':
+    main()
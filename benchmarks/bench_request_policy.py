@@ -0,0 +1,72 @@
+"""
+Per-request overhead of the project's own middleware (everything in
+settings.MIDDLEWARE outside django.*) for a static file, a public page and an
+authenticated page. The view is a stub, so the numbers are middleware cost only.
+
+    python benchmarks/bench_request_policy.py [--requests 20000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rose_and_roots.settings')
+
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+
+
+def build_chain(paths):
+    handler = lambda request: HttpResponse('ok')
+    for path in reversed(paths):
+        handler = import_string(path)(handler)
+    return handler
+
+
+def make_request(factory, path, user):
+    request = factory.get(path, HTTP_HOST='localhost:8000', HTTP_REFERER='http://localhost:8000/')
+    request.user = user
+    request.session = SessionStore()
+    if user.is_authenticated:
+        request.session['_auth_user_id'] = '1'
+    return request
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    paths = [path for path in settings.MIDDLEWARE if not path.startswith('django.')]
+    chain = build_chain(paths)
+    factory = RequestFactory()
+    customer = SimpleNamespace(is_authenticated=True, pk=1, email='bench@example.com')
+
+    cases = [
+        ('static file', '/static/css/style.css', AnonymousUser()),
+        ('public page, anonymous', '/shop/', AnonymousUser()),
+        ('authenticated page', '/dashboard/orders/', customer),
+    ]
+
+    print(f"middleware: {', '.join(paths)}")
+    print(f"{args.requests} requests, best of {args.repeat}")
+    for label, path, user in cases:
+        requests = [make_request(factory, path, user) for _ in range(args.requests)]
+        best = min(timeit.repeat(lambda: [chain(request) for request in requests], number=1, repeat=args.repeat))
+        print(f"  {label:<24} {best / args.requests * 1e6:8.2f} us/request")
+
+
+if __name__ == '__main__':
+    main()
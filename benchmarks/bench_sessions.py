@@ -0,0 +1,87 @@
+"""
+Session database writes per 1,000 requests of one logged-in user, with the
+stock database engine and with rose_and_roots.session_store. Each simulated
+request loads the session, reads the flags the middleware reads and saves it
+the way SessionMiddleware does with SESSION_SAVE_EVERY_REQUEST; every 50th
+request also changes the data (cart redirect flag, form data, ...).
+
+Runs against a throwaway test database.
+
+    python benchmarks/bench_sessions.py [--requests 1000] [--interval 2]
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rose_and_roots.settings')
+
+import django
+
+django.setup()
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils.module_loading import import_string
+
+from rose_and_roots import session_store
+
+
+def simulate(engine, requests, interval, change_every):
+    SessionStore = import_string(f"{engine}.SessionStore")
+    clock = SimpleNamespace(now=1_000_000.0)
+    fake_time = SimpleNamespace(time=lambda: clock.now)
+
+    with mock.patch.object(session_store, 'time', fake_time):
+        session = SessionStore()
+        session['_auth_user_id'] = '1'
+        session['session_created_at'] = int(clock.now)
+        session['role_id'] = 2
+        session.save(must_create=True)
+        session_key = session.session_key
+
+        writes = reads = 0
+        for number in range(1, requests + 1):
+            clock.now += interval
+            with CaptureQueriesContext(connection) as queries:
+                session = SessionStore(session_key)
+                session.get('logout_completed', False)
+                session.get('session_created_at')
+                if number % change_every == 0:
+                    session['form_data'] = {'request': number}
+                session.save()
+            for query in queries.captured_queries:
+                sql = query['sql'].lstrip().upper()
+                if sql.startswith(('UPDATE', 'INSERT')):
+                    writes += 1
+                elif sql.startswith('SELECT'):
+                    reads += 1
+    return writes, reads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--interval', type=float, default=2, help='Seconds between requests')
+    parser.add_argument('--change-every', type=int, default=50, help='Every Nth request changes the session')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        print(f"{args.requests} requests, one every {args.interval:g}s, data changes every {args.change_every}")
+        for engine in ('django.contrib.sessions.backends.db', 'rose_and_roots.session_store'):
+            cache.clear()
+            writes, reads = simulate(engine, args.requests, args.interval, args.change_every)
+            print(f"  {engine:<40} {writes:5d} writes {reads:5d} reads")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+if __name__ == '__main__':
+    main()
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MastersConfig(AppConfig):
     name = 'masters'
+
+    def ready(self):
+        from masters import signals  # noqa: F401
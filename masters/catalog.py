@@ -0,0 +1,254 @@
+# masters/catalog.py
+"""
+Catalog listing projection.
+
+Every bouquet has one ``bouquet_listing`` row holding what the listing pages
+need (primary image, active images, occasion names, category name, effective
+price). The masters CRUD views refresh it on write, so the shop grid, home page
+and dashboards render a page of bouquets in a fixed number of queries.
+
+The bouquet's ``bouquet_search`` row (the text store/search.py matches) is
+built from the same data and refreshed along with it.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Q
+
+from masters.models import (
+    Bouquet, BouquetImage, BouquetOccasion, BouquetListing, BouquetRecommendation, BouquetSearchDocument, Occasion,
+    parameter_master,
+)
+from rose_and_roots.caching import BOUQUET, OCCASION, PARAMETER, RECOMMENDATION, cached
+from rose_and_roots.encryption import enc
+
+logger = logging.getLogger(__name__)
+
+# Related and bought-together bouquets shown on a product page
+PRODUCT_PAGE_RECOMMENDATIONS = 4
+
+
+def get_effective_price(bouquet):
+    """Price the customer actually pays"""
+    return bouquet.discount_price if bouquet.discount_price else bouquet.price
+
+
+def search_document_fields(bouquet, occasion_names, category_name):
+    """Name, body and tags columns of a bouquet's bouquet_search row"""
+    return {
+        'name': bouquet.name or '',
+        'body': ' '.join(filter(None, [bouquet.short_description, bouquet.description])),
+        'tags': ' '.join(occasion_names + ([category_name] if category_name else [])),
+    }
+
+
+def refresh_listings(bouquet_ids=None):
+    """
+    Rebuild listing rows for the given bouquet IDs (all bouquets when None).
+    Runs a fixed number of queries no matter how many bouquets are refreshed.
+    """
+    bouquets = Bouquet.objects.select_related('category')
+    if bouquet_ids is not None:
+        bouquet_ids = [int(bouquet_id) for bouquet_id in bouquet_ids if bouquet_id is not None]
+        if not bouquet_ids:
+            return {}
+        bouquets = bouquets.filter(id__in=bouquet_ids)
+
+    bouquets = list(bouquets)
+    ids = [bouquet.id for bouquet in bouquets]
+
+    # Active images in upload order - the first one is the primary image
+    images = {}
+    primary_widths = {}
+    image_rows = BouquetImage.objects.filter(
+        bouquet_id__in=ids,
+        is_active=1
+    ).order_by('id').values_list('bouquet_id', 'image_path', 'variant_widths')
+    for bouquet_id, image_path, variant_widths in image_rows:
+        if bouquet_id not in images:
+            primary_widths[bouquet_id] = variant_widths or []
+        images.setdefault(bouquet_id, []).append(image_path)
+
+    # Occasion names in the order they were attached
+    occasions = {}
+    occasion_rows = BouquetOccasion.objects.filter(
+        bouquet_id__in=ids,
+        occasion__isnull=False
+    ).order_by('id').values_list('bouquet_id', 'occasion__name')
+    for bouquet_id, occasion_name in occasion_rows:
+        occasions.setdefault(bouquet_id, []).append(occasion_name)
+
+    listings = {}
+    documents = []
+    for bouquet in bouquets:
+        image_paths = images.get(bouquet.id, [])
+        listings[bouquet.id] = BouquetListing(
+            bouquet_id=bouquet.id,
+            primary_image=image_paths[0] if image_paths else None,
+            primary_image_widths=primary_widths.get(bouquet.id, []),
+            image_paths=image_paths,
+            occasion_names=occasions.get(bouquet.id, []),
+            category_name=bouquet.category.parameter_value if bouquet.category else None,
+            effective_price=get_effective_price(bouquet),
+        )
+        category_name = listings[bouquet.id].category_name
+        documents.append(BouquetSearchDocument(
+            bouquet_id=bouquet.id,
+            **search_document_fields(bouquet, occasions.get(bouquet.id, []), category_name),
+        ))
+
+    with transaction.atomic():
+        for model in (BouquetListing, BouquetSearchDocument):
+            stale = model.objects.all()
+            if bouquet_ids is not None:
+                stale = stale.filter(bouquet_id__in=bouquet_ids)
+            stale.delete()
+        BouquetListing.objects.bulk_create(listings.values())
+        BouquetSearchDocument.objects.bulk_create(documents)
+
+    logger.debug(f"Refreshed {len(listings)} catalog listing row(s)")
+    return listings
+
+
+def refresh_listing(bouquet_id):
+    """Rebuild the listing row of a single bouquet"""
+    return refresh_listings([bouquet_id]).get(int(bouquet_id))
+
+
+def refresh_listings_for_occasion(occasion_id):
+    """Rebuild listings of every bouquet tagged with an occasion (e.g. after a rename)"""
+    bouquet_ids = BouquetOccasion.objects.filter(
+        occasion_id=occasion_id,
+        bouquet__isnull=False
+    ).values_list('bouquet_id', flat=True)
+    return refresh_listings(list(bouquet_ids))
+
+
+def attach_listings(bouquets, default_category='Uncategorized'):
+    """
+    Decorate bouquets with the attributes the listing templates use
+    (encrypted_id, primary_image, primary_image_widths, all_images,
+    occasion_names, category_name). category_name is default_category for
+    bouquets without a category.
+
+    Reads every listing row in one query; rows that are missing (e.g. bouquets
+    created before the projection existed) are built on the fly.
+    """
+    bouquet_list = list(bouquets)
+    if not bouquet_list:
+        return bouquet_list
+
+    ids = [bouquet.id for bouquet in bouquet_list]
+    listings = BouquetListing.objects.in_bulk(ids)
+
+    missing = [bouquet_id for bouquet_id in ids if bouquet_id not in listings]
+    if missing:
+        listings.update(refresh_listings(missing))
+
+    for bouquet in bouquet_list:
+        listing = listings.get(bouquet.id)
+        bouquet.encrypted_id = enc(str(bouquet.id))
+        bouquet.primary_image = listing.primary_image if listing else None
+        bouquet.primary_image_widths = listing.primary_image_widths if listing else []
+        bouquet.all_images = listing.image_paths if listing else []
+        bouquet.occasion_names = listing.occasion_names if listing else []
+        bouquet.category_name = (listing.category_name if listing else None) or default_category
+
+    return bouquet_list
+
+
+def get_category_summary():
+    """
+    Active product categories ordered by name, each with ``encrypted_id`` and
+    ``bouquet_count`` (active bouquets). Built with one grouped query and
+    cached until a bouquet or a category changes.
+    """
+    def build():
+        categories = list(
+            parameter_master.objects.filter(
+                parameter_name='Product Categories',
+                isactive=1
+            ).annotate(
+                bouquet_count=Count('bouquets', filter=Q(bouquets__is_active=1))
+            ).order_by('parameter_value')
+        )
+        for category in categories:
+            category.encrypted_id = enc(str(category.parameter_id))
+        return categories
+
+    return cached((BOUQUET, PARAMETER), 'catalog:category_summary', build)
+
+
+# ---------------- CACHED STOREFRONT READS ---------------- #
+
+def get_active_occasions():
+    """Active occasions ordered by name, each with ``encrypted_id``"""
+    def build():
+        occasions = list(Occasion.objects.filter(is_active=1).order_by('name'))
+        for occasion in occasions:
+            occasion.encrypted_id = enc(str(occasion.id))
+        return occasions
+
+    return cached((OCCASION,), 'catalog:occasions', build)
+
+
+def get_featured_bouquets(limit):
+    """First ``limit`` active featured bouquets, decorated for listing templates"""
+    def build():
+        return attach_listings(Bouquet.objects.filter(is_active=1, is_featured=1)[:limit])
+
+    return cached((BOUQUET,), f"catalog:featured:{limit}", build)
+
+
+def get_product_page(bouquet_id):
+    """
+    Catalog data of the product page: the bouquet (with occasions), its
+    active images, up to four related bouquets and up to four frequently
+    bought together with it. Both lists come from the precomputed
+    recommendations (masters/recommendations.py); until the bouquet has any,
+    related bouquets are those sharing an occasion.
+    Returns None for unknown or inactive bouquets.
+    """
+    def build():
+        bouquet = Bouquet.objects.filter(
+            id=bouquet_id,
+            is_active=1
+        ).prefetch_related('occasions').first()
+        if not bouquet:
+            return {'bouquet': None}
+
+        images = list(bouquet.images.filter(is_active=1).order_by('id'))
+
+        # Both kinds in rank order from the (bouquet, kind, rank) index
+        recommended = {BouquetRecommendation.RELATED: [], BouquetRecommendation.BOUGHT_TOGETHER: []}
+        recommendations = BouquetRecommendation.objects.filter(
+            bouquet_id=bouquet.id,
+            recommended__is_active=1
+        ).select_related('recommended').order_by('kind', 'rank')
+        for recommendation in recommendations:
+            neighbours = recommended[recommendation.kind]
+            if len(neighbours) < PRODUCT_PAGE_RECOMMENDATIONS:
+                neighbours.append(recommendation.recommended)
+
+        related_bouquets = recommended[BouquetRecommendation.RELATED]
+        if not related_bouquets:
+            # Related products (same occasions) - subquery instead of a DISTINCT join
+            occasion_ids = [occasion.id for occasion in bouquet.occasions.all()]
+            related_bouquets = list(Bouquet.objects.filter(
+                is_active=1,
+                id__in=BouquetOccasion.objects.filter(
+                    occasion_id__in=occasion_ids
+                ).values('bouquet_id')
+            ).exclude(id=bouquet.id)[:PRODUCT_PAGE_RECOMMENDATIONS])
+        bought_together = recommended[BouquetRecommendation.BOUGHT_TOGETHER]
+        attach_listings(related_bouquets + bought_together)
+
+        return {
+            'bouquet': bouquet,
+            'images': images,
+            'related_bouquets': related_bouquets,
+            'bought_together': bought_together,
+        }
+
+    page = cached((BOUQUET, OCCASION, RECOMMENDATION), f"catalog:product:{int(bouquet_id)}", build)
+    return page if page['bouquet'] else None
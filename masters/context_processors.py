@@ -0,0 +1,10 @@
+from masters.site_settings import get_site_settings
+
+
+def site_settings(request):
+    """Expose site-wide settings (e.g. admin_whatsapp) to every template"""
+    values = get_site_settings()
+    return {
+        'site_settings': values,
+        'admin_whatsapp': values.get('admin_whatsapp'),
+    }
@@ -0,0 +1,210 @@
+# masters/image_resize.py
+"""
+On-the-fly resized media, for images without precomputed derivatives (bouquet
+images build_image_variants has not rendered yet, profile images):
+
+    /media/resize/480x480/bouquets/12/ab34.png
+
+The image is fitted inside the box (never upscaled), recompressed as WebP or
+JPEG, and stored in IMAGE_RESIZE_CACHE_DIR under a key derived from the
+source's path, size and mtime and the requested box and format, so a replaced
+source gets a new key and every cached file is immutable. Only the boxes in
+IMAGE_RESIZE_SIZES are rendered, and the cache is kept under
+IMAGE_RESIZE_CACHE_MAX_BYTES by evicting the least recently used files.
+
+Concurrent requests for the same missing variant render it once: renders are
+serialized per key with a lock file (flock, shared by every worker process on
+the host) and the cache is checked again once the lock is held.
+"""
+import hashlib
+import logging
+import os
+import posixpath
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.urls import reverse
+from django.utils._os import safe_join
+from PIL import Image
+
+from masters.image_variants import VARIANT_FORMATS, open_image, save_image
+
+try:
+    import fcntl
+except ImportError:  # Windows: only renders within one process are deduplicated
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+# Only images under these media directories can be resized
+RESIZABLE_DIRS = ('bouquets/', 'profile_images/')
+
+# A cache hit only moves the file's mtime (its LRU position) forward when it is
+# older than this, so hot images do not cost a metadata write per request
+TOUCH_INTERVAL = 3600
+
+# Trim the cache at most this often per process, down to 90% of the limit
+TRIM_INTERVAL = 60
+TRIM_TARGET = 0.9
+
+ALLOWED_SIZES = frozenset(getattr(settings, 'IMAGE_RESIZE_SIZES', ()))
+CACHE_DIR = str(getattr(settings, 'IMAGE_RESIZE_CACHE_DIR', ''))
+CACHE_MAX_BYTES = getattr(settings, 'IMAGE_RESIZE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+
+# Renders in this process, striped by key (flock alone does not cover Windows)
+_render_locks = [threading.Lock() for _ in range(64)]
+_last_trim = 0.0
+
+
+def is_allowed_size(width, height):
+    return f"{width}x{height}" in ALLOWED_SIZES
+
+
+def resized_url(image_path, size):
+    """URL of image_path fitted inside size ('480x480')"""
+    if not image_path:
+        return ''
+    width, height = size.split('x')
+    return reverse('resized_media', kwargs={'width': int(width), 'height': int(height), 'image_path': image_path})
+
+
+def locate_source(image_path):
+    """(absolute path, os.stat_result) of a resizable media file, or None"""
+    image_path = posixpath.normpath(image_path)
+    if not image_path.startswith(RESIZABLE_DIRS):
+        return None
+    try:
+        source = safe_join(settings.MEDIA_ROOT, image_path)
+        stat = os.stat(source)
+    except (SuspiciousFileOperation, OSError):
+        return None
+    if not os.path.isfile(source):
+        return None
+    return source, stat
+
+
+def cache_key(image_path, stat, width, height, fmt):
+    identity = f"{posixpath.normpath(image_path)}|{stat.st_size}|{stat.st_mtime_ns}|{width}x{height}|{fmt}"
+    return hashlib.sha256(identity.encode()).hexdigest()[:40]
+
+
+def _cache_path(key, fmt):
+    return os.path.join(CACHE_DIR, key[:2], f"{key}.{VARIANT_FORMATS[fmt][0]}")
+
+
+@contextmanager
+def _render_lock(key, directory):
+    with _render_locks[int(key[:4], 16) % len(_render_locks)]:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(directory, f"{key}.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _touch(path, mtime):
+    if time.time() - mtime > TOUCH_INTERVAL:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+def get_resized(source, key, width, height, fmt):
+    """
+    Path of the cached variant for key, rendering it from source first if it
+    is not cached yet. None if the source cannot be decoded.
+    """
+    target = _cache_path(key, fmt)
+    try:
+        _touch(target, os.stat(target).st_mtime)
+        return target
+    except FileNotFoundError:
+        pass
+
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+
+    with _render_lock(key, directory):
+        # Another request may have rendered it while this one waited
+        if os.path.exists(target):
+            return target
+        try:
+            image = open_image(source, (width, height))
+            image.thumbnail((width, height), Image.LANCZOS)
+            save_image(image, target, fmt)
+        except (OSError, Image.DecompressionBombError) as e:
+            logger.warning(f"Could not resize {source} to {width}x{height}: {e}")
+            return None
+
+    _maybe_trim()
+    return target
+
+
+def _maybe_trim():
+    global _last_trim
+    now = time.monotonic()
+    if now - _last_trim < TRIM_INTERVAL:
+        return
+    _last_trim = now
+    trim_cache()
+
+
+def trim_cache(max_bytes=None):
+    """
+    Evict least recently used variants (oldest mtime first) while the cache is
+    over max_bytes, down to TRIM_TARGET of it. Returns (files, bytes) removed.
+    """
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    try:
+        shards = [entry.path for entry in os.scandir(CACHE_DIR) if entry.is_dir()]
+    except FileNotFoundError:
+        return 0, 0
+
+    for shard in shards:
+        for entry in os.scandir(shard):
+            if entry.name.endswith(('.lock', '.tmp')) or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+
+    if total <= max_bytes:
+        return 0, 0
+
+    removed_files = removed_bytes = 0
+    target = max_bytes * TRIM_TARGET
+    for _mtime, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        try:
+            os.remove(f"{os.path.splitext(path)[0]}.lock")
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed_files += 1
+        removed_bytes += size
+
+    logger.info(f"Resized image cache trimmed: {removed_files} files, {removed_bytes} bytes")
+    return removed_files, removed_bytes
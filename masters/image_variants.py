@@ -0,0 +1,168 @@
+# masters/image_variants.py
+"""
+Bouquet image derivatives.
+
+Uploads are stored as-is and their BouquetImage rows start out 'pending'. The
+build_image_variants command renders each pending image at the VARIANT_SIZES
+widths in WebP and JPEG next to the original:
+
+    bouquets/12/ab34.png  ->  bouquets/12/variants/ab34-160.webp, ab34-160.jpg, ...
+
+and records the rendered widths on the row (and the bouquet's listing), which
+the {% responsive_image %} tag turns into srcset/sizes. Until then templates
+fall back to the original file.
+
+render_variants() only needs Pillow and a media root, so it can run in a
+process pool.
+"""
+import logging
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Preset name -> rendered width in px (height keeps the aspect ratio)
+VARIANT_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'detail': 1080,
+}
+
+# Format -> (file extension, Pillow format, save options)
+VARIANT_FORMATS = {
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+VARIANT_DIR = 'variants'
+
+
+def variant_path(image_path, width, fmt):
+    """Media-relative path of one derivative of an original image"""
+    directory, filename = posixpath.split(image_path)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, VARIANT_DIR, f"{stem}-{width}.{VARIANT_FORMATS[fmt][0]}")
+
+
+def _flatten(image):
+    """JPEG has no alpha channel: composite transparent images onto white"""
+    if image.mode == 'RGB':
+        return image
+    background = Image.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+    return background
+
+
+def open_image(source, box):
+    """
+    Open an original upright and in RGB(A), letting the JPEG decoder downscale
+    while decoding (DCT scaling) when the image is much larger than box.
+    """
+    with Image.open(source) as original:
+        original.draft('RGB', box)
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        image.load()
+    return image
+
+
+def save_image(image, target, fmt):
+    """Encode image in one of VARIANT_FORMATS; readers never see a half-written file"""
+    _extension, pil_format, options = VARIANT_FORMATS[fmt]
+    temporary = f"{target}.tmp"
+    output = _flatten(image) if pil_format == 'JPEG' else image
+    output.save(temporary, pil_format, **options)
+    os.replace(temporary, target)
+
+
+def render_variants(media_root, image_path):
+    """
+    Render every derivative of one original. Returns the widths rendered,
+    ascending; originals narrower than a preset are never upscaled.
+    """
+    largest = max(VARIANT_SIZES.values())
+    image = open_image(os.path.join(media_root, image_path), (largest, largest))
+
+    widths = sorted({min(width, image.width) for width in VARIANT_SIZES.values()})
+    os.makedirs(os.path.join(media_root, os.path.dirname(variant_path(image_path, widths[0], 'jpeg'))), exist_ok=True)
+
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in VARIANT_FORMATS:
+            save_image(resized, os.path.join(media_root, variant_path(image_path, width, fmt)), fmt)
+
+    return widths
+
+
+def _render(job):
+    media_root, image_id, image_path = job
+    try:
+        return image_id, render_variants(media_root, image_path), None
+    except Exception as e:
+        return image_id, None, str(e)
+
+
+def build_variants(image_ids=None, workers=1, rebuild=False):
+    """
+    Render derivatives of pending images (all active images when rebuild is
+    set, or just image_ids when given) and record them. Uses a process pool
+    of ``workers`` processes. Returns (rendered, failed).
+    """
+    from masters.catalog import refresh_listings
+    from masters.models import BouquetImage
+    from rose_and_roots.caching import BOUQUET, bump_namespaces
+
+    images = BouquetImage.objects.filter(is_active=1, image_path__isnull=False).exclude(image_path='')
+    if image_ids is not None:
+        images = images.filter(id__in=image_ids)
+    if not rebuild:
+        images = images.filter(variants_status='pending')
+
+    media_root = str(settings.MEDIA_ROOT)
+    jobs = [(media_root, image_id, image_path) for image_id, image_path in images.values_list('id', 'image_path')]
+    if not jobs:
+        return 0, 0
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render, jobs, chunksize=4))
+    else:
+        results = [_render(job) for job in jobs]
+
+    rendered = failed = 0
+    for image_id, widths, error in results:
+        if error is None:
+            rendered += 1
+            BouquetImage.objects.filter(id=image_id).update(variants_status='ready', variant_widths=widths)
+        else:
+            failed += 1
+            logger.warning(f"Could not render variants of bouquet image {image_id}: {error}")
+            BouquetImage.objects.filter(id=image_id).update(variants_status='failed', variant_widths=[])
+
+    # .update() skips the model signals, so refresh listings and caches here
+    bouquet_ids = BouquetImage.objects.filter(
+        id__in=[image_id for image_id, _widths, _error in results]
+    ).values_list('bouquet_id', flat=True).distinct()
+    refresh_listings(list(bouquet_ids))
+    bump_namespaces(BOUQUET)
+
+    return rendered, failed
+
+
+def variant_widths_for(image_paths):
+    """{image_path: rendered widths} for images referenced by path (e.g. cart items)"""
+    from masters.models import BouquetImage
+
+    paths = [path for path in set(image_paths) if path]
+    if not paths:
+        return {}
+    return dict(
+        BouquetImage.objects.filter(image_path__in=paths, variants_status='ready').values_list('image_path', 'variant_widths')
+    )
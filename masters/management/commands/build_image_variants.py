@@ -0,0 +1,47 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from masters.image_variants import build_variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Render WebP/JPEG derivatives of pending bouquet images. Run once to backfill existing '
+        'images, or with --loop as the worker that picks up new uploads.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Size of the process pool (default: number of CPUs)'
+        )
+        parser.add_argument('--rebuild', action='store_true', help='Re-render every active image, not just pending ones')
+        parser.add_argument(
+            '--image',
+            type=int,
+            action='append',
+            dest='image_ids',
+            help='Only these BouquetImage IDs (repeatable)'
+        )
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new uploads')
+        parser.add_argument('--interval', type=float, default=10, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        rebuild = options['rebuild']
+        while True:
+            rendered, failed = build_variants(
+                image_ids=options.get('image_ids'),
+                workers=options['workers'],
+                rebuild=rebuild,
+            )
+            if rendered or failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} image(s), {failed} failed."))
+            if not options['loop']:
+                break
+            # --rebuild only applies to the first pass
+            rebuild = False
+            time.sleep(options['interval'])
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from masters.recommendations import RECOMMENDATIONS_PER_BOUQUET, build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related and frequently-bought-together bouquets shown on product pages (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=RECOMMENDATIONS_PER_BOUQUET, help='Neighbours kept per bouquet and kind')
+
+    def handle(self, *args, **options):
+        written = build_recommendations(limit=options['limit'])
+        summary = ', '.join(f"{rows} {kind}" for kind, rows in written.items())
+        self.stdout.write(self.style.SUCCESS(f"Stored recommendations: {summary}."))
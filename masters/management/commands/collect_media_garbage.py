@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from masters.media_gc import MEDIA_GC_BATCH_SIZE, MEDIA_GC_ORPHAN_MIN_AGE, collect_media_garbage, sweep_orphans
+from masters.models import MediaDeletion
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove media files queued for deletion and, with --sweep, orphaned files under '
+        'MEDIA_ROOT/bouquets/ (run from cron, or with --loop as a long-running worker)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=MEDIA_GC_BATCH_SIZE, help='Queued paths per transaction')
+        parser.add_argument('--sweep', action='store_true', help='Also remove files nothing references')
+        parser.add_argument('--min-age', type=int, default=MEDIA_GC_ORPHAN_MIN_AGE, help='Seconds before an unreferenced file counts as orphaned')
+        parser.add_argument('--dry-run', action='store_true', help='Remove nothing: report the queued deletions and, with --sweep, the orphaned files')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        if options['sweep']:
+            files, freed = sweep_orphans(min_age=options['min_age'], dry_run=options['dry_run'])
+            verb = 'Would remove' if options['dry_run'] else 'Removed'
+            self.stdout.write(self.style.SUCCESS(f"{verb} {files} orphaned file(s), {filesizeformat(freed)}."))
+
+        if options['dry_run']:
+            queued = MediaDeletion.objects.count()
+            self.stdout.write(self.style.SUCCESS(f"{queued} queued deletion(s) left unprocessed."))
+            return
+
+        while True:
+            entries, files, freed = collect_media_garbage(batch_size=options['batch_size'])
+            if entries or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Processed {entries} queued deletion(s): removed {files} file(s), reclaimed {filesizeformat(freed)}."
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from masters.recently_viewed import RECENTLY_VIEWED_FLUSH_BATCH_SIZE, flush_recently_viewed
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the recently viewed products buffered in the cache to the database '
+        '(run from cron, or with --loop as a long-running worker)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=RECENTLY_VIEWED_FLUSH_BATCH_SIZE, help='Users per bulk write')
+        parser.add_argument('--loop', action='store_true', help='Keep flushing')
+        parser.add_argument('--interval', type=float, default=60, help='Seconds between flushes with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            users, upserted, trimmed = flush_recently_viewed(batch_size=options['batch_size'])
+            if users or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Flushed {users} user(s): {upserted} view(s) written, {trimmed} trimmed."
+                ))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from masters.catalog import refresh_listings
+from store.facets import catalog_changed
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the bouquet_listing projection (and bouquet_search documents) used by the shop grid, search and dashboards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bouquet',
+            type=int,
+            action='append',
+            dest='bouquet_ids',
+            help='Only rebuild these bouquet IDs (repeatable). Defaults to every bouquet.'
+        )
+
+    def handle(self, *args, **options):
+        listings = refresh_listings(options.get('bouquet_ids'))
+        # Bulk rebuilds usually follow direct DB edits - have every worker reload its facet index
+        catalog_changed()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(listings)} listing row(s)."))
@@ -0,0 +1,240 @@
+# masters/media_gc.py
+"""
+Deferred, batched media garbage collection.
+
+Views never remove files themselves: enqueue_media_deletion() records paths in
+MediaDeletion once the transaction commits, and the collect_media_garbage
+command removes them in batches, off the request path and outside any
+transaction a view holds. A queued path is only removed when nothing uses it
+any more: a content-addressed blob (MediaBlob) when its ref_count is 0, under
+its row lock, and any other file when no BouquetImage row points at it.
+
+sweep_orphans() catches what the queue cannot: files under MEDIA_ROOT/bouquets/
+that no BouquetImage or MediaBlob references (uploads of a request that
+crashed, files deleted before this queue existed) and stale temporary files.
+Files younger than MEDIA_GC_ORPHAN_MIN_AGE are left alone, since an upload is
+moved into place shortly before its transaction commits.
+
+Everything here reports (files removed, bytes reclaimed); the rendered
+variants of an image count as files of their own.
+"""
+import logging
+import os
+import posixpath
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.utils._os import safe_join
+
+from masters.image_variants import VARIANT_DIR
+
+logger = logging.getLogger(__name__)
+
+MEDIA_GC_BATCH_SIZE = getattr(settings, 'MEDIA_GC_BATCH_SIZE', 200)
+MEDIA_GC_ORPHAN_MIN_AGE = getattr(settings, 'MEDIA_GC_ORPHAN_MIN_AGE', 24 * 60 * 60)
+
+# Swept for orphans, relative to MEDIA_ROOT
+SWEEP_DIR = 'bouquets'
+
+# Left behind by an interrupted upload or variant render
+TEMPORARY_PREFIXES = ('.upload-',)
+TEMPORARY_SUFFIXES = ('.tmp',)
+
+
+def enqueue_media_deletion(paths):
+    """Queue media paths (relative to MEDIA_ROOT) for removal once the current transaction commits"""
+    from masters.models import MediaDeletion
+
+    paths = [path for path in dict.fromkeys(paths) if path]
+    if not paths:
+        return
+    transaction.on_commit(
+        lambda: MediaDeletion.objects.bulk_create([MediaDeletion(path=path) for path in paths])
+    )
+
+
+def _absolute(path):
+    try:
+        return safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        logger.warning(f"Refusing to remove media path outside MEDIA_ROOT: {path}")
+        return None
+
+
+def _remove(absolute_path):
+    """Size of the removed file, or None if it was not there (or could not be removed)"""
+    try:
+        size = os.path.getsize(absolute_path)
+        os.remove(absolute_path)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"Could not remove media file {absolute_path}: {e}")
+        return None
+    return size
+
+
+def remove_media_files(paths):
+    """Remove media files and their rendered variants. Returns (files, bytes)"""
+    files = freed = 0
+    for path in paths:
+        absolute = _absolute(path) if path else None
+        if absolute is None:
+            continue
+
+        directory, filename = os.path.split(absolute)
+        stem = os.path.splitext(filename)[0]
+        targets = [absolute]
+        variant_dir = os.path.join(directory, VARIANT_DIR)
+        if os.path.isdir(variant_dir):
+            targets += [
+                os.path.join(variant_dir, name) for name in os.listdir(variant_dir)
+                if name.rsplit('-', 1)[0] == stem
+            ]
+
+        for target in targets:
+            size = _remove(target)
+            if size is not None:
+                files += 1
+                freed += size
+    return files, freed
+
+
+def collect_blobs(blob_ids=None):
+    """
+    Delete unreferenced blobs (of blob_ids, or all of them) with their files
+    and variants. Returns (files, bytes).
+    """
+    from masters.models import MediaBlob
+
+    files = freed = 0
+    with transaction.atomic():
+        blobs = MediaBlob.objects.select_for_update().filter(ref_count=0)
+        if blob_ids is not None:
+            blobs = blobs.filter(pk__in=blob_ids)
+
+        for blob in blobs:
+            # Removed while the row is locked: a concurrent upload of the same
+            # content waits for the lock, then stores the file again
+            removed, size = remove_media_files([blob.path])
+            blob.delete()
+            files += removed
+            freed += size
+    return files, freed
+
+
+def collect_batch(batch_size=MEDIA_GC_BATCH_SIZE):
+    """
+    Process up to batch_size queued deletions. Queue rows are claimed with
+    SKIP LOCKED, so several workers can run side by side.
+    Returns (queued paths processed, files, bytes).
+    """
+    from masters.media_storage import BOUQUET_BLOB_DIR
+    from masters.models import BouquetImage, MediaBlob, MediaDeletion
+
+    with transaction.atomic():
+        entries = list(
+            MediaDeletion.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size]
+        )
+        if not entries:
+            return 0, 0, 0
+        paths = {entry.path for entry in entries}
+
+        # Blob files are only ever removed by collect_blobs(), under the row lock
+        blob_ids = list(MediaBlob.objects.filter(path__in=paths).values_list('id', flat=True))
+        files, freed = collect_blobs(blob_ids)
+
+        others = [path for path in paths if not path.startswith(f"{BOUQUET_BLOB_DIR}/")]
+        in_use = set(BouquetImage.objects.filter(image_path__in=others).values_list('image_path', flat=True))
+        removed, size = remove_media_files(path for path in others if path not in in_use)
+
+        MediaDeletion.objects.filter(id__in=[entry.id for entry in entries]).delete()
+
+    return len(entries), files + removed, freed + size
+
+
+def collect_media_garbage(batch_size=MEDIA_GC_BATCH_SIZE, max_batches=None):
+    """Process queued deletions until the queue is empty. Returns (queued paths, files, bytes)"""
+    total_entries = total_files = total_bytes = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        entries, files, freed = collect_batch(batch_size)
+        if not entries:
+            break
+        total_entries += entries
+        total_files += files
+        total_bytes += freed
+        batches += 1
+
+    if total_files:
+        logger.info(f"Media GC removed {total_files} files ({total_bytes} bytes) for {total_entries} queued deletions")
+    return total_entries, total_files, total_bytes
+
+
+def sweep_orphans(min_age=MEDIA_GC_ORPHAN_MIN_AGE, dry_run=False):
+    """
+    Remove files under MEDIA_ROOT/bouquets/ that nothing references, older
+    than min_age seconds, and the directories they leave empty. With dry_run
+    only count them. Returns (files, bytes).
+    """
+    from masters.models import BouquetImage, MediaBlob
+
+    files = freed = 0
+    if not dry_run:
+        files, freed = collect_blobs()
+
+    root = _absolute(SWEEP_DIR)
+    if root is None or not os.path.isdir(root):
+        return files, freed
+
+    referenced = set(BouquetImage.objects.exclude(image_path__isnull=True).values_list('image_path', flat=True))
+    referenced.update(MediaBlob.objects.values_list('path', flat=True))
+    # (directory, stem) of every referenced image, to recognise its variants
+    owners = {
+        (posixpath.dirname(path), posixpath.splitext(posixpath.basename(path))[0]) for path in referenced
+    }
+
+    media_root = os.path.abspath(str(settings.MEDIA_ROOT))
+    cutoff = time.time() - min_age
+
+    for dirpath, _dirnames, filenames in os.walk(root, topdown=False):
+        relative_dir = os.path.relpath(dirpath, media_root).replace(os.sep, '/')
+
+        for name in filenames:
+            absolute = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(absolute)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > cutoff:
+                continue
+
+            if name.startswith(TEMPORARY_PREFIXES) or name.endswith(TEMPORARY_SUFFIXES):
+                orphan = True
+            elif posixpath.basename(relative_dir) == VARIANT_DIR:
+                orphan = (posixpath.dirname(relative_dir), name.rsplit('-', 1)[0]) not in owners
+            else:
+                orphan = f"{relative_dir}/{name}" not in referenced
+
+            if not orphan:
+                continue
+            if dry_run:
+                files += 1
+                freed += stat.st_size
+                continue
+            size = _remove(absolute)
+            if size is not None:
+                files += 1
+                freed += size
+
+        if not dry_run and dirpath != root:
+            try:
+                os.rmdir(dirpath)  # Only succeeds when empty
+            except OSError:
+                pass
+
+    if files and not dry_run:
+        logger.info(f"Media sweep removed {files} orphaned files ({freed} bytes)")
+    return files, freed
@@ -0,0 +1,239 @@
+# masters/media_storage.py
+"""
+Content-addressed media storage.
+
+Uploads are streamed to a temporary file while being hashed and stored once
+per distinct content, named by their SHA-256:
+
+    bouquets/blobs/3f/a9/3fa9...c1.jpg
+
+so the same photo uploaded to several bouquets takes up one file. Each stored
+file has a MediaBlob row whose ref_count counts the BouquetImage rows using it.
+store_blob() adds a reference and release_blobs() drops them and queues the
+blob for the media collector (masters/media_gc.py) once the transaction
+commits, so a rollback never leaves rows pointing at removed files.
+
+A blob's row is locked (select_for_update) both while a file is moved into
+place and while it is collected, so an upload of the same content racing the
+collector either revives the blob or recreates it, never loses the file.
+
+sendfile_response() hands files to the front server (X-Accel-Redirect for
+nginx, X-Sendfile for Apache/lighttpd) instead of streaming them from Python.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.http import FileResponse, HttpResponse
+
+from masters.media_gc import enqueue_media_deletion
+
+logger = logging.getLogger(__name__)
+
+BOUQUET_BLOB_DIR = 'bouquets/blobs'
+
+# Media only its owner (or an admin) may fetch
+PROTECTED_MEDIA_DIRS = ('profile_images/',)
+
+# Stored extension by upload content type (the client's filename is not trusted)
+BLOB_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+}
+
+
+class BlobStorage(FileSystemStorage):
+    """FileSystemStorage under MEDIA_ROOT that names files by content hash"""
+
+    def blob_name(self, directory, digest, extension):
+        return posixpath.join(directory, digest[:2], digest[2:4], f"{digest}{extension}")
+
+    def write_temporary(self, content, directory):
+        """
+        Stream content into a temporary file under directory, hashing each
+        chunk as it is written. Returns (digest, size, temporary path).
+        """
+        target_dir = self.path(directory)
+        os.makedirs(target_dir, exist_ok=True)
+        temporary = os.path.join(target_dir, f".upload-{uuid.uuid4().hex}")
+
+        sha256 = hashlib.sha256()
+        size = 0
+        try:
+            with open(temporary, 'wb') as destination:
+                for chunk in content.chunks():
+                    sha256.update(chunk)
+                    destination.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            self.discard(temporary)
+            raise
+        return sha256.hexdigest(), size, temporary
+
+    def place(self, temporary, name):
+        """Move a temporary file to its blob name, or drop it if the blob is already stored"""
+        target = self.path(name)
+        if os.path.exists(target):
+            self.discard(temporary)
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(temporary, target)
+        return True
+
+    def discard(self, temporary):
+        try:
+            os.remove(temporary)
+        except FileNotFoundError:
+            pass
+
+
+blob_storage = BlobStorage()
+
+
+def store_blob(uploaded_file, directory=BOUQUET_BLOB_DIR):
+    """
+    Store an upload (deduplicated by content) and take one reference to it.
+    Returns the MediaBlob. Must be called inside a transaction.
+    """
+    from masters.models import MediaBlob
+
+    digest, size, temporary = blob_storage.write_temporary(uploaded_file, directory)
+    content_type = getattr(uploaded_file, 'content_type', None)
+    extension = BLOB_EXTENSIONS.get(content_type) or os.path.splitext(uploaded_file.name)[1].lower()
+
+    try:
+        blob, _created = MediaBlob.objects.select_for_update().get_or_create(
+            digest=digest,
+            defaults={
+                'path': blob_storage.blob_name(directory, digest, extension),
+                'size': size,
+                'content_type': content_type,
+            },
+        )
+        blob_storage.place(temporary, blob.path)
+    except BaseException:
+        blob_storage.discard(temporary)
+        raise
+
+    MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+    return blob
+
+
+def release_blobs(blob_ids):
+    """Drop one reference per id (repeat an id to drop several); collect unused blobs after commit"""
+    from masters.models import MediaBlob
+
+    counts = {}
+    for blob_id in blob_ids:
+        if blob_id:
+            counts[blob_id] = counts.get(blob_id, 0) + 1
+    if not counts:
+        return
+
+    for blob_id, count in counts.items():
+        MediaBlob.objects.filter(pk=blob_id, ref_count__gte=count).update(ref_count=F('ref_count') - count)
+
+    # The collector re-checks ref_count under the row lock before removing anything
+    enqueue_media_deletion(MediaBlob.objects.filter(pk__in=list(counts)).values_list('path', flat=True))
+
+
+def add_bouquet_image(bouquet, uploaded_file, created_by=None):
+    """
+    Store an uploaded photo and attach it to a bouquet. A photo that is already
+    stored (and rendered) for another bouquet reuses its file and variants.
+    """
+    from masters.models import BouquetImage
+
+    blob = store_blob(uploaded_file)
+    rendered = BouquetImage.objects.filter(blob=blob, variants_status='ready').values_list('variant_widths', flat=True).first()
+
+    return BouquetImage.objects.create(
+        bouquet=bouquet,
+        image_name=uploaded_file.name,
+        image_path=blob.path,
+        blob=blob,
+        is_active=1,
+        created_by=created_by,
+        variants_status='ready' if rendered else 'pending',
+        variant_widths=rendered or [],
+    )
+
+
+def release_bouquet_images(images):
+    """
+    Before deleting BouquetImage rows: release their blobs and queue the files
+    of images stored before content addressing for removal.
+    """
+    blob_ids = []
+    legacy_paths = []
+    for blob_id, image_path in images.values_list('blob_id', 'image_path'):
+        if blob_id:
+            blob_ids.append(blob_id)
+        elif image_path:
+            legacy_paths.append(image_path)
+
+    release_blobs(blob_ids)
+    enqueue_media_deletion(legacy_paths)
+
+
+def media_file_path(file_path):
+    """Absolute path of an existing file under MEDIA_ROOT, or None (also for '..' tricks)"""
+    try:
+        path = blob_storage.path(posixpath.normpath(file_path))
+    except SuspiciousFileOperation:
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def is_protected_media(file_path):
+    return posixpath.normpath(file_path).startswith(PROTECTED_MEDIA_DIRS)
+
+
+def can_view_media(user, file_path):
+    """Public media for everyone; profile images for their owner and admins"""
+    if not is_protected_media(file_path):
+        return True
+    if not user.is_authenticated:
+        return False
+    if user.role_id == 1:
+        return True
+    profile_image = getattr(user, 'profile_image', None)
+    return bool(profile_image) and profile_image.name == posixpath.normpath(file_path)
+
+
+def sendfile_response(path, content_type=None):
+    """
+    Response for a file on disk: with MEDIA_SENDFILE set the front server
+    sends the bytes (X-Accel-Redirect to the internal location mapped in
+    MEDIA_SENDFILE_LOCATIONS, or X-Sendfile with the absolute path), otherwise
+    Django streams the file itself.
+    """
+    content_type = content_type or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    backend = getattr(settings, 'MEDIA_SENDFILE', None)
+
+    if backend == 'x-accel-redirect':
+        absolute = os.path.abspath(path)
+        for root, location in getattr(settings, 'MEDIA_SENDFILE_LOCATIONS', {}).items():
+            root = os.path.abspath(str(root))
+            if absolute.startswith(root + os.sep):
+                response = HttpResponse(content_type=content_type)
+                relative = os.path.relpath(absolute, root).replace(os.sep, '/')
+                response['X-Accel-Redirect'] = f"{location.rstrip('/')}/{relative}"
+                return response
+        logger.warning(f"No X-Accel-Redirect location for {path}, streaming it")
+
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = os.path.abspath(path)
+        return response
+
+    return FileResponse(open(path, 'rb'), content_type=content_type)
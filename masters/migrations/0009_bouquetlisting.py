@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0008_contactinquiry_recentlyviewed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BouquetListing',
+            fields=[
+                ('bouquet', models.OneToOneField(db_column='bouquet_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='masters.bouquet')),
+                ('primary_image', models.CharField(blank=True, max_length=255, null=True)),
+                ('image_paths', models.JSONField(blank=True, default=list)),
+                ('occasion_names', models.JSONField(blank=True, default=list)),
+                ('category_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('effective_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'bouquet_listing',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0009_bouquetlisting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bouquetimage',
+            name='variant_widths',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='bouquetimage',
+            name='variants_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='bouquetlisting',
+            name='primary_image_widths',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from masters.catalog import search_document_fields
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+# MySQL: FULLTEXT over all columns for matching, plus one over the name for ranking
+MYSQL_FULLTEXT = [
+    'ALTER TABLE bouquet_search ADD FULLTEXT INDEX bouquet_search_text_ft (name, body, tags)',
+    'ALTER TABLE bouquet_search ADD FULLTEXT INDEX bouquet_search_name_ft (name)',
+]
+
+# SQLite: external-content FTS5 table kept in step with bouquet_search by triggers
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE bouquet_search_fts USING fts5("
+    "name, body, tags, content='bouquet_search', content_rowid='bouquet_id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER bouquet_search_ai AFTER INSERT ON bouquet_search BEGIN "
+    "INSERT INTO bouquet_search_fts(rowid, name, body, tags) VALUES (new.bouquet_id, new.name, new.body, new.tags); END",
+    "CREATE TRIGGER bouquet_search_ad AFTER DELETE ON bouquet_search BEGIN "
+    "INSERT INTO bouquet_search_fts(bouquet_search_fts, rowid, name, body, tags) VALUES ('delete', old.bouquet_id, old.name, old.body, old.tags); END",
+    "CREATE TRIGGER bouquet_search_au AFTER UPDATE ON bouquet_search BEGIN "
+    "INSERT INTO bouquet_search_fts(bouquet_search_fts, rowid, name, body, tags) VALUES ('delete', old.bouquet_id, old.name, old.body, old.tags); "
+    "INSERT INTO bouquet_search_fts(rowid, name, body, tags) VALUES (new.bouquet_id, new.name, new.body, new.tags); END",
+]
+
+SQLITE_FTS_DROP = [
+    'DROP TRIGGER IF EXISTS bouquet_search_au',
+    'DROP TRIGGER IF EXISTS bouquet_search_ad',
+    'DROP TRIGGER IF EXISTS bouquet_search_ai',
+    'DROP TABLE IF EXISTS bouquet_search_fts',
+]
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'mysql': MYSQL_FULLTEXT, 'sqlite': SQLITE_FTS}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def backfill_search_documents(apps, schema_editor):
+    Bouquet = apps.get_model('masters', 'Bouquet')
+    BouquetOccasion = apps.get_model('masters', 'BouquetOccasion')
+    BouquetSearchDocument = apps.get_model('masters', 'BouquetSearchDocument')
+
+    occasions = {}
+    occasion_rows = BouquetOccasion.objects.filter(
+        bouquet__isnull=False,
+        occasion__isnull=False
+    ).order_by('id').values_list('bouquet_id', 'occasion__name')
+    for bouquet_id, occasion_name in occasion_rows:
+        occasions.setdefault(bouquet_id, []).append(occasion_name)
+
+    bouquets = Bouquet.objects.select_related('category').order_by('id')
+    batch = []
+    for bouquet in bouquets.iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        category_name = bouquet.category.parameter_value if bouquet.category else None
+        batch.append(BouquetSearchDocument(
+            bouquet_id=bouquet.id,
+            **search_document_fields(bouquet, occasions.get(bouquet.id, []), category_name),
+        ))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            BouquetSearchDocument.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        BouquetSearchDocument.objects.bulk_create(batch)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    # The FULLTEXT indexes go with the table on MySQL
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0012_media_deletion_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BouquetSearchDocument',
+            fields=[
+                ('bouquet', models.OneToOneField(db_column='bouquet_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='masters.bouquet')),
+                ('name', models.CharField(blank=True, default='', max_length=200)),
+                ('body', models.TextField(blank=True, default='')),
+                ('tags', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'db_table': 'bouquet_search',
+            },
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0014_recently_viewed_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BouquetRecommendation',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('related', 'Related'), ('bought_together', 'Frequently bought together')], max_length=20)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('bouquet', models.ForeignKey(db_column='bouquet_id', on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='masters.bouquet')),
+                ('recommended', models.ForeignKey(db_column='recommended_id', on_delete=django.db.models.deletion.CASCADE, related_name='+', to='masters.bouquet')),
+            ],
+            options={
+                'db_table': 'bouquet_recommendation',
+                'constraints': [models.UniqueConstraint(fields=('bouquet', 'kind', 'rank'), name='bouquet_recommendation_rank_uniq')],
+            },
+        ),
+    ]
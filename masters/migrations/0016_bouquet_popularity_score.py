@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0015_bouquet_recommendation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bouquet',
+            name='popularity_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='bouquet',
+            index=models.Index(fields=['is_active', '-popularity_score', '-id'], name='bouquet_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recentlyviewed',
+            index=models.Index(fields=['viewed_at'], name='recently_viewed_at_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0016_bouquet_popularity_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bouquet',
+            name='effective_price',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(discount_price__gt=0, then=models.F('discount_price')), default=models.F('price')), output_field=models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='bouquet',
+            index=models.Index(fields=['is_active', 'effective_price', 'id'], name='bouquet_effective_price_idx'),
+        ),
+    ]
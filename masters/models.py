@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 from accounts.models import CustomUser
 
@@ -61,11 +62,30 @@ class Bouquet(models.Model):
         help_text='Product category from parameter_master'
     )
 
+    # What the customer pays: the discount price when there is one. Computed by
+    # the database, so every write path (including queryset updates) keeps it
+    effective_price = models.GeneratedField(
+        expression=models.Case(
+            models.When(discount_price__gt=0, then=models.F('discount_price')),
+            default=models.F('price'),
+        ),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2, null=True),
+        db_persist=True,
+    )
+
+    # Time-decayed demand, maintained by store.popularity (the shop's 'popular' sort)
+    popularity_score = models.FloatField(default=0, editable=False)
+
     created_at = models.DateTimeField(null=True, blank=True, auto_now_add=True)
     updated_at = models.DateTimeField(null=True, blank=True, auto_now=True)
 
     class Meta:
         db_table = 'bouquet'
+        indexes = [
+            models.Index(fields=['is_active', '-popularity_score', '-id'], name='bouquet_popular_idx'),
+            # Shop price sorts and price range filters
+            models.Index(fields=['is_active', 'effective_price', 'id'], name='bouquet_effective_price_idx'),
+        ]
 
     def __str__(self):
         return self.name or f"Bouquet {self.id}"
@@ -96,6 +116,38 @@ class BouquetOccasion(models.Model):
     def __str__(self):
         return f"{self.bouquet} - {self.occasion}"
 
+class MediaBlob(models.Model):
+    """
+    One stored file, named by the SHA-256 of its content (see
+    masters/media_storage.py). ref_count is the number of rows using it; the
+    file is removed once it drops to zero and the transaction commits.
+    """
+    id = models.AutoField(primary_key=True)
+    digest = models.CharField(max_length=64, unique=True)
+    path = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, null=True, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'media_blob'
+
+    def __str__(self):
+        return self.path
+
+class MediaDeletion(models.Model):
+    """Media file waiting to be removed by the collect_media_garbage command (see masters.media_gc)"""
+    id = models.BigAutoField(primary_key=True)
+    path = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'media_deletion_queue'
+
+    def __str__(self):
+        return self.path
+
 class BouquetImage(models.Model):
     id = models.AutoField(primary_key=True)
 
@@ -111,6 +163,25 @@ class BouquetImage(models.Model):
 
     image_path = models.CharField(max_length=255, null=True, blank=True)
 
+    # Stored content; image_path is the blob's path. Null for images uploaded
+    # before content-addressed storage
+    blob = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.SET_NULL,
+        related_name='images',
+        null=True,
+        blank=True
+    )
+
+    # Resized WebP/JPEG copies (see masters/image_variants.py), rendered off the request path
+    VARIANT_STATUS = (
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+    variants_status = models.CharField(max_length=10, choices=VARIANT_STATUS, default='pending')
+    variant_widths = models.JSONField(default=list, blank=True)
+
     is_active = models.IntegerField(default=1)
 
     created_at = models.DateTimeField(null=True, blank=True, auto_now_add=True)
@@ -122,6 +193,96 @@ class BouquetImage(models.Model):
     def __str__(self):
         return f"Image for {self.bouquet.name}" if self.bouquet else f"Image {self.id}"
 
+class BouquetListing(models.Model):
+    """Denormalized, read-only projection of a bouquet for listing pages"""
+    bouquet = models.OneToOneField(
+        Bouquet,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='listing',
+        db_column='bouquet_id'
+    )
+
+    primary_image = models.CharField(max_length=255, null=True, blank=True)
+    primary_image_widths = models.JSONField(default=list, blank=True)
+    image_paths = models.JSONField(default=list, blank=True)
+    occasion_names = models.JSONField(default=list, blank=True)
+    category_name = models.CharField(max_length=255, null=True, blank=True)
+    effective_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'bouquet_listing'
+
+    def __str__(self):
+        return f"Listing for bouquet {self.bouquet_id}"
+
+class BouquetSearchDocument(models.Model):
+    """
+    Searchable text of a bouquet (see store/search.py), rebuilt together with
+    its listing row. Full-text indexed with FULLTEXT on MySQL and mirrored into
+    an FTS5 table by triggers on SQLite.
+    """
+    bouquet = models.OneToOneField(
+        Bouquet,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+        db_column='bouquet_id'
+    )
+
+    name = models.CharField(max_length=200, blank=True, default='')
+    # Short and long description
+    body = models.TextField(blank=True, default='')
+    # Occasion and category names
+    tags = models.TextField(blank=True, default='')
+
+    class Meta:
+        db_table = 'bouquet_search'
+
+    def __str__(self):
+        return f"Search document for bouquet {self.bouquet_id}"
+
+class BouquetRecommendation(models.Model):
+    """
+    Precomputed neighbour of a bouquet, best first by rank, written by the
+    build_recommendations command (see masters/recommendations.py)
+    """
+    RELATED = 'related'
+    BOUGHT_TOGETHER = 'bought_together'
+    KINDS = [
+        (RELATED, 'Related'),
+        (BOUGHT_TOGETHER, 'Frequently bought together'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    bouquet = models.ForeignKey(
+        Bouquet,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+        db_column='bouquet_id'
+    )
+    kind = models.CharField(max_length=20, choices=KINDS)
+    rank = models.PositiveSmallIntegerField()
+    recommended = models.ForeignKey(
+        Bouquet,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_column='recommended_id'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        db_table = 'bouquet_recommendation'
+        constraints = [
+            # Also the index of the product page lookup: bouquet + kind, in rank order
+            models.UniqueConstraint(fields=['bouquet', 'kind', 'rank'], name='bouquet_recommendation_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.rank} of bouquet {self.bouquet_id}: {self.recommended_id}"
+
 class Vendor(models.Model):
     id = models.AutoField(primary_key=True)
 
@@ -193,12 +354,17 @@ class RecentlyViewed(models.Model):
         on_delete=models.CASCADE,
         db_column='bouquet_id'
     )
-    viewed_at = models.DateTimeField(auto_now=True)
+    # Time of the view itself: rows are written later, by masters.recently_viewed
+    viewed_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         db_table = 'recently_viewed'
         ordering = ['-viewed_at']
         unique_together = ['user', 'bouquet']  # Prevent duplicates
+        indexes = [
+            # Views since the last popularity refresh (store.popularity)
+            models.Index(fields=['viewed_at'], name='recently_viewed_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} viewed {self.bouquet.name}"
@@ -0,0 +1,209 @@
+# masters/recently_viewed.py
+"""
+Recently viewed products, buffered in the shared cache.
+
+A product page view no longer writes to the database. record_view() moves the
+bouquet to the front of the user's ring buffer in the cache (newest first, at
+most RECENTLY_VIEWED_LIMIT entries) and, the first time since the last flush,
+appends the user to a flush queue. The buffer is the merged view: what the
+database held when it was first loaded plus every view since, so the customer
+dashboard reads it straight from the cache.
+
+flush_recently_viewed() (the flush_recently_viewed command, run from cron or
+with --loop) writes the queued buffers to RecentlyViewed with one bulk upsert
+per batch and trims the rows that fell out of the buffers with one delete.
+
+The flush queue is a sequence of cache keys numbered by a counter, so no
+read-modify-write of a shared list is needed. That takes a cache whose incr is
+atomic and shared by every process (Redis or memcached). On any other backend
+(the file-based cache used without REDIS_URL) record_view() writes each view
+through to the table instead, and the buffer is only a read cache. Set
+RECENTLY_VIEWED_BUFFERED to force either mode.
+
+Cache keys can be evicted. A user whose queue entry is lost is queued again on
+their next view, and a lost counter restarts after the flushed sequences.
+Views recorded in a buffer that the cache loses before its flush are lost too;
+that is the trade for taking the writes off the request.
+"""
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.db import connection, transaction
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+RECENTLY_VIEWED_LIMIT = getattr(settings, 'RECENTLY_VIEWED_LIMIT', 20)
+RECENTLY_VIEWED_FLUSH_BATCH_SIZE = getattr(settings, 'RECENTLY_VIEWED_FLUSH_BATCH_SIZE', 500)
+# Buffers outlive several flushes so the dashboard rarely has to reload one
+RECENTLY_VIEWED_CACHE_TIMEOUT = getattr(settings, 'RECENTLY_VIEWED_CACHE_TIMEOUT', 7 * 24 * 60 * 60)
+
+QUEUE_SEQUENCE_KEY = 'recently_viewed:queue:head'
+QUEUE_FLUSHED_KEY = 'recently_viewed:queue:flushed'
+
+
+def _buffer_key(user_id):
+    return f"recently_viewed:{user_id}"
+
+
+def _pending_key(user_id):
+    return f"recently_viewed:pending:{user_id}"
+
+
+def _queue_key(sequence):
+    return f"recently_viewed:queue:{sequence}"
+
+
+def _load_buffer(user_id):
+    """The user's stored views as [[bouquet_id, viewed_at unix seconds], ...], newest first"""
+    from masters.models import RecentlyViewed
+
+    rows = (
+        RecentlyViewed.objects.filter(user_id=user_id)
+        .order_by('-viewed_at', '-id')
+        .values_list('bouquet_id', 'viewed_at')[:RECENTLY_VIEWED_LIMIT]
+    )
+    return [[bouquet_id, viewed_at.timestamp()] for bouquet_id, viewed_at in rows]
+
+
+def get_buffer(user_id):
+    """The user's recently viewed [bouquet_id, viewed_at] pairs, newest first"""
+    buffer = cache.get(_buffer_key(user_id))
+    if buffer is None:
+        buffer = _load_buffer(user_id)
+        cache.set(_buffer_key(user_id), buffer, RECENTLY_VIEWED_CACHE_TIMEOUT)
+    return buffer
+
+
+def buffering_enabled():
+    """Whether views are buffered and flushed in batches rather than written through"""
+    buffered = getattr(settings, 'RECENTLY_VIEWED_BUFFERED', None)
+    if buffered is None:
+        buffered = isinstance(caches['default'], (RedisCache, BaseMemcachedCache))
+    return buffered
+
+
+def _next_sequence():
+    try:
+        return cache.incr(QUEUE_SEQUENCE_KEY)
+    except ValueError:
+        # Counter lost: continue after the flushed sequences rather than reuse them
+        cache.add(QUEUE_SEQUENCE_KEY, cache.get(QUEUE_FLUSHED_KEY) or 0, None)
+        return cache.incr(QUEUE_SEQUENCE_KEY)
+
+
+def _enqueue(user_id):
+    """
+    Queue the user for the next flush unless already queued. The pending flag
+    holds the user's queue sequence, so a flag whose queue entry was evicted
+    (or taken over after the counter was lost) queues the user again.
+    """
+    sequence = cache.get(_pending_key(user_id))
+    if sequence is not None and cache.get(_queue_key(sequence)) == user_id:
+        return
+    sequence = _next_sequence()
+    cache.set_many(
+        {_queue_key(sequence): user_id, _pending_key(user_id): sequence},
+        RECENTLY_VIEWED_CACHE_TIMEOUT,
+    )
+
+
+def record_view(user_id, bouquet_id):
+    """Move a bouquet to the front of the user's buffer and queue it for the flush (or write it through)"""
+    try:
+        buffer = [entry for entry in get_buffer(user_id) if entry[0] != bouquet_id]
+        buffer.insert(0, [bouquet_id, time.time()])
+        buffer = buffer[:RECENTLY_VIEWED_LIMIT]
+        cache.set(_buffer_key(user_id), buffer, RECENTLY_VIEWED_CACHE_TIMEOUT)
+        if buffering_enabled():
+            _enqueue(user_id)
+        else:
+            _write_buffers({user_id: buffer})
+    except Exception as e:
+        logger.warning(f"Failed to track recently viewed: {str(e)}")
+
+
+def recent_bouquet_ids(user_id, limit=None):
+    """IDs of the bouquets the user viewed, newest first"""
+    ids = [bouquet_id for bouquet_id, _viewed_at in get_buffer(user_id)]
+    return ids[:limit] if limit else ids
+
+
+def _write_buffers(buffers):
+    """Upsert the buffered views and delete each user's rows that are no longer in the buffer"""
+    from accounts.models import CustomUser
+    from masters.models import Bouquet, RecentlyViewed
+
+    bouquet_ids = {bouquet_id for buffer in buffers.values() for bouquet_id, _viewed_at in buffer}
+    existing_bouquets = set(Bouquet.objects.filter(id__in=bouquet_ids).values_list('id', flat=True))
+    existing_users = set(CustomUser.objects.filter(id__in=buffers).values_list('id', flat=True))
+
+    rows = []
+    trim = Q()
+    for user_id, buffer in buffers.items():
+        if user_id not in existing_users:
+            continue
+        kept = [entry for entry in buffer if entry[0] in existing_bouquets]
+        rows.extend(
+            RecentlyViewed(
+                user_id=user_id,
+                bouquet_id=bouquet_id,
+                viewed_at=datetime.fromtimestamp(viewed_at, tz=dt_timezone.utc),
+            )
+            for bouquet_id, viewed_at in kept
+        )
+        trim |= Q(user_id=user_id) & ~Q(bouquet_id__in=[bouquet_id for bouquet_id, _viewed_at in kept])
+
+    # MySQL upserts on any unique key and does not take the target columns
+    unique_fields = ['user', 'bouquet'] if connection.features.supports_update_conflicts_with_target else None
+    with transaction.atomic():
+        if rows:
+            RecentlyViewed.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=unique_fields, update_fields=['viewed_at'],
+            )
+        trimmed = RecentlyViewed.objects.filter(trim).delete()[0] if trim else 0
+    return len(rows), trimmed
+
+
+def flush_recently_viewed(batch_size=RECENTLY_VIEWED_FLUSH_BATCH_SIZE):
+    """
+    Write every queued user's buffer to RecentlyViewed in batches.
+    Returns (users flushed, rows upserted, rows trimmed).
+    """
+    head = cache.get(QUEUE_SEQUENCE_KEY)
+    if head is None:
+        # Nothing queued since the counter was lost; _next_sequence continues after the flushed mark
+        return 0, 0, 0
+    flushed = cache.get(QUEUE_FLUSHED_KEY) or 0
+    if head < flushed:
+        # The counter was lost and restarted from 0: all of its sequences are unflushed
+        logger.warning(f"Recently viewed queue counter behind the flushed mark ({head} < {flushed}), rescanning")
+        flushed = 0
+        cache.set(QUEUE_FLUSHED_KEY, 0, None)
+    users = upserted = trimmed = 0
+
+    for start in range(flushed + 1, head + 1, batch_size):
+        stop = min(start + batch_size, head + 1)
+        queue_keys = [_queue_key(sequence) for sequence in range(start, stop)]
+        user_ids = set(cache.get_many(queue_keys).values())
+        # Unmark first, so a view recorded during the write queues the user again
+        cache.delete_many([_pending_key(user_id) for user_id in user_ids])
+        buffers = cache.get_many([_buffer_key(user_id) for user_id in user_ids])
+        buffers = {user_id: buffers[_buffer_key(user_id)] for user_id in user_ids if _buffer_key(user_id) in buffers}
+
+        if buffers:
+            batch_upserted, batch_trimmed = _write_buffers(buffers)
+            upserted += batch_upserted
+            trimmed += batch_trimmed
+            users += len(buffers)
+        cache.delete_many(queue_keys)
+        cache.set(QUEUE_FLUSHED_KEY, stop - 1, None)
+
+    if users:
+        logger.info(f"Flushed recently viewed of {users} user(s): {upserted} upserted, {trimmed} trimmed")
+    return users, upserted, trimmed
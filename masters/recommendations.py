@@ -0,0 +1,180 @@
+# masters/recommendations.py
+"""
+Offline product recommendations.
+
+build_recommendations() (the build_recommendations command, run nightly from
+cron) scores every pair of active bouquets from three co-occurrence signals:
+
+* occasions    bouquets tagged with the same occasion (BouquetOccasion)
+* co-views     bouquets in the same customer's recently viewed list
+* co-purchases bouquets in the same (not cancelled) order
+
+Each signal is a set of baskets (an occasion, a customer, an order). The pair
+counts are computed with NumPy over the whole table at once. Each count is
+normalized to a cosine score, count / sqrt(baskets of a * baskets of b), so
+bouquets that are simply everywhere do not crowd out the rest. The weighted
+signals are then summed.
+
+The top RECOMMENDATIONS_PER_BOUQUET neighbours of every bouquet are stored in
+``bouquet_recommendation``, 'related' from all three signals and
+'bought_together' from co-purchases alone. The product page reads them in rank
+order with one indexed query (masters.catalog.get_product_page).
+"""
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from masters.models import Bouquet, BouquetOccasion, BouquetRecommendation, RecentlyViewed
+from rose_and_roots.caching import RECOMMENDATION, bump_namespaces
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_PER_BOUQUET = getattr(settings, 'RECOMMENDATIONS_PER_BOUQUET', 12)
+# A basket of n bouquets yields n² pairs and says little about any one of them
+RECOMMENDATION_MAX_BASKET_SIZE = getattr(settings, 'RECOMMENDATION_MAX_BASKET_SIZE', 500)
+
+SIGNAL_WEIGHTS = {
+    'occasion': 1.0,
+    'view': 2.0,
+    'purchase': 4.0,
+}
+
+WRITE_BATCH_SIZE = 5000
+
+
+def _indexed(pairs, bouquet_ids):
+    """
+    (baskets, items) arrays of (basket_id, bouquet_id) rows, items as positions
+    in the sorted bouquet_ids array; rows of other bouquets are dropped
+    """
+    rows = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+    if not len(bouquet_ids):
+        rows = rows[:0]
+    baskets, bouquets = rows[:, 0], rows[:, 1]
+    items = np.searchsorted(bouquet_ids, bouquets)
+    known = (items < len(bouquet_ids)) & (bouquet_ids[np.minimum(items, len(bouquet_ids) - 1)] == bouquets)
+    return baskets[known], items[known]
+
+
+def _ranges(starts, lengths):
+    """np.concatenate([np.arange(s, s + n) for s, n in zip(starts, lengths)]) without the loop"""
+    first = np.cumsum(lengths) - lengths
+    return np.repeat(starts - first, lengths) + np.arange(lengths.sum())
+
+
+def cooccurrence(baskets, items, size, max_basket_size=RECOMMENDATION_MAX_BASKET_SIZE):
+    """
+    Cosine co-occurrence of items sharing a basket, as sparse (rows, cols, scores)
+    over items 0..size-1, both directions of every pair and no diagonal
+    """
+    empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+
+    # One entry per (basket, item), grouped by basket
+    order = np.lexsort((items, baskets))
+    baskets, items = baskets[order], items[order]
+    distinct = np.ones(len(baskets), dtype=bool)
+    distinct[1:] = (baskets[1:] != baskets[:-1]) | (items[1:] != items[:-1])
+    baskets, items = baskets[distinct], items[distinct]
+    if not len(items):
+        return empty
+
+    starts = np.flatnonzero(np.r_[True, baskets[1:] != baskets[:-1]])
+    sizes = np.diff(np.r_[starts, len(items)])
+    usable = (sizes > 1) & (sizes <= max_basket_size)
+    frequency = np.bincount(items, minlength=size)
+    starts, sizes = starts[usable], sizes[usable]
+    if not len(starts):
+        return empty
+
+    # Every (left, right) position pair within each basket: each of a basket's
+    # n entries is paired with the n entries starting at the basket start
+    members = _ranges(starts, sizes)
+    member_sizes = np.repeat(sizes, sizes)
+    left = np.repeat(members, member_sizes)
+    right = _ranges(np.repeat(starts, sizes), member_sizes)
+
+    rows, cols = items[left], items[right]
+    off_diagonal = rows != cols
+    keys, counts = np.unique(rows[off_diagonal] * size + cols[off_diagonal], return_counts=True)
+    rows, cols = keys // size, keys % size
+    return rows, cols, counts / np.sqrt(frequency[rows] * frequency[cols])
+
+
+def combine(signals, size):
+    """Weighted sum of sparse (rows, cols, scores) signals: [(weight, signal), ...]"""
+    keys = np.concatenate([rows * size + cols for _weight, (rows, cols, _scores) in signals])
+    scores = np.concatenate([weight * scores for weight, (_rows, _cols, scores) in signals])
+    if not len(keys):
+        return keys, keys, scores
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return keys // size, keys % size, np.bincount(inverse, weights=scores)
+
+
+def top_neighbours(rows, cols, scores, limit):
+    """The limit best (rows, cols, scores, ranks) per row, ranks from 0, ties by column"""
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else np.empty(0, dtype=np.int64)
+    ranks = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    best = ranks < limit
+    return rows[best], cols[best], scores[best], ranks[best]
+
+
+def load_signals(bouquet_ids):
+    """(baskets, items) of each signal for the given sorted bouquet ID array"""
+    from store.models import OrderItem
+
+    occasions = BouquetOccasion.objects.filter(occasion__isnull=False, bouquet__isnull=False)
+    views = RecentlyViewed.objects.all()
+    purchases = OrderItem.objects.filter(bouquet__isnull=False).exclude(order__status='cancelled')
+    return {
+        'occasion': _indexed(occasions.values_list('occasion_id', 'bouquet_id').iterator(), bouquet_ids),
+        'view': _indexed(views.values_list('user_id', 'bouquet_id').iterator(), bouquet_ids),
+        'purchase': _indexed(purchases.values_list('order_id', 'bouquet_id').iterator(), bouquet_ids),
+    }
+
+
+def compute_recommendations(bouquet_ids, signals, limit=RECOMMENDATIONS_PER_BOUQUET):
+    """{kind: (bouquet_ids, recommended_ids, scores, ranks)} arrays from loaded signals"""
+    size = len(bouquet_ids)
+    pairs = {name: cooccurrence(baskets, items, size) for name, (baskets, items) in signals.items()}
+    kinds = {
+        BouquetRecommendation.RELATED: combine([(SIGNAL_WEIGHTS[name], pairs[name]) for name in SIGNAL_WEIGHTS], size),
+        BouquetRecommendation.BOUGHT_TOGETHER: pairs['purchase'],
+    }
+
+    result = {}
+    for kind, (rows, cols, scores) in kinds.items():
+        rows, cols, scores, ranks = top_neighbours(rows, cols, scores, limit)
+        result[kind] = (bouquet_ids[rows], bouquet_ids[cols], scores, ranks)
+    return result
+
+
+def build_recommendations(limit=RECOMMENDATIONS_PER_BOUQUET):
+    """Recompute and replace every stored recommendation; returns rows written per kind"""
+    bouquet_ids = np.array(
+        sorted(Bouquet.objects.filter(is_active=1).values_list('id', flat=True)), dtype=np.int64
+    )
+    recommendations = compute_recommendations(bouquet_ids, load_signals(bouquet_ids), limit)
+
+    written = {}
+    with transaction.atomic():
+        BouquetRecommendation.objects.all().delete()
+        for kind, (sources, targets, scores, ranks) in recommendations.items():
+            BouquetRecommendation.objects.bulk_create(
+                (
+                    BouquetRecommendation(
+                        bouquet_id=int(source), kind=kind, rank=int(rank) + 1,
+                        recommended_id=int(target), score=float(score),
+                    )
+                    for source, target, score, rank in zip(sources, targets, scores, ranks)
+                ),
+                batch_size=WRITE_BATCH_SIZE,
+            )
+            written[kind] = len(sources)
+        bump_namespaces(RECOMMENDATION)
+
+    logger.info(f"Recommendations rebuilt for {len(bouquet_ids)} bouquet(s): {written}")
+    return written
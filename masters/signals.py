@@ -0,0 +1,46 @@
+# masters/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import CustomUser
+from masters.models import Bouquet, BouquetImage, BouquetOccasion, Occasion, parameter_master
+from masters.site_settings import SITE_SETTING_PARAMETERS, invalidate_site_settings
+from rose_and_roots.caching import BOUQUET, OCCASION, PARAMETER, bump_namespaces
+
+
+# ---------------- CATALOG CACHE ---------------- #
+
+@receiver([post_save, post_delete], sender=Bouquet)
+@receiver([post_save, post_delete], sender=BouquetImage)
+@receiver([post_save, post_delete], sender=BouquetOccasion)
+def bouquet_changed(sender, instance, **kwargs):
+    bump_namespaces(BOUQUET)
+
+
+@receiver([post_save, post_delete], sender=Occasion)
+def occasion_changed(sender, instance, **kwargs):
+    # Occasion names are shown on bouquet pages too
+    bump_namespaces(OCCASION, BOUQUET)
+
+
+@receiver([post_save, post_delete], sender=parameter_master)
+def parameter_changed(sender, instance, **kwargs):
+    if instance.parameter_name == 'Product Categories':
+        # Category names are shown on bouquet pages too
+        bump_namespaces(PARAMETER, BOUQUET)
+    else:
+        bump_namespaces(PARAMETER)
+
+    if instance.parameter_name in SITE_SETTING_PARAMETERS.values():
+        invalidate_site_settings()
+
+
+# ---------------- SITE SETTINGS ---------------- #
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    # Logins only touch last_login - the admin contact details are unchanged
+    update_fields = kwargs.get('update_fields')
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_site_settings()
@@ -0,0 +1,108 @@
+# masters/site_settings.py
+"""
+Site-wide settings provider.
+
+Global values the storefront needs on every page (e.g. the admin WhatsApp
+number) are read from ``parameter_master`` rows, falling back to derived
+values and then to project settings. They are loaded once per process and
+kept in a versioned cache entry; bumping the version (after an admin edits
+users or parameters) makes every worker reload on its next request.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import CustomUser
+from masters.models import parameter_master
+
+logger = logging.getLogger(__name__)
+
+SITE_SETTINGS_VERSION_KEY = 'site_settings:version'
+
+# How often (seconds) a worker checks the shared version key
+SITE_SETTINGS_CHECK_INTERVAL = 5
+
+# setting key -> parameter_master.parameter_name that overrides it
+SITE_SETTING_PARAMETERS = {
+    'admin_whatsapp': 'Admin WhatsApp Number',
+}
+
+_lock = threading.Lock()
+_loaded = {'version': None, 'values': None, 'checked_at': 0}
+
+
+def _default_admin_whatsapp():
+    admin_user = CustomUser.objects.filter(role_id=1, is_active=True).only('phone').first()
+    if admin_user and admin_user.phone:
+        return admin_user.phone
+    return settings.DEFAULT_ADMIN_WHATSAPP
+
+
+def _load_values():
+    """Read every site setting from the database"""
+    overrides = dict(
+        parameter_master.objects.filter(
+            parameter_name__in=SITE_SETTING_PARAMETERS.values(),
+            isactive=1
+        ).order_by('parameter_id').values_list('parameter_name', 'parameter_value')
+    )
+
+    values = {}
+    for key, parameter_name in SITE_SETTING_PARAMETERS.items():
+        value = (overrides.get(parameter_name) or '').strip()
+        values[key] = value or None
+
+    if not values['admin_whatsapp']:
+        values['admin_whatsapp'] = _default_admin_whatsapp()
+
+    return values
+
+
+def _values_cache_key(version):
+    return f"site_settings:values:{version}"
+
+
+def get_site_settings():
+    """All site settings as a dict - no queries once loaded in this process"""
+    now = time.monotonic()
+    if _loaded['values'] is not None and now - _loaded['checked_at'] < SITE_SETTINGS_CHECK_INTERVAL:
+        return _loaded['values']
+
+    with _lock:
+        version = cache.get(SITE_SETTINGS_VERSION_KEY)
+        if version is None:
+            version = time.time_ns()
+            cache.add(SITE_SETTINGS_VERSION_KEY, version, None)
+            version = cache.get(SITE_SETTINGS_VERSION_KEY, version)
+
+        if _loaded['values'] is None or _loaded['version'] != version:
+            values = cache.get(_values_cache_key(version))
+            if values is None:
+                try:
+                    values = _load_values()
+                except Exception as e:
+                    logger.exception(f"Failed to load site settings: {str(e)}")
+                    return _loaded['values'] or {'admin_whatsapp': settings.DEFAULT_ADMIN_WHATSAPP}
+                cache.set(_values_cache_key(version), values, None)
+            _loaded['values'] = values
+            _loaded['version'] = version
+
+        _loaded['checked_at'] = now
+        return _loaded['values']
+
+
+def get_site_setting(key, default=None):
+    return get_site_settings().get(key, default)
+
+
+def invalidate_site_settings():
+    """Make every worker reload site settings once the current transaction commits"""
+    def bump():
+        cache.set(SITE_SETTINGS_VERSION_KEY, time.time_ns(), None)
+        _loaded['checked_at'] = 0
+
+    transaction.on_commit(bump)
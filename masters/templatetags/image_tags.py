@@ -0,0 +1,76 @@
+# masters/templatetags/image_tags.py
+from django import template
+from django.conf import settings
+from django.utils.html import format_html
+
+from masters.image_resize import resized_url
+from masters.image_variants import VARIANT_SIZES, variant_path
+
+register = template.Library()
+
+# Preset -> ``sizes`` attribute: how wide the image is laid out
+IMAGE_SIZES = {
+    'thumb': '80px',
+    'card': '(max-width: 576px) 50vw, (max-width: 992px) 33vw, 300px',
+    'detail': '(max-width: 992px) 100vw, 600px',
+}
+
+
+def _preset_box(preset, default):
+    width = VARIANT_SIZES.get(preset, VARIANT_SIZES[default])
+    return f"{width}x{width}"
+
+
+def _srcset(image_path, widths, fmt):
+    return ', '.join(f"{settings.MEDIA_URL}{variant_path(image_path, width, fmt)} {width}w" for width in widths)
+
+
+@register.simple_tag
+def responsive_image(image_path, widths=None, preset='card', alt='', css_class='', loading='lazy', **attrs):
+    """
+    <picture> with WebP and JPEG srcsets of a bouquet image's derivatives, or a
+    plain <img> resized on the fly while they have not been rendered yet.
+
+        {% responsive_image bouquet.primary_image bouquet.primary_image_widths 'card' alt=bouquet.name css_class='img-fluid' %}
+    """
+    if not image_path:
+        return ''
+
+    extra = format_html(''.join(f' {name.replace("_", "-")}="{{}}"' for name in attrs), *attrs.values())
+
+    if not widths:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async"{}>',
+            resized_url(image_path, _preset_box(preset, 'card')), alt, css_class, loading, extra,
+        )
+
+    sizes = IMAGE_SIZES.get(preset, IMAGE_SIZES['card'])
+    # Fallback src: the smallest derivative at least as wide as the preset
+    target = VARIANT_SIZES.get(preset, VARIANT_SIZES['card'])
+    fallback = next((width for width in widths if width >= target), widths[-1])
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}" decoding="async"{}></picture>',
+        _srcset(image_path, widths, 'webp'), sizes,
+        settings.MEDIA_URL, variant_path(image_path, fallback, 'jpeg'), _srcset(image_path, widths, 'jpeg'), sizes,
+        alt, css_class, loading, extra,
+    )
+
+
+@register.simple_tag
+def image_variant_url(image_path, widths=None, preset='detail'):
+    """URL of the JPEG derivative best suited to a preset (resized on the fly until rendered)"""
+    if not image_path:
+        return ''
+    if not widths:
+        return resized_url(image_path, _preset_box(preset, 'detail'))
+    target = VARIANT_SIZES.get(preset, VARIANT_SIZES['detail'])
+    width = next((width for width in widths if width >= target), widths[-1])
+    return f"{settings.MEDIA_URL}{variant_path(image_path, width, 'jpeg')}"
+
+
+@register.simple_tag
+def resized_image_url(image_path, size='128x128'):
+    """URL of any resizable media image fitted inside one of IMAGE_RESIZE_SIZES"""
+    return resized_url(str(image_path or ''), size)
@@ -1,3 +1,294 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import CustomUser
+from masters.catalog import get_category_summary
+from masters.media_gc import collect_media_garbage, sweep_orphans
+from masters.media_storage import add_bouquet_image, release_bouquet_images
+from masters.models import Bouquet, BouquetImage, MediaBlob, MediaDeletion, Occasion, RecentlyViewed, parameter_master
+from masters.recently_viewed import (
+    QUEUE_FLUSHED_KEY, QUEUE_SEQUENCE_KEY, flush_recently_viewed, recent_bouquet_ids, record_view,
+)
+from rose_and_roots.encryption import enc
+
+
+class CategorySummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = parameter_master.objects.create(parameter_name='Product Categories', parameter_value='Roses')
+        Bouquet.objects.create(name='Red Roses', slug='red-roses', price=Decimal('100.00'), category=self.category)
+
+    def summary(self):
+        return [(category.parameter_value, category.bouquet_count) for category in get_category_summary()]
+
+    def test_renamed_category_is_not_served_stale(self):
+        self.assertEqual(self.summary(), [('Roses', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.parameter_value = 'Garden Roses'
+            self.category.save()
+        self.assertEqual(self.summary(), [('Garden Roses', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.isactive = 0
+            self.category.save()
+        self.assertEqual(self.summary(), [])
+
+    def test_counts_follow_bouquet_changes(self):
+        self.assertEqual(self.summary(), [('Roses', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Bouquet.objects.create(name='White Roses', slug='white-roses', price=Decimal('100.00'), category=self.category)
+        self.assertEqual(self.summary(), [('Roses', 2)])
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        category = parameter_master.objects.create(parameter_name='Product Categories', parameter_value='Roses')
+        Bouquet.objects.create(name='Red Roses', slug='red-roses', price=Decimal('100.00'), category=category, is_featured=1)
+        Bouquet.objects.create(name='Mixed', slug='mixed', price=Decimal('100.00'), is_featured=1)
+        customer = CustomUser.objects.create_user(
+            email='customer@example.com', password='Passw0rd!', role_id=2,
+            first_name='Asha', last_name='Rao', full_name='Asha Rao',
+        )
+        self.client.defaults.update(HTTP_HOST='localhost:8000', HTTP_REFERER='http://localhost:8000/')
+        self.client.force_login(customer)
+
+    def test_categories_and_featured_products(self):
+        response = self.client.get('/dashboard/')
+
+        self.assertContains(response, '1 items')
+        categories = response.context['categories']
+        self.assertEqual([(c.parameter_value, c.bouquet_count) for c in categories], [('Roses', 1)])
+        featured = {product.name: product.category_name for product in response.context['featured_products']}
+        self.assertEqual(featured, {'Red Roses': 'Roses', 'Mixed': ''})
+
+
+class EditBouquetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = parameter_master.objects.create(parameter_name='Product Categories', parameter_value='Roses')
+        self.occasion = Occasion.objects.create(name='Birthday', slug='birthday')
+        self.bouquet = Bouquet.objects.create(name='Red Roses', slug='red-roses', price=Decimal('100.00'), category=self.category)
+        admin = CustomUser.objects.create_user(email='admin@example.com', password='Passw0rd!', role_id=1, full_name='Admin')
+        self.client.defaults.update(HTTP_HOST='localhost:8000', HTTP_REFERER='http://localhost:8000/bouquets/')
+        self.client.force_login(admin)
+
+    def test_edit_does_not_write_the_popularity_score(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(f'/edit_bouquet/?bouquet_id={enc(str(self.bouquet.id))}', {
+                'bouquet_name': 'Garden Roses',
+                'short_description': 'Short',
+                'description': 'Long',
+                'category': enc(str(self.category.pk)),
+                'price': '120',
+                'occasions': str(self.occasion.id),
+            })
+
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "bouquet"')]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('popularity_score', updates[0])
+        self.bouquet.refresh_from_db()
+        self.assertEqual((self.bouquet.name, self.bouquet.slug, self.bouquet.price), ('Garden Roses', 'garden-roses', Decimal('120.00')))
+
+
+class RecentlyViewedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='viewer@example.com', password='Passw0rd!', full_name='Viewer')
+        self.bouquets = [
+            Bouquet.objects.create(name=f'Bouquet {i}', slug=f'bouquet-{i}', price=Decimal('100.00'))
+            for i in range(3)
+        ]
+
+    def stored_ids(self):
+        return list(
+            RecentlyViewed.objects.filter(user=self.user).order_by('-viewed_at').values_list('bouquet_id', flat=True)
+        )
+
+    @override_settings(RECENTLY_VIEWED_BUFFERED=True)
+    def test_buffered_views_are_written_by_the_flush(self):
+        record_view(self.user.id, self.bouquets[0].id)
+        record_view(self.user.id, self.bouquets[1].id)
+        self.assertFalse(RecentlyViewed.objects.exists())
+
+        self.assertEqual(flush_recently_viewed()[0], 1)
+        self.assertEqual(self.stored_ids(), [self.bouquets[1].id, self.bouquets[0].id])
+
+    @override_settings(RECENTLY_VIEWED_BUFFERED=True)
+    def test_lost_queue_counter_does_not_strand_views(self):
+        record_view(self.user.id, self.bouquets[0].id)
+        other = CustomUser.objects.create_user(email='other@example.com', password='Passw0rd!', full_name='Other')
+        record_view(other.id, self.bouquets[0].id)
+        flush_recently_viewed()
+
+        # Evicted counter, and a pending flag whose queue entry was flushed long ago
+        cache.delete(QUEUE_SEQUENCE_KEY)
+        record_view(self.user.id, self.bouquets[2].id)
+        self.assertGreater(cache.get(QUEUE_SEQUENCE_KEY), cache.get(QUEUE_FLUSHED_KEY))
+
+        flush_recently_viewed()
+        self.assertEqual(self.stored_ids(), [self.bouquets[2].id, self.bouquets[0].id])
+
+    @override_settings(RECENTLY_VIEWED_BUFFERED=True)
+    def test_counter_behind_flushed_mark_is_rescanned(self):
+        record_view(self.user.id, self.bouquets[0].id)
+        flush_recently_viewed()
+        cache.set(QUEUE_FLUSHED_KEY, 50, None)
+        cache.set(QUEUE_SEQUENCE_KEY, 0, None)
+
+        record_view(self.user.id, self.bouquets[1].id)
+        flush_recently_viewed()
+        self.assertEqual(self.stored_ids(), [self.bouquets[1].id, self.bouquets[0].id])
+
+    @override_settings(RECENTLY_VIEWED_BUFFERED=False)
+    def test_unbuffered_views_are_written_through(self):
+        record_view(self.user.id, self.bouquets[0].id)
+        record_view(self.user.id, self.bouquets[1].id)
+
+        self.assertEqual(self.stored_ids(), [self.bouquets[1].id, self.bouquets[0].id])
+        self.assertEqual(recent_bouquet_ids(self.user.id), self.stored_ids())
+
+
+class MediaStorageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+
+        self.category = parameter_master.objects.create(parameter_name='Product Categories', parameter_value='Roses')
+        self.occasion = Occasion.objects.create(name='Birthday', slug='birthday')
+        self.bouquets = [
+            Bouquet.objects.create(name=f'Bouquet {i}', slug=f'bouquet-{i}', price=Decimal('100.00'), category=self.category)
+            for i in range(2)
+        ]
+
+    def upload(self, content=b'rose photo'):
+        return SimpleUploadedFile('rose.jpg', content, content_type='image/jpeg')
+
+    def add_image(self, bouquet, content=b'rose photo'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return add_bouquet_image(bouquet, self.upload(content))
+
+    def release(self, images):
+        with self.captureOnCommitCallbacks(execute=True):
+            release_bouquet_images(images)
+            images.delete()
+
+    def stored(self, path):
+        return os.path.exists(os.path.join(self.media_root, path))
+
+    def make_old_file(self, path):
+        absolute = os.path.join(self.media_root, path)
+        os.makedirs(os.path.dirname(absolute), exist_ok=True)
+        with open(absolute, 'wb') as f:
+            f.write(b'x' * 10)
+        old = time.time() - 2 * 24 * 60 * 60
+        os.utime(absolute, (old, old))
+
+    def test_same_content_is_stored_once(self):
+        first = self.add_image(self.bouquets[0])
+        second = self.add_image(self.bouquets[1])
+        other = self.add_image(self.bouquets[1], b'lily photo')
+
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(first.image_path, second.image_path)
+        self.assertNotEqual(first.blob_id, other.blob_id)
+        self.assertEqual(MediaBlob.objects.get(pk=first.blob_id).ref_count, 2)
+        self.assertTrue(self.stored(first.image_path))
+
+    def test_blob_is_collected_after_its_last_reference(self):
+        image = self.add_image(self.bouquets[0])
+        self.add_image(self.bouquets[1])
+
+        self.release(BouquetImage.objects.filter(bouquet=self.bouquets[0]))
+        collect_media_garbage()
+        self.assertEqual(MediaBlob.objects.get(pk=image.blob_id).ref_count, 1)
+        self.assertTrue(self.stored(image.image_path))
+
+        self.release(BouquetImage.objects.filter(bouquet=self.bouquets[1]))
+        self.assertEqual(collect_media_garbage()[1], 1)
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(MediaDeletion.objects.exists())
+        self.assertFalse(self.stored(image.image_path))
+
+    def test_collect_removes_rendered_variants(self):
+        image = self.add_image(self.bouquets[0])
+        stem = os.path.splitext(os.path.basename(image.image_path))[0]
+        variant = os.path.join(os.path.dirname(image.image_path), 'variants', f'{stem}-160.webp')
+        self.make_old_file(variant)
+
+        self.release(BouquetImage.objects.filter(pk=image.pk))
+        self.assertEqual(collect_media_garbage()[1], 2)
+        self.assertFalse(self.stored(variant))
+
+    def test_photo_removed_in_edit_form_is_collected(self):
+        admin = CustomUser.objects.create_user(email='admin@example.com', password='Passw0rd!', role_id=1, full_name='Admin')
+        client = self.client
+        client.defaults.update(HTTP_HOST='localhost:8000', HTTP_REFERER='http://localhost:8000/bouquets/')
+        client.force_login(admin)
+        edited = self.add_image(self.bouquets[0])
+        self.add_image(self.bouquets[1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post(f'/edit_bouquet/?bouquet_id={enc(str(self.bouquets[0].id))}', {
+                'bouquet_name': 'Bouquet 0',
+                'short_description': 'Short',
+                'description': 'Long',
+                'category': enc(str(self.category.pk)),
+                'price': '100',
+                'occasions': str(self.occasion.id),
+                'images_to_delete': str(edited.id),
+            })
+        self.assertFalse(BouquetImage.objects.filter(pk=edited.pk).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/delete_bouquet/', {'bouquet_id': enc(str(self.bouquets[1].id))})
+        collect_media_garbage()
+
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(self.stored(edited.image_path))
+
+    def test_dry_run_leaves_the_queue_alone(self):
+        image = self.add_image(self.bouquets[0])
+        self.release(BouquetImage.objects.filter(pk=image.pk))
+
+        out = StringIO()
+        call_command('collect_media_garbage', '--dry-run', stdout=out)
+        self.assertIn('1 queued deletion(s) left unprocessed', out.getvalue())
+        self.assertTrue(MediaDeletion.objects.exists())
+        self.assertTrue(self.stored(image.image_path))
+
+        call_command('collect_media_garbage', stdout=StringIO())
+        self.assertFalse(MediaDeletion.objects.exists())
+        self.assertFalse(self.stored(image.image_path))
+
+    def test_sweep_removes_unreferenced_files(self):
+        image = self.add_image(self.bouquets[0])
+        self.make_old_file(image.image_path)
+        for path in ('bouquets/7/stray.jpg', 'bouquets/7/variants/stray-160.webp', 'bouquets/blobs/.upload-1'):
+            self.make_old_file(path)
+        self.make_old_file('bouquets/7/recent.jpg')
+        os.utime(os.path.join(self.media_root, 'bouquets/7/recent.jpg'))
+
+        self.assertEqual(sweep_orphans(dry_run=True)[0], 3)
+        self.assertTrue(self.stored('bouquets/7/stray.jpg'))
+
+        self.assertEqual(sweep_orphans()[0], 3)
+        self.assertTrue(self.stored(image.image_path))
+        self.assertTrue(self.stored('bouquets/7/recent.jpg'))
+        self.assertFalse(self.stored('bouquets/7/stray.jpg'))
+        self.assertFalse(self.stored('bouquets/7/variants'))
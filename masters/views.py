@@ -1,11 +1,9 @@
-import uuid
-import os
 import re
 import json
 import logging
 from decimal import Decimal, InvalidOperation
 
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404, HttpResponseNotModified
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -19,6 +17,20 @@ from accounts.models import *
 from store.models import *
 from masters.models import *
 from rose_and_roots.encryption import *
+from masters.catalog import (
+    attach_listings, refresh_listing, refresh_listings, refresh_listings_for_occasion,
+    get_category_summary,
+)
+from store.facets import bouquets_changed
+from store.dashboard_metrics import (
+    get_daily_order_counts, get_popular_bouquets, record_order_status_change, refresh_review_stats,
+)
+from store.order_stats import get_order_stats, scope_orders
+from masters.image_resize import CONTENT_TYPES, cache_key, get_resized, is_allowed_size, locate_source
+from masters.media_storage import (
+    BOUQUET_BLOB_DIR, add_bouquet_image, can_view_media, is_protected_media, media_file_path,
+    release_bouquet_images, sendfile_response,
+)
 
 from django.core.paginator import Paginator
 from django.db.models import Q, Avg
@@ -27,12 +39,16 @@ from django.db import IntegrityError
 # views.py
 from django.contrib.auth import logout
 
-from django.core.mail import send_mail, BadHeaderError
+from django.core.mail import BadHeaderError
+from accounts.mail_queue import enqueue_email
+from accounts.directory import directory_counts, search_users
+from masters.recently_viewed import recent_bouquet_ids
 from django.views.decorators.csrf import csrf_protect
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 from masters.models import *
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_safe
+from django.utils.http import parse_etags
 
 from django.shortcuts import get_object_or_404
 
@@ -205,15 +221,13 @@ def send_contact_email(request):
         This message was sent from the LittleCraftOne contact form.
         """
         
-        # Send email to admin
+        # Queue email to admin
         try:
-            send_mail(
+            enqueue_email(
                 subject=email_subject,
-                message=email_text,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=['littlecraftone.support@gmail.com'],
-                html_message=email_html,
-                fail_silently=False,
+                body=email_text,
+                to=['littlecraftone.support@gmail.com'],
+                html_body=email_html,
             )
         except BadHeaderError:
             return JsonResponse({
@@ -221,7 +235,7 @@ def send_contact_email(request):
                 'message': 'Invalid header found.'
             })
         except Exception as e:
-            logger.error(f"Email sending error: {str(e)}")
+            logger.error(f"Email queueing error: {str(e)}")
             return JsonResponse({
                 'success': False,
                 'message': 'Unable to send message. Please try again or contact us on WhatsApp.'
@@ -280,13 +294,11 @@ def send_contact_email(request):
         """
         
         try:
-            send_mail(
+            enqueue_email(
                 subject="Thank you for contacting LittleCraftOne! ✨",
-                message=f"Thank you for contacting LittleCraftOne! We'll get back to you within 24 hours.\n\nYour message: {message[:100]}",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                html_message=auto_reply_html,
-                fail_silently=True,  # Don't fail if auto-reply fails
+                body=f"Thank you for contacting LittleCraftOne! We'll get back to you within 24 hours.\n\nYour message: {message[:100]}",
+                to=[email],
+                html_body=auto_reply_html,
             )
         except Exception as e:
             logger.warning(f"Auto-reply failed: {str(e)}")
@@ -319,10 +331,17 @@ def admin_dashboard(request):
         from datetime import timedelta
         from django.db.models import Count, Sum, Q
         
+        # ===== ORDER METRICS =====
+        order_stats = get_order_stats()
+        
         # ===== QUICK STATS =====
         total_users = CustomUser.objects.count()
-        total_orders = Order.objects.count()
-        total_products = Bouquet.objects.filter(is_active=1).count()
+        total_orders = order_stats['total_orders']
+        product_counts = Bouquet.objects.aggregate(
+            active=Count('id', filter=Q(is_active=1)),
+            inactive=Count('id', filter=Q(is_active=0)),
+        )
+        total_products = product_counts['active']
         
         # ===== RECENT INQUIRIES =====
         recent_inquiries = []
@@ -332,8 +351,12 @@ def admin_dashboard(request):
         try:
             from masters.models import ContactInquiry
             recent_inquiries = ContactInquiry.objects.order_by('-created_at')[:5]
-            total_inquiries = ContactInquiry.objects.count()
-            total_pending_inquiries = ContactInquiry.objects.filter(is_resolved=False).count()
+            inquiry_counts = ContactInquiry.objects.aggregate(
+                total=Count('id'),
+                pending=Count('id', filter=Q(is_resolved=False)),
+            )
+            total_inquiries = inquiry_counts['total']
+            total_pending_inquiries = inquiry_counts['pending']
             
             # Add encrypted IDs to recent inquiries
             for inquiry in recent_inquiries:
@@ -344,7 +367,7 @@ def admin_dashboard(request):
         except Exception as e:
             logger.warning(f"Error fetching inquiries: {e}")
         
-        total_reviews = Review.objects.count()
+        total_reviews = BouquetReviewStat.objects.aggregate(total=Sum('review_count'))['total'] or 0
         total_categories = parameter_master.objects.filter(
             parameter_name='Product Categories', 
             isactive=1
@@ -352,16 +375,16 @@ def admin_dashboard(request):
         total_occasions = Occasion.objects.filter(is_active=1).count()
         
         # Order stats by status
-        pending_orders = Order.objects.filter(status='pending').count()
-        processing_orders = Order.objects.filter(status='processing').count()
-        delivered_orders = Order.objects.filter(status='delivered').count()
-        cancelled_orders = Order.objects.filter(status='cancelled').count()
+        status_counts = order_stats['status_counts']
+        pending_orders = status_counts['pending']
+        processing_orders = status_counts['processing']
+        delivered_orders = status_counts['delivered']
+        cancelled_orders = status_counts['cancelled']
         
         # Revenue stats
-        total_revenue = Order.objects.aggregate(total=Sum('total'))['total'] or 0
-        this_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_revenue = Order.objects.filter(order_date__gte=this_month).aggregate(total=Sum('total'))['total'] or 0
-        monthly_orders = Order.objects.filter(order_date__gte=this_month).count()
+        total_revenue = order_stats['total_revenue']
+        monthly_revenue = order_stats['monthly_revenue']
+        monthly_orders = order_stats['monthly_orders']
         
         # ===== RECENT ORDERS =====
         recent_orders = Order.objects.select_related('user').order_by('-order_date')[:8]
@@ -371,28 +394,16 @@ def admin_dashboard(request):
         # ===== RECENT USERS =====
         recent_users = CustomUser.objects.order_by('-date_joined')[:6]
         
-        # ===== POPULAR PRODUCTS (by reviews) =====
-        popular_products = Bouquet.objects.filter(is_active=1).annotate(
-            review_count=Count('reviews')
-        ).order_by('-review_count')[:6]
-        
-        for product in popular_products:
-            product.encrypted_id = enc(str(product.id))
-            primary_image = product.images.filter(is_active=1).first()
-            product.primary_image = primary_image.image_path if primary_image else None
-            product.avg_rating = product.reviews.aggregate(avg=Avg('rating'))['avg'] or 0
+        # ===== POPULAR PRODUCTS (by popularity score) =====
+        popular_products = attach_listings(get_popular_bouquets(6))
         
         # ===== LOW STOCK / INACTIVE PRODUCTS =====
-        inactive_products = Bouquet.objects.filter(is_active=0).count()
+        inactive_products = product_counts['inactive']
         
         # ===== CHART DATA - Last 7 days orders =====
-        last_7_days = []
-        orders_last_7_days = []
-        for i in range(6, -1, -1):
-            date = timezone.now().date() - timedelta(days=i)
-            count = Order.objects.filter(order_date__date=date).count()
-            last_7_days.append(date.strftime('%a'))
-            orders_last_7_days.append(count)
+        daily_orders = get_daily_order_counts(days=7)
+        last_7_days = [date.strftime('%a') for date, _ in daily_orders]
+        orders_last_7_days = [count for _, count in daily_orders]
         
         context = {
             "page_title": "Admin Dashboard",
@@ -467,20 +478,13 @@ def dashboard(request):
             cart__user=user
         ).count() if Cart.objects.filter(user=user).exists() else 0
         
-        # 2. Products Browsed Count (if RecentlyViewed exists)
-        recently_viewed_count = 0
-        recently_viewed = []
-        try:
-            from masters.models import RecentlyViewed
-            recently_viewed_count = RecentlyViewed.objects.filter(user=user).count()
-            recent_views = RecentlyViewed.objects.filter(user=user).select_related('bouquet').order_by('-viewed_at')[:6]
-            for view in recent_views:
-                view.bouquet.encrypted_id = enc(str(view.bouquet.id))
-                primary_image = view.bouquet.images.filter(is_active=1).first()
-                view.bouquet.primary_image = primary_image.image_path if primary_image else None
-                recently_viewed.append(view.bouquet)
-        except ImportError:
-            pass
+        # 2. Products Browsed Count (from the cached recently viewed buffer)
+        viewed_ids = recent_bouquet_ids(user.id)
+        recently_viewed_count = len(viewed_ids)
+        viewed_bouquets = Bouquet.objects.in_bulk(viewed_ids[:6])
+        recently_viewed = attach_listings(
+            viewed_bouquets[bouquet_id] for bouquet_id in viewed_ids[:6] if bouquet_id in viewed_bouquets
+        )
         
         # 3. Reviews Count (from product_reviews table)
         reviews_count = Review.objects.filter(user=user).count()
@@ -499,17 +503,7 @@ def dashboard(request):
         missing_count = len(missing_fields)
         
         # ===== POPULAR CATEGORIES (from parameter_master) =====
-        categories = parameter_master.objects.filter(
-            parameter_name='Product Categories',
-            isactive=1
-        ).order_by('parameter_value')[:6]
-        
-        for category in categories:
-            category.encrypted_id = enc(str(category.parameter_id))
-            category.product_count = Bouquet.objects.filter(
-                category_id=category.parameter_id, 
-                is_active=1
-            ).count()
+        categories = get_category_summary()[:6]
         
         # ===== OCCASIONS (from occasion table) =====
         occasions = Occasion.objects.filter(is_active=1).order_by('name')[:6]
@@ -522,20 +516,10 @@ def dashboard(request):
             review.bouquet.encrypted_id = enc(str(review.bouquet.id))
         
         # ===== FEATURED PRODUCTS (from bouquet table) =====
-        featured_products = Bouquet.objects.filter(
+        featured_products = attach_listings(Bouquet.objects.filter(
             is_active=1, 
             is_featured=1
-        ).prefetch_related('images')[:4]
-        
-        for product in featured_products:
-            product.encrypted_id = enc(str(product.id))
-            primary_image = product.images.filter(is_active=1).first()
-            product.primary_image = primary_image.image_path if primary_image else None
-            product.category_name = product.category.parameter_value if product.category else ''
-        
-        # ===== ADMIN WHATSAPP =====
-        admin_user = CustomUser.objects.filter(role_id=1, is_active=True).first()
-        admin_whatsapp = admin_user.phone if admin_user else '918805433102'
+        )[:4], default_category='')
         
         context = {
             "page_title": "Dashboard",
@@ -562,7 +546,6 @@ def dashboard(request):
             "featured_products": featured_products,
             
             # Contact
-            "admin_whatsapp": admin_whatsapp,
             "MEDIA_URL": settings.MEDIA_URL,
         }
 
@@ -765,11 +748,6 @@ def add_bouquet(request):
 
                     allowed_types = ['image/jpeg', 'image/png', 'image/webp', 'image/gif']
 
-                    # Folder: bouquets/<bouquet_id>/
-                    relative_path = f"bouquets/{bouquet.id}/"
-                    upload_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-                    os.makedirs(upload_path, exist_ok=True)
-
                     for image_file in images:
 
                         if image_file.size > 6 * 1024 * 1024:
@@ -778,24 +756,8 @@ def add_bouquet(request):
                         if image_file.content_type not in allowed_types:
                             continue
 
-                        ext = os.path.splitext(image_file.name)[1]
-                        unique_filename = f"{uuid.uuid4().hex}{ext}"
-
-                        full_path = os.path.join(upload_path, unique_filename)
-
-                        with open(full_path, 'wb+') as destination:
-                            for chunk in image_file.chunks():
-                                destination.write(chunk)
-
-                        db_image_path = f"{relative_path}{unique_filename}"
-
-                        BouquetImage.objects.create(
-                            bouquet=bouquet,
-                            image_name=image_file.name,
-                            image_path=db_image_path,
-                            is_active=1,
-                            created_by=request.user.id
-                        )
+                        # Stored by content hash, shared with other bouquets using the same photo
+                        add_bouquet_image(bouquet, image_file, created_by=request.user.id)
 
                     # ---------------- OCCASIONS ---------------- #
 
@@ -810,6 +772,11 @@ def add_bouquet(request):
                             occasion=occasion
                         )
 
+                    # ---------------- LISTING PROJECTION ---------------- #
+
+                    refresh_listing(bouquet.id)
+                    bouquets_changed([bouquet.id])
+
                 messages.success(request, "Bouquet created successfully!")
                 return redirect('admin_dashboard')
 
@@ -867,7 +834,7 @@ def bouquet_list(request):
             return redirect('/')
         
         # Get all bouquets with related data including category
-        bouquets = Bouquet.objects.all().order_by('-created_at').select_related('category').prefetch_related('occasions', 'images')
+        bouquets = Bouquet.objects.all().order_by('-created_at').select_related('category')
         
         # Get all active occasions for the filter dropdown
         occasions = Occasion.objects.filter(is_active=1).order_by('name')
@@ -880,15 +847,9 @@ def bouquet_list(request):
         
         # Add encrypted IDs and additional data
         bouquet_list = []
-        for bouquet in bouquets:
-            bouquet.encrypted_id = enc(str(bouquet.id))
-            
-            # Get primary image (first active image)
-            primary_image = bouquet.images.filter(is_active=1).first()
-            bouquet.primary_image = primary_image.image_path if primary_image else None
-            
+        for bouquet in attach_listings(bouquets):
             # Get occasion names
-            occasion_names = [occ.name for occ in bouquet.occasions.all()]
+            occasion_names = bouquet.occasion_names
             bouquet.occasion_list = ', '.join(occasion_names[:3])  # Show first 3 occasions
             if len(occasion_names) > 3:
                 bouquet.occasion_list += f' +{len(occasion_names)-3} more'
@@ -1132,15 +1093,23 @@ def edit_bouquet(request):
                     bouquet.is_active = 1 if is_active == '1' else 0
                     bouquet.is_featured = 1 if is_featured == '1' else 0
                     
-                    bouquet.save()
+                    # Only the edited columns: popularity_score is updated in place by store.popularity
+                    bouquet.save(update_fields=[
+                        'slug', 'name', 'short_description', 'description', 'delivery_info', 'instruction_text',
+                        'price', 'discount_percent', 'discount_price', 'category', 'is_active', 'is_featured',
+                        'updated_at',
+                    ])
                     
                     # ---------------- DELETE MARKED IMAGES ---------------- #
                     if images_to_delete:
                         delete_ids = [int(id) for id in images_to_delete.split(',') if id]
-                        BouquetImage.objects.filter(
+                        removed_images = BouquetImage.objects.filter(
                             id__in=delete_ids,
                             bouquet=bouquet
-                        ).delete()
+                        )
+                        # Files are released now and removed once the edit commits
+                        release_bouquet_images(removed_images)
+                        removed_images.delete()
                     
                     # ---------------- UPDATE OCCASIONS ---------------- #
                     
@@ -1171,11 +1140,6 @@ def edit_bouquet(request):
                         if current_count + len(new_images) > 5:
                             messages.warning(request, f'Maximum 5 images allowed. Some images were not uploaded.')
                         
-                        # Folder: bouquets/<bouquet_id>/
-                        relative_path = f"bouquets/{bouquet.id}/"
-                        upload_path = os.path.join(settings.MEDIA_ROOT, relative_path)
-                        os.makedirs(upload_path, exist_ok=True)
-                        
                         for image_file in new_images[:5 - current_count]:  # Limit to 5 total
                             
                             if image_file.size > 6 * 1024 * 1024:
@@ -1184,24 +1148,12 @@ def edit_bouquet(request):
                             if image_file.content_type not in allowed_types:
                                 continue
                             
-                            ext = os.path.splitext(image_file.name)[1]
-                            unique_filename = f"{uuid.uuid4().hex}{ext}"
-                            
-                            full_path = os.path.join(upload_path, unique_filename)
-                            
-                            with open(full_path, 'wb+') as destination:
-                                for chunk in image_file.chunks():
-                                    destination.write(chunk)
-                            
-                            db_image_path = f"{relative_path}{unique_filename}"
-                            
-                            BouquetImage.objects.create(
-                                bouquet=bouquet,
-                                image_name=image_file.name,
-                                image_path=db_image_path,
-                                is_active=1,
-                                created_by=request.user.id
-                            )
+                            add_bouquet_image(bouquet, image_file, created_by=request.user.id)
+                    
+                    # ---------------- LISTING PROJECTION ---------------- #
+                    
+                    refresh_listing(bouquet.id)
+                    bouquets_changed([bouquet.id])
                     
                 messages.success(request, "Bouquet updated successfully!")
                 return redirect('bouquet_list')
@@ -1247,16 +1199,13 @@ def delete_bouquet(request):
                 
                 bouquet_name = bouquet.name
                 
-                # Delete images from filesystem
-                images = BouquetImage.objects.filter(bouquet=bouquet)
-                for image in images:
-                    if image.image_path:
-                        image_path = os.path.join(settings.MEDIA_ROOT, image.image_path)
-                        if os.path.exists(image_path):
-                            os.remove(image_path)
+                # Files are released now and removed once the deletion commits
+                release_bouquet_images(BouquetImage.objects.filter(bouquet=bouquet))
                 
                 # Delete bouquet (cascades to BouquetImage and BouquetOccasion)
+                deleted_bouquet_id = bouquet.id
                 bouquet.delete()
+                bouquets_changed([deleted_bouquet_id])
                 
                 messages.success(request, f"Bouquet '{bouquet_name}' deleted successfully!")
                 
@@ -1272,7 +1221,62 @@ def delete_bouquet(request):
         logger.exception(f"Unexpected error in delete_bouquet: {str(e)}")
         messages.error(request, 'Something went wrong. Please try again later.')
         return redirect('bouquet_list')
-    
+
+
+# resized media
+
+@require_safe
+def resized_media(request, width, height, image_path):
+    """
+    Media image fitted inside width x height, rendered on first request and
+    served from the disk cache afterwards (see masters/image_resize.py).
+    Only IMAGE_RESIZE_SIZES are accepted.
+    """
+    if not is_allowed_size(width, height):
+        raise Http404('Image size not available')
+
+    located = locate_source(image_path)
+    if located is None or not can_view_media(request.user, image_path):
+        raise Http404('Image not found')
+    source, stat = located
+
+    fmt = 'webp' if 'image/webp' in request.META.get('HTTP_ACCEPT', '') else 'jpeg'
+    key = cache_key(image_path, stat, width, height, fmt)
+    etag = f'"{key}"'
+
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        response = HttpResponseNotModified()
+    else:
+        resized = get_resized(source, key, width, height, fmt)
+        if resized is None:
+            raise Http404('Image could not be resized')
+        response = sendfile_response(resized, CONTENT_TYPES[fmt])
+
+    # The key covers the source file and the size, so the bytes never change
+    response['ETag'] = etag
+    response['Cache-Control'] = f"{'private' if is_protected_media(image_path) else 'public'}, max-age=31536000, immutable"
+    response['Vary'] = 'Accept'
+    return response
+
+
+@require_safe
+def media_file(request, file_path):
+    """
+    Uploaded media. Profile images are only served to their owner and admins;
+    with MEDIA_SENDFILE set the front server sends the bytes.
+    """
+    path = media_file_path(file_path)
+    if path is None or not can_view_media(request.user, file_path):
+        raise Http404('File not found')
+
+    response = sendfile_response(path)
+    if file_path.startswith(f"{BOUQUET_BLOB_DIR}/"):
+        # Named by content hash: a different file gets a different name
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    elif is_protected_media(file_path):
+        response['Cache-Control'] = 'private, max-age=3600'
+    return response
+
 # vendor list
 
 @no_direct_access
@@ -1857,6 +1861,10 @@ def edit_occasion(request):
                     
                     occasion.save()
                     
+                    # Occasion names are denormalized into bouquet listings
+                    listings = refresh_listings_for_occasion(occasion.id)
+                    bouquets_changed(listings.keys())
+                    
                 messages.success(request, f"Occasion '{name}' updated successfully!")
                 return redirect('occasion_list')
                 
@@ -1900,8 +1908,15 @@ def delete_occasion(request):
                 occasion = Occasion.objects.get(id=occasion_id)
                 
                 occasion_name = occasion.name
+                affected_bouquet_ids = list(
+                    BouquetOccasion.objects.filter(occasion=occasion).values_list('bouquet_id', flat=True)
+                )
                 occasion.delete()
                 
+                # Drop the deleted occasion from bouquet listings and shop facets
+                refresh_listings(affected_bouquet_ids)
+                bouquets_changed(affected_bouquet_ids)
+                
                 messages.success(request, f"Occasion '{occasion_name}' deleted successfully!")
                 
             except Occasion.DoesNotExist:
@@ -1918,6 +1933,8 @@ def delete_occasion(request):
         return redirect('occasion_list')
 
 # user management
+
+USER_LIST_PAGE_SIZE = 25
     
 @no_direct_access
 @login_required
@@ -1937,22 +1954,18 @@ def user_list(request):
             return redirect('/')
         
         # Get filter parameters from request
-        search_query = request.GET.get('search', '')
+        search_query = request.GET.get('search', '').strip()
         role_filter = request.GET.get('role', '')
         status_filter = request.GET.get('status', '')
         
-        # Base queryset
-        users = CustomUser.objects.all().order_by('-date_joined')
+        # Base queryset - only the columns the table shows
+        users = CustomUser.objects.only(
+            'id', 'full_name', 'first_name', 'last_name', 'email', 'phone', 'profile_image',
+            'role_id', 'user_type', 'last_login', 'is_active', 'is_superuser',
+        ).order_by('-date_joined', '-id')
         
         # Apply filters
-        if search_query:
-            users = users.filter(
-                models.Q(full_name__icontains=search_query) |
-                models.Q(email__icontains=search_query) |
-                models.Q(phone__icontains=search_query) |
-                models.Q(first_name__icontains=search_query) |
-                models.Q(last_name__icontains=search_query)
-            )
+        users = search_users(users, search_query)
         
         if role_filter:
             users = users.filter(role_id=role_filter)
@@ -1962,18 +1975,27 @@ def user_list(request):
         elif status_filter == 'inactive':
             users = users.filter(is_active=False)
         
+        # Pagination - only the requested page is fetched
+        paginator = Paginator(users, USER_LIST_PAGE_SIZE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        
         # Add encrypted IDs
-        user_list = []
-        for user in users:
+        for user in page_obj.object_list:
             user.encrypted_id = enc(str(user.id))
-            user_list.append(user)
+        
+        # Per-role and active/inactive counts in one grouped query
+        counts = directory_counts()
         
         # Get roles for filter dropdown
-        roles = Roles.objects.all().order_by('role_name')
+        roles = list(Roles.objects.all().order_by('role_name'))
+        for role in roles:
+            role.user_count = counts['roles'].get(role.id, 0)
         
         context = {
-            'users': user_list,
+            'users': page_obj.object_list,
+            'page_obj': page_obj,
             'roles': roles,
+            'user_counts': counts,
             'search_query': search_query,
             'role_filter': role_filter,
             'status_filter': status_filter,
@@ -2364,7 +2386,9 @@ def delete_user(request):
                     return redirect('user_list')
                 
                 user_email = user.email
+                reviewed_bouquet_ids = list(Review.objects.filter(user=user).values_list('bouquet_id', flat=True))
                 user.delete()
+                refresh_review_stats(reviewed_bouquet_ids)
                 
                 messages.success(request, f"User '{user_email}' deleted successfully!")
                 
@@ -2768,7 +2792,9 @@ def delete_account(request):
             UserProfile.objects.filter(user=user).delete()
             
             # Delete reviews
+            reviewed_bouquet_ids = list(Review.objects.filter(user=user).values_list('bouquet_id', flat=True))
             Review.objects.filter(user=user).delete()
+            refresh_review_stats(reviewed_bouquet_ids)
             
             # Delete cart and cart items
             Cart.objects.filter(user=user).delete()
@@ -2807,39 +2833,20 @@ def admin_order_list(request):
         date_filter = request.GET.get('date', '')
         search_query = request.GET.get('search', '')
         
-        # Base queryset
-        orders = Order.objects.all().select_related('user').order_by('-order_date')
+        # Filtered queryset
+        orders = scope_orders(
+            status=status_filter, date=date_filter, search=search_query
+        ).select_related('user').order_by('-order_date')
         
-        # Apply filters
-        if status_filter:
-            orders = orders.filter(status=status_filter)
-        
-        if date_filter == 'today':
-            orders = orders.filter(order_date__date=timezone.now().date())
-        elif date_filter == 'week':
-            week_ago = timezone.now() - timedelta(days=7)
-            orders = orders.filter(order_date__gte=week_ago)
-        elif date_filter == 'month':
-            month_ago = timezone.now() - timedelta(days=30)
-            orders = orders.filter(order_date__gte=month_ago)
-        
-        if search_query:
-            orders = orders.filter(
-                Q(order_number__icontains=search_query) |
-                Q(first_name__icontains=search_query) |
-                Q(last_name__icontains=search_query) |
-                Q(email__icontains=search_query) |
-                Q(phone__icontains=search_query)
-            )
-        
-        # Get statistics for dashboard cards
-        total_orders = Order.objects.count()
-        pending_orders = Order.objects.filter(status='pending').count()
-        processing_orders = Order.objects.filter(status='processing').count()
-        delivered_orders = Order.objects.filter(status='delivered').count()
+        # Get statistics for dashboard cards (all orders, one cached query)
+        order_stats = get_order_stats()
+        total_orders = order_stats['total_orders']
+        pending_orders = order_stats['status_counts']['pending']
+        processing_orders = order_stats['status_counts']['processing']
+        delivered_orders = order_stats['status_counts']['delivered']
         
         # Calculate total revenue
-        total_revenue = Order.objects.aggregate(total=Sum('total'))['total'] or 0
+        total_revenue = order_stats['total_revenue']
         
         # Pagination
         paginator = Paginator(orders, 15)
@@ -2925,6 +2932,7 @@ def admin_update_order_status(request):
         decrypted_id = dec(str(order_id))
         
         order = Order.objects.get(id=decrypted_id)
+        old_status = order.status
         order.status = new_status
         
         # Optionally update payment status based on order status
@@ -2933,7 +2941,9 @@ def admin_update_order_status(request):
         elif new_status == 'cancelled':
             order.payment_status = 'refunded'  # Or 'cancelled'
         
-        order.save()
+        with transaction.atomic():
+            order.save()
+            record_order_status_change(order, old_status)
         
         return JsonResponse({
             'success': True,
@@ -3002,8 +3012,11 @@ def admin_cancel_order(request):
             messages.error(request, 'Only pending or processing orders can be cancelled.')
             return redirect('admin_order_detail', order_id=order_id)
         
+        old_status = order.status
         order.status = 'cancelled'
-        order.save()
+        with transaction.atomic():
+            order.save()
+            record_order_status_change(order, old_status)
         
         # Optional: Send cancellation email to customer
         # send_order_cancellation_email(order, reason)
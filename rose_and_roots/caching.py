@@ -0,0 +1,91 @@
+# rose_and_roots/caching.py
+"""
+Namespaced cache API shared by the views.
+
+Cached values are filed under one or more model namespaces. Each namespace has
+a version number in the shared cache, and the version is part of every key, so
+bumping a namespace (done by model signals) invalidates everything built from
+that model across all workers without having to know the individual keys.
+
+    featured = cached(('bouquet',), 'home:featured', build_featured)
+"""
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+BOUQUET = 'bouquet'
+OCCASION = 'occasion'
+PARAMETER = 'parameter'
+ORDER_STATS = 'order_stats'
+RECOMMENDATION = 'recommendation'
+
+NAMESPACES = (BOUQUET, OCCASION, PARAMETER, ORDER_STATS, RECOMMENDATION)
+
+DEFAULT_TIMEOUT = 60 * 15
+
+
+def _version_key(namespace):
+    return f"ns:{namespace}:version"
+
+
+def namespace_versions(namespaces):
+    """
+    Current version of each namespace. Versions are unique timestamps stored
+    without expiry; a missing (never bumped or evicted) version gets a fresh
+    one, so old entries can never be picked up again.
+    """
+    keys = {namespace: _version_key(namespace) for namespace in namespaces}
+    versions = cache.get_many(keys.values())
+
+    result = {}
+    for namespace, key in keys.items():
+        version = versions.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        result[namespace] = version
+    return result
+
+
+def make_key(namespaces, name):
+    """Cache key for ``name`` that changes whenever any of the namespaces is bumped"""
+    versions = namespace_versions(namespaces)
+    version_tag = '.'.join(f"{namespace}{versions[namespace]}" for namespace in namespaces)
+    return f"{name}:{version_tag}"
+
+
+def cached(namespaces, name, builder, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached value for ``name`` or build, store and return it.
+    Cache errors fall back to calling the builder so a cache outage never
+    takes a page down.
+    """
+    try:
+        key = make_key(namespaces, name)
+        value = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Cache read failed for {name}: {str(e)}")
+        return builder()
+
+    if value is None:
+        value = builder()
+        try:
+            cache.set(key, value, timeout)
+        except Exception as e:
+            logger.warning(f"Cache write failed for {name}: {str(e)}")
+    return value
+
+
+def bump_namespaces(*namespaces):
+    """Invalidate every value built from these namespaces once the transaction commits"""
+    def bump():
+        try:
+            cache.set_many({_version_key(namespace): time.time_ns() for namespace in namespaces}, None)
+        except Exception as e:
+            logger.warning(f"Failed to bump cache namespaces {namespaces}: {str(e)}")
+
+    transaction.on_commit(bump)
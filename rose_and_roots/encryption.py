@@ -1,20 +1,83 @@
-from cryptography.fernet import Fernet
-from django.conf import settings
+"""
+Opaque ID codec.
+
+enc()/dec() turn database IDs into short URL-safe tokens and back. Tokens are
+AES-SIV (deterministic authenticated encryption): the same ID always maps to
+the same token, so pages embedding IDs can be cached, and tampered tokens are
+rejected (dec() returns None, like a missing ID). The cipher is built once per process and both directions are
+memoised.
+
+Tokens issued by the previous Fernet implementation still decode while
+ENCRYPTION_ACCEPT_LEGACY_TOKENS is enabled.
+"""
 import base64
+import binascii
+from functools import lru_cache
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESSIV
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from django.conf import settings
+
+# base64 of the Fernet version byte + timestamp prefix ("gAAAAA...")
+LEGACY_TOKEN_PREFIX = 'Z0FBQUFB'
+
+_siv = None
+_fernet = None
+
 def generate_key():
     return Fernet.generate_key()
+
 def get_encryption_key():
     return settings.ENCRYPTION_KEY.encode()
+
+def _get_siv():
+    global _siv
+    if _siv is None:
+        # AES-SIV needs a 512-bit key (two AES-256 keys); derive it from ENCRYPTION_KEY
+        siv_key = HKDF(
+            algorithm=hashes.SHA256(),
+            length=64,
+            salt=None,
+            info=b'rose_and_roots opaque id codec',
+        ).derive(get_encryption_key())
+        _siv = AESSIV(siv_key)
+    return _siv
+
+def _get_fernet():
+    global _fernet
+    if _fernet is None:
+        _fernet = Fernet(get_encryption_key())
+    return _fernet
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _dec_legacy(encoded_cipher_text):
+    # Fernet token wrapped in an extra urlsafe base64 layer
+    cipher_text = base64.urlsafe_b64decode(encoded_cipher_text.encode())
+    return _get_fernet().decrypt(cipher_text).decode()
+
+@lru_cache(maxsize=8192)
 def enc(parameter):
-    cipher_suite = Fernet(get_encryption_key())
-    cipher_text = cipher_suite.encrypt(parameter.encode())
-    # Use base64 encoding to make the result shorter and more URL-friendly
-    encoded_cipher_text = base64.urlsafe_b64encode(cipher_text).decode()
-    return encoded_cipher_text
+    cipher_text = _get_siv().encrypt(parameter.encode(), None)
+    return _b64encode(cipher_text)
 
+@lru_cache(maxsize=8192)
 def dec(encoded_cipher_text):
-    # Decode the base64-encoded string before decrypting
-    cipher_text = base64.urlsafe_b64decode(encoded_cipher_text.encode())
-    cipher_suite = Fernet(get_encryption_key())
-    plain_text = cipher_suite.decrypt(cipher_text).decode()
-    return plain_text
+    accept_legacy = getattr(settings, 'ENCRYPTION_ACCEPT_LEGACY_TOKENS', True)
+    if accept_legacy and encoded_cipher_text.startswith(LEGACY_TOKEN_PREFIX):
+        try:
+            return _dec_legacy(encoded_cipher_text)
+        except (InvalidToken, ValueError, binascii.Error):
+            pass  # Not a Fernet token after all - try the current format
+
+    try:
+        return _get_siv().decrypt(_b64decode(encoded_cipher_text), None).decode()
+    except (InvalidTag, ValueError, binascii.Error):
+        return None
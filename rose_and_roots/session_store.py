@@ -0,0 +1,58 @@
+# rose_and_roots/session_store.py
+"""
+Session engine: cached_db with coalesced writes.
+
+Reads come from the shared cache and fall back to the database (as with
+django.contrib.sessions.backends.cached_db). SESSION_SAVE_EVERY_REQUEST makes
+Django save the session on every request to slide its expiry; this store only
+writes when the session data actually changed, or when the stored expiry is
+older than SESSION_REFRESH_INTERVAL. Other saves are skipped, so a page view or
+/check-session/ poll costs no database write.
+
+With SESSION_COOKIE_AGE = 1800 and a 300s interval, an idle session therefore
+expires 25-30 minutes after the last request instead of exactly 30.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+# When the session row was last written (unix seconds), stored with the session data
+SAVED_AT_KEY = '_saved_at'
+
+SESSION_REFRESH_INTERVAL = getattr(settings, 'SESSION_REFRESH_INTERVAL', 300)
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = 'rose_and_roots.session'
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded_state = None
+
+    def _state_of(self, data):
+        """Serialized session data without the write marker, to detect real changes"""
+        return self.serializer().dumps({key: value for key, value in data.items() if key != SAVED_AT_KEY})
+
+    def load(self):
+        data = super().load()
+        self._loaded_state = self._state_of(data) if data else None
+        return data
+
+    def _is_unchanged(self):
+        if not hasattr(self, '_session_cache'):
+            return True
+        return self._loaded_state is not None and self._state_of(self._session_cache) == self._loaded_state
+
+    def _refresh_due(self):
+        saved_at = self._session.get(SAVED_AT_KEY) or 0
+        return time.time() - saved_at >= SESSION_REFRESH_INTERVAL
+
+    def save(self, must_create=False):
+        if not must_create and self.session_key is not None and self._is_unchanged() and not self._refresh_due():
+            return
+
+        # Written straight into the data so it does not mark the session modified
+        self._session[SAVED_AT_KEY] = int(time.time())
+        super().save(must_create=must_create)
+        self._loaded_state = self._state_of(self._session)
@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Answers the /check-session/ poll before sessions/auth are loaded
+    'store.middleware.HeartbeatMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -52,13 +54,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     
-    # Your existing middleware
-    'store.middleware.DirectAccessMiddleware',
-    
-    # Add these new middlewares in the correct order
-    'store.middleware_navigation.CacheControlMiddleware',  # Add this first
-    'store.middleware_navigation.SessionValidationMiddleware',  # Then this
-    'store.middleware_navigation.BrowserNavigationMiddleware',  # Finally this
+    # Direct-access/session/navigation checks and security + cache headers, in one pass
+    'store.middleware.RequestPolicyMiddleware',
 ]
 
 # ============================================
@@ -78,6 +75,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.media',
+                'masters.context_processors.site_settings',
             ],
         },
     },
@@ -117,6 +115,10 @@ SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
 SESSION_COOKIE_HTTPONLY = True  # Prevent JavaScript access to session cookie
 SESSION_COOKIE_SAMESITE = 'Strict'  # CSRF protection
 SESSION_SAVE_EVERY_REQUEST = True  # Refresh session on each request
+# Cache-backed sessions that only hit the database when the data changes or
+# the stored expiry is SESSION_REFRESH_INTERVAL seconds old (see rose_and_roots/session_store.py)
+SESSION_ENGINE = 'rose_and_roots.session_store'
+SESSION_REFRESH_INTERVAL = 300
 
 # CSRF settings
 CSRF_COOKIE_SECURE = False  # Set to True in production
@@ -190,122 +192,78 @@ X_FRAME_OPTIONS = 'DENY'
 SECURE_REFERRER_POLICY = 'strict-origin-when-cross-origin'
 
 # ============================================
-# CUSTOM SECURITY HEADERS MIDDLEWARE (Built-in)
-# ============================================
-
-# Add custom security headers through settings
-def security_headers_middleware(get_response):
-    """
-    Middleware to add comprehensive security headers to all responses
-    """
-    def middleware(request):
-        response = get_response(request)
-        
-        # Content Security Policy (CSP)
-        response['Content-Security-Policy'] = (
-            "default-src 'self'; "
-            "script-src 'self' 'unsafe-inline' 'unsafe-eval' "
-            "https://cdn.jsdelivr.net "
-            "https://code.jquery.com "
-            "https://cdnjs.cloudflare.com "
-            "https://unpkg.com; "
-            "style-src 'self' 'unsafe-inline' "
-            "https://cdn.jsdelivr.net "
-            "https://fonts.googleapis.com; "
-            "font-src 'self' "
-            "https://fonts.gstatic.com "
-            "https://cdn.jsdelivr.net; "
-            "img-src 'self' data: https: blob:; "
-            "connect-src 'self' https:; "
-            "frame-src 'none'; "
-            "frame-ancestors 'none'; "
-            "form-action 'self'; "
-            "base-uri 'self'; "
-            "object-src 'none'; "
-            "media-src 'self'; "
-            "worker-src 'self' blob:; "
-            "manifest-src 'self'; "
-            "upgrade-insecure-requests; "
-            "block-all-mixed-content;"
-        )
-        
-        # HSTS (only in production with HTTPS)
-        if not DEBUG and request.is_secure():
-            response['Strict-Transport-Security'] = (
-                'max-age=31536000; '
-                'includeSubDomains; '
-                'preload'
-            )
-        
-        # XSS Protection
-        response['X-XSS-Protection'] = '1; mode=block'
-        
-        # MIME Type Sniffing Prevention
-        response['X-Content-Type-Options'] = 'nosniff'
-        
-        # Clickjacking Protection
-        response['X-Frame-Options'] = 'DENY'
-        
-        # Referrer Policy
-        response['Referrer-Policy'] = 'strict-origin-when-cross-origin'
-        
-        # Permissions Policy
-        response['Permissions-Policy'] = (
-            "accelerometer=(), "
-            "ambient-light-sensor=(), "
-            "autoplay=(), "
-            "battery=(), "
-            "camera=(), "
-            "display-capture=(), "
-            "document-domain=(), "
-            "encrypted-media=(), "
-            "fullscreen=(self), "
-            "geolocation=(), "
-            "gyroscope=(), "
-            "layout-animations=(), "
-            "legacy-image-formats=(), "
-            "magnetometer=(), "
-            "microphone=(), "
-            "midi=(), "
-            "oversized-images=(), "
-            "payment=(), "
-            "picture-in-picture=(), "
-            "publickey-credentials-get=(), "
-            "speaker-selection=(), "
-            "sync-xhr=(), "
-            "unoptimized-images=(), "
-            "unsized-media=(), "
-            "usb=(), "
-            "screen-wake-lock=(), "
-            "web-share=(), "
-            "xr-spatial-tracking=()"
-        )
-        
-        # Cross-Origin Resource Policy
-        response['Cross-Origin-Resource-Policy'] = 'same-origin'
-        
-        # Cross-Origin Opener Policy
-        response['Cross-Origin-Opener-Policy'] = 'same-origin'
-        
-        # Cross-Origin Embedder Policy
-        response['Cross-Origin-Embedder-Policy'] = 'require-corp'
-        
-        # Cache Control for authenticated pages
-        if request.user.is_authenticated:
-            response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-            response['Pragma'] = 'no-cache'
-            response['Expires'] = '0'
-        
-        # Remove Server header to hide technology
-        if 'Server' in response:
-            del response['Server']
-        
-        return response
-    
-    return middleware
-
-# Add the security headers middleware
-MIDDLEWARE.insert(1, 'rose_and_roots.settings.security_headers_middleware')
+# CUSTOM SECURITY HEADERS & REQUEST POLICY
+# ============================================
+
+# Applied to every response by store.middleware.RequestPolicyMiddleware
+
+# Content Security Policy (CSP)
+CONTENT_SECURITY_POLICY = (
+    "default-src 'self'; "
+    "script-src 'self' 'unsafe-inline' 'unsafe-eval' "
+    "https://cdn.jsdelivr.net "
+    "https://code.jquery.com "
+    "https://cdnjs.cloudflare.com "
+    "https://unpkg.com; "
+    "style-src 'self' 'unsafe-inline' "
+    "https://cdn.jsdelivr.net "
+    "https://fonts.googleapis.com; "
+    "font-src 'self' "
+    "https://fonts.gstatic.com "
+    "https://cdn.jsdelivr.net; "
+    "img-src 'self' data: https: blob:; "
+    "connect-src 'self' https:; "
+    "frame-src 'none'; "
+    "frame-ancestors 'none'; "
+    "form-action 'self'; "
+    "base-uri 'self'; "
+    "object-src 'none'; "
+    "media-src 'self'; "
+    "worker-src 'self' blob:; "
+    "manifest-src 'self'; "
+    "upgrade-insecure-requests; "
+    "block-all-mixed-content;"
+)
+
+# Permissions Policy
+PERMISSIONS_POLICY = (
+    "accelerometer=(), "
+    "ambient-light-sensor=(), "
+    "autoplay=(), "
+    "battery=(), "
+    "camera=(), "
+    "display-capture=(), "
+    "document-domain=(), "
+    "encrypted-media=(), "
+    "fullscreen=(self), "
+    "geolocation=(), "
+    "gyroscope=(), "
+    "layout-animations=(), "
+    "legacy-image-formats=(), "
+    "magnetometer=(), "
+    "microphone=(), "
+    "midi=(), "
+    "oversized-images=(), "
+    "payment=(), "
+    "picture-in-picture=(), "
+    "publickey-credentials-get=(), "
+    "speaker-selection=(), "
+    "sync-xhr=(), "
+    "unoptimized-images=(), "
+    "unsized-media=(), "
+    "usb=(), "
+    "screen-wake-lock=(), "
+    "web-share=(), "
+    "xr-spatial-tracking=()"
+)
+
+# Referers from these origins count as in-site navigation
+TRUSTED_REFERER_ORIGINS = [
+    'http://127.0.0.1:8000',
+    'http://localhost:8000',
+    'https://littlecraftone.com',
+    'https://www.littlecraftone.com',
+]
 
 # ============================================
 # STATIC & MEDIA FILES
@@ -315,15 +273,42 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
-# MEDIA SETTINGS - YOUR ORIGINAL SETUP
+# MEDIA SETTINGS
 MEDIA_URL = '/media/'
-# Note: This path is absolute - make sure it exists
-MEDIA_ROOT = 'D:/Python Project/Documents/'
-
-# Alternative: If you want relative to BASE_DIR, use:
-# MEDIA_ROOT = BASE_DIR / 'media'
-# Or keep your absolute path:
-# MEDIA_ROOT = 'D:/Python Project/Documents/'
+# Set MEDIA_ROOT in the environment (e.g. MEDIA_ROOT='D:/Python Project/Documents/')
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', str(BASE_DIR / 'media'))
+
+# Media is served by masters.views.media_file / resized_media. Set MEDIA_SENDFILE to
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache mod_xsendfile, lighttpd) to have
+# the front server send the bytes; nginx needs an `internal` location aliasing each
+# directory in MEDIA_SENDFILE_LOCATIONS
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE') or None
+
+# Deleted media is queued and removed by `manage.py collect_media_garbage`, see masters/media_gc.py
+MEDIA_GC_BATCH_SIZE = 200
+MEDIA_GC_ORPHAN_MIN_AGE = 24 * 60 * 60  # Unreferenced files younger than this are kept
+
+# Product views are buffered in the cache and written by `manage.py flush_recently_viewed`,
+# see masters/recently_viewed.py. Buffering needs Redis (or memcached); on the file-based
+# cache each view is written through. RECENTLY_VIEWED_BUFFERED = True/False overrides that
+RECENTLY_VIEWED_LIMIT = 20
+RECENTLY_VIEWED_FLUSH_BATCH_SIZE = 500
+
+# Shop 'popular' sort: decayed orders, views, cart adds and reviews, refreshed by
+# `manage.py refresh_popularity`, see store/popularity.py
+POPULARITY_HALF_LIFE_DAYS = 7
+POPULARITY_EVENT_LAG = 10 * 60  # seconds; covers views still buffered in the cache
+
+# On-the-fly resized images: /media/resize/<w>x<h>/<path>, see masters/image_resize.py.
+# Only these boxes are rendered, so the cache cannot be filled with arbitrary sizes
+IMAGE_RESIZE_SIZES = ['64x64', '128x128', '160x160', '480x480', '1080x1080']
+IMAGE_RESIZE_CACHE_DIR = os.environ.get('IMAGE_RESIZE_CACHE_DIR', str(BASE_DIR / 'cache' / 'resized'))
+IMAGE_RESIZE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_RESIZE_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+MEDIA_SENDFILE_LOCATIONS = {
+    MEDIA_ROOT: '/internal/media/',
+    IMAGE_RESIZE_CACHE_DIR: '/internal/resized/',
+}
 
 # ============================================
 # FILE UPLOAD SECURITY
@@ -338,22 +323,39 @@ DATA_UPLOAD_MAX_NUMBER_FIELDS = 1000
 # CACHING (Performance & Security)
 # ============================================
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-        'TIMEOUT': 300,  # 5 minutes
-        'OPTIONS': {
-            'MAX_ENTRIES': 1000
+# One cache shared by every worker process: Redis when REDIS_URL is set,
+# otherwise a file-based cache on this host (also what local runs/tests use).
+# Cached values are namespaced per model, see rose_and_roots/caching.py
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'TIMEOUT': 300,  # 5 minutes
+            'KEY_PREFIX': 'rose_and_roots',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / 'cache')),
+            'TIMEOUT': 300,  # 5 minutes
+            'KEY_PREFIX': 'rose_and_roots',
+            'OPTIONS': {
+                'MAX_ENTRIES': 10000
+            }
         }
     }
-}
 
 # ============================================
 # EMAIL SETTINGS
 # ============================================
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Set EMAIL_BACKEND=django.core.mail.backends.console.EmailBackend (or locmem) for local runs and tests
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
@@ -362,6 +364,11 @@ EMAIL_HOST_PASSWORD = 'bpnnxxdlyacmphsp'
 DEFAULT_FROM_EMAIL = 'LittleCraftOne <littlecraftone.support@gmail.com>'
 EMAIL_TIMEOUT = 30
 
+# Outbound mail queue (accounts.mail_queue, delivered by `manage.py send_queued_email`)
+MAIL_QUEUE_BATCH_SIZE = 50
+MAIL_QUEUE_MAX_ATTEMPTS = 5
+MAIL_QUEUE_RETRY_DELAY = 60  # seconds, doubled after every failed attempt
+
 # ============================================
 # LOGGING (Security Monitoring)
 # ============================================
@@ -444,12 +451,23 @@ USE_TZ = True
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# ============================================
+# SITE SETTINGS
+# ============================================
+
+# Used for WhatsApp links when no 'Admin WhatsApp Number' parameter or admin phone is set
+DEFAULT_ADMIN_WHATSAPP = '918805433102'
+
 # ============================================
 # ENCRYPTION
 # ============================================
 
 ENCRYPTION_KEY = 'oRVCHTumzesh-E71A-bAnjjEDuIlkceL6dvAYiCShp0='
 
+# Keep decoding IDs issued by the old Fernet codec (bookmarks, stored cart
+# items). Set to False once the migration window is over.
+ENCRYPTION_ACCEPT_LEGACY_TOKENS = True
+
 # ============================================
 # SITE URL
 # ============================================
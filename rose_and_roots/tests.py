@@ -0,0 +1,99 @@
+import base64
+import time
+from unittest import mock
+
+from cryptography.fernet import Fernet
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from rose_and_roots import encryption
+from rose_and_roots.encryption import dec, enc
+from rose_and_roots.session_store import SAVED_AT_KEY, SESSION_REFRESH_INTERVAL, SessionStore
+
+
+class EncryptionTests(SimpleTestCase):
+    def setUp(self):
+        enc.cache_clear()
+        dec.cache_clear()
+        self.addCleanup(enc.cache_clear)
+        self.addCleanup(dec.cache_clear)
+
+    def legacy_token(self, value):
+        cipher_text = Fernet(settings.ENCRYPTION_KEY.encode()).encrypt(value.encode())
+        return base64.urlsafe_b64encode(cipher_text).decode()
+
+    def test_same_id_gives_the_same_token(self):
+        token = enc('42')
+        enc.cache_clear()
+        encryption._siv = None
+
+        self.assertEqual(enc('42'), token)
+        self.assertNotEqual(enc('43'), token)
+        self.assertEqual(dec(token), '42')
+
+    def test_legacy_fernet_tokens_still_decode(self):
+        token = self.legacy_token('42')
+        self.assertTrue(token.startswith(encryption.LEGACY_TOKEN_PREFIX))
+        self.assertEqual(dec(token), '42')
+
+    @override_settings(ENCRYPTION_ACCEPT_LEGACY_TOKENS=False)
+    def test_legacy_tokens_can_be_switched_off(self):
+        self.assertIsNone(dec(self.legacy_token('42')))
+
+    def test_tampered_tokens_are_rejected(self):
+        token = enc('42')
+        flipped = token[:-1] + ('A' if token[-1] != 'A' else 'B')
+        legacy = self.legacy_token('42')
+
+        for tampered in (flipped, token[:-2], token + 'AA', '', 'not a token!', legacy[:-4] + 'AAAA'):
+            with self.subTest(tampered=tampered):
+                self.assertIsNone(dec(tampered))
+
+
+class SessionStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        session = SessionStore()
+        session['_auth_user_id'] = '1'
+        session['cart'] = {'7': 1}
+        session.save(must_create=True)
+        self.session_key = session.session_key
+
+    def load(self):
+        session = SessionStore(self.session_key)
+        session.load()
+        return session
+
+    def stored(self):
+        """Session data as written to the database, bypassing the cache"""
+        return SessionStore().decode(Session.objects.get(session_key=self.session_key).session_data)
+
+    def test_unchanged_session_is_not_written(self):
+        with self.assertNumQueries(0):
+            session = self.load()
+        self.assertEqual(session['cart'], {'7': 1})
+
+        with mock.patch.object(session._cache, 'set') as cache_set, self.assertNumQueries(0):
+            session.save()
+        cache_set.assert_not_called()
+
+    def test_modified_session_is_persisted(self):
+        session = self.load()
+        session['cart'] = {'7': 2}
+        session.save()
+
+        self.assertEqual(self.stored()['cart'], {'7': 2})
+        self.assertEqual(self.load()['cart'], {'7': 2})
+        cache.clear()
+        self.assertEqual(self.load()['cart'], {'7': 2})
+
+    def test_unchanged_session_is_refreshed_after_the_interval(self):
+        saved_at = self.stored()[SAVED_AT_KEY]
+        session = self.load()
+
+        with mock.patch('time.time', return_value=time.time() + SESSION_REFRESH_INTERVAL):
+            session.save()
+
+        self.assertGreater(self.stored()[SAVED_AT_KEY], saved_at)
@@ -19,7 +19,6 @@ from django.urls import path
 from accounts.views import *
 from masters.views import *
 from store.views import *
-from django.conf.urls.static import static
 
 urlpatterns = [
     path('', home, name='home'),
@@ -79,8 +78,11 @@ urlpatterns = [
     
     path('shop/', shop_view, name='shop'),
     path('shop/filter/', filter_products_ajax, name='filter_products_ajax'),
+    path('shop/search/', shop_view, name='shop_search'),
+    path('shop/search/suggest/', search_suggest, name='search_suggest'),
     path('product/', product_detail, name='product_detail'),
     path('add-review/', add_review, name='add_review'),
+    path('hide-review/', hide_review, name='hide_review'),
     
     # Cart URLs
     path('cart_view', cart_view, name='cart_view'),
@@ -120,8 +122,6 @@ urlpatterns = [
     path('toggle_inquiry_status/', toggle_inquiry_status, name='toggle_inquiry_status'),
     
     # Media files
-    *static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT),
+    path(f"{settings.MEDIA_URL.strip('/')}/resize/<int:width>x<int:height>/<path:image_path>", resized_media, name='resized_media'),
+    path(f"{settings.MEDIA_URL.strip('/')}/<path:file_path>", media_file, name='media_file'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -0,0 +1,260 @@
+# store/dashboard_metrics.py
+"""
+Admin dashboard metrics.
+
+Two rollup tables back the admin dashboard and order list:
+
+* ``daily_order_stats``   - order count and revenue per (day, status)
+* ``bouquet_review_stats`` - active review count, rating sum, average and
+  1-5 star histogram per bouquet
+
+Orders are applied as +/- deltas when they are placed or change status, and
+reviews when they are added, activated or deactivated; deleted reviews make
+their bouquets' stats be recomputed. ``rebuild_*`` restores both tables from
+the source rows (see the rebuild_dashboard_metrics command), and
+reconcile_review_stats() repairs only the bouquets that drifted.
+"""
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from masters.models import Bouquet
+from store.models import BouquetReviewStat, DailyOrderStat, Order, Review
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------- ORDERS ---------------- #
+
+def _order_day(order):
+    return timezone.localdate(order.order_date) if order.order_date else timezone.localdate()
+
+
+def _apply_order_delta(stat_date, status, count, revenue):
+    """Add count/revenue to one (day, status) bucket, creating it if needed"""
+    with transaction.atomic():
+        updated = DailyOrderStat.objects.filter(stat_date=stat_date, status=status).update(
+            order_count=F('order_count') + count,
+            revenue=F('revenue') + revenue,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            return
+
+        try:
+            with transaction.atomic():
+                DailyOrderStat.objects.create(
+                    stat_date=stat_date, status=status, order_count=count, revenue=revenue
+                )
+        except IntegrityError:
+            # Another request created the bucket first
+            DailyOrderStat.objects.filter(stat_date=stat_date, status=status).update(
+                order_count=F('order_count') + count,
+                revenue=F('revenue') + revenue,
+                updated_at=timezone.now(),
+            )
+
+
+def record_order_placed(order):
+    """Call in the transaction that creates the order"""
+    _apply_order_delta(_order_day(order), order.status, 1, order.total or Decimal('0'))
+
+
+def record_order_status_change(order, old_status):
+    """Move an order between status buckets after its status was saved"""
+    if old_status == order.status:
+        return
+    stat_date = _order_day(order)
+    revenue = order.total or Decimal('0')
+    _apply_order_delta(stat_date, old_status, -1, -revenue)
+    _apply_order_delta(stat_date, order.status, 1, revenue)
+
+
+def rebuild_order_stats():
+    """Recompute daily_order_stats from the orders table"""
+    rows = Order.objects.annotate(
+        stat_date=TruncDate('order_date', tzinfo=timezone.get_current_timezone())
+    ).values('stat_date', 'status').annotate(
+        order_count=Count('id'),
+        revenue=Sum('total'),
+    ).order_by()
+
+    stats = [
+        DailyOrderStat(
+            stat_date=row['stat_date'],
+            status=row['status'],
+            order_count=row['order_count'],
+            revenue=row['revenue'] or 0,
+        )
+        for row in rows
+        if row['stat_date'] is not None
+    ]
+
+    with transaction.atomic():
+        DailyOrderStat.objects.all().delete()
+        DailyOrderStat.objects.bulk_create(stats)
+    return len(stats)
+
+
+def get_daily_order_counts(days=7):
+    """Order count of each of the last ``days`` days, oldest first, as (date, count) pairs"""
+    window_start = timezone.localdate() - timedelta(days=days - 1)
+    per_day = dict(
+        DailyOrderStat.objects.filter(stat_date__gte=window_start).values('stat_date').annotate(
+            orders=Sum('order_count')
+        ).order_by().values_list('stat_date', 'orders')
+    )
+    return [
+        (window_start + timedelta(days=offset), per_day.get(window_start + timedelta(days=offset), 0))
+        for offset in range(days)
+    ]
+
+
+# ---------------- REVIEWS ---------------- #
+
+RATINGS = range(1, 6)
+
+
+def _stat_fields(rows):
+    """BouquetReviewStat field values from (rating, count) rows of active reviews"""
+    fields = {f'rating_{rating}': 0 for rating in RATINGS}
+    for rating, count in rows:
+        if rating in RATINGS:
+            fields[f'rating_{rating}'] += count
+    fields['review_count'] = sum(fields[f'rating_{rating}'] for rating in RATINGS)
+    fields['rating_sum'] = sum(rating * fields[f'rating_{rating}'] for rating in RATINGS)
+    fields['avg_rating'] = _average(fields['rating_sum'], fields['review_count'])
+    return fields
+
+
+def _average(rating_sum, review_count):
+    if not review_count:
+        return Decimal('0')
+    return round(Decimal(rating_sum) / review_count, 2)
+
+
+def _apply_review_delta(bouquet_id, rating, count):
+    """Add count reviews of the given rating to a bouquet's stats (count may be negative)"""
+    with transaction.atomic():
+        # No row yet means no active reviews. Insert an empty one before locking it;
+        # when concurrent first reviews race, the later inserts wait and are ignored
+        BouquetReviewStat.objects.bulk_create([BouquetReviewStat(bouquet_id=bouquet_id)], ignore_conflicts=True)
+        stat = BouquetReviewStat.objects.select_for_update().get(bouquet_id=bouquet_id)
+
+        BouquetReviewStat.objects.filter(bouquet_id=bouquet_id).update(**{
+            'review_count': F('review_count') + count,
+            'rating_sum': F('rating_sum') + rating * count,
+            f'rating_{rating}': F(f'rating_{rating}') + count,
+            'updated_at': timezone.now(),
+        })
+        # Row is locked, so these are the values just written
+        stat.review_count += count
+        stat.rating_sum += rating * count
+        BouquetReviewStat.objects.filter(bouquet_id=bouquet_id).update(
+            avg_rating=_average(stat.rating_sum, stat.review_count)
+        )
+
+
+def record_review_added(review):
+    """Call in the transaction that creates the review"""
+    if review.is_active:
+        _apply_review_delta(review.bouquet_id, review.rating, 1)
+
+
+def set_review_active(review_id, active):
+    """
+    Activate or deactivate a review and move it in or out of its bouquet's
+    stats. Returns the review, or None if it does not exist.
+    """
+    active = 1 if active else 0
+    with transaction.atomic():
+        review = Review.objects.select_for_update().filter(pk=review_id).first()
+        if review is None or review.is_active == active:
+            return review
+        review.is_active = active
+        review.save(update_fields=['is_active', 'updated_at'])
+        _apply_review_delta(review.bouquet_id, review.rating, 1 if active else -1)
+    return review
+
+
+def refresh_review_stats(bouquet_ids):
+    """Recompute review stats of the given bouquets (call after reviews are deleted)"""
+    bouquet_ids = {int(bouquet_id) for bouquet_id in bouquet_ids if bouquet_id is not None}
+    if not bouquet_ids:
+        return
+
+    rows = Review.objects.filter(bouquet_id__in=bouquet_ids, is_active=1).values_list(
+        'bouquet_id', 'rating'
+    ).annotate(count=Count('id')).order_by()
+    per_bouquet = {}
+    for bouquet_id, rating, count in rows:
+        per_bouquet.setdefault(bouquet_id, []).append((rating, count))
+
+    with transaction.atomic():
+        BouquetReviewStat.objects.filter(bouquet_id__in=bouquet_ids).delete()
+        BouquetReviewStat.objects.bulk_create(
+            BouquetReviewStat(bouquet_id=bouquet_id, **_stat_fields(ratings))
+            for bouquet_id, ratings in per_bouquet.items()
+        )
+
+
+def rebuild_review_stats():
+    """Recompute bouquet_review_stats from the reviews table"""
+    bouquet_ids = Review.objects.filter(is_active=1).values_list('bouquet_id', flat=True).distinct()
+    with transaction.atomic():
+        BouquetReviewStat.objects.all().delete()
+        refresh_review_stats(list(bouquet_ids))
+    return BouquetReviewStat.objects.count()
+
+
+def reconcile_review_stats(fix=True):
+    """
+    Compare bouquet_review_stats with the reviews table and, with fix, repair
+    the bouquets that drifted. Returns the IDs of those bouquets.
+    """
+    expected = {}
+    rows = Review.objects.filter(is_active=1).values_list('bouquet_id', 'rating').annotate(
+        count=Count('id')
+    ).order_by()
+    for bouquet_id, rating, count in rows:
+        expected.setdefault(bouquet_id, []).append((rating, count))
+    expected = {bouquet_id: _stat_fields(ratings) for bouquet_id, ratings in expected.items()}
+
+    compared = ['review_count', 'rating_sum', 'avg_rating', *(f'rating_{rating}' for rating in RATINGS)]
+    drifted = set()
+    stored_ids = set()
+    for stat in BouquetReviewStat.objects.all().iterator():
+        stored_ids.add(stat.bouquet_id)
+        fields = expected.get(stat.bouquet_id)
+        if fields is None or any(getattr(stat, name) != fields[name] for name in compared):
+            drifted.add(stat.bouquet_id)
+    drifted.update(set(expected) - stored_ids)
+
+    if fix and drifted:
+        refresh_review_stats(drifted)
+        logger.warning(f"Review stats repaired for {len(drifted)} bouquet(s)")
+    return sorted(drifted)
+
+
+def attach_review_stats(bouquets):
+    """Set ``review_count`` and ``avg_rating`` on bouquets from their stats rows (one query)"""
+    stats = BouquetReviewStat.objects.in_bulk([bouquet.id for bouquet in bouquets])
+    for bouquet in bouquets:
+        stat = stats.get(bouquet.id)
+        bouquet.review_count = stat.review_count if stat else 0
+        bouquet.avg_rating = stat.avg_rating if stat else 0
+    return bouquets
+
+
+def get_popular_bouquets(limit=6):
+    """
+    Active bouquets with the highest popularity score (see store.popularity),
+    each with ``review_count`` and ``avg_rating``
+    """
+    bouquets = list(Bouquet.objects.filter(is_active=1).order_by('-popularity_score', '-id')[:limit])
+    return attach_review_stats(bouquets)
@@ -0,0 +1,335 @@
+# store/facets.py
+"""
+Catalog facet engine for the shop page.
+
+Each process keeps an inverted index of the active catalog: bouquet IDs per
+occasion, per category and in a sorted effective price list, plus the bouquet IDs
+pre-sorted for every shop sort order. A filter + sort + page request becomes a
+few set intersections and a walk over one sort order, and the live facet counts
+("Birthday (14)") fall out of the same sets.
+
+The masters CRUD views call bouquets_changed() / catalog_changed() after a
+write. The local index is patched in place and a shared version key is bumped
+so other workers rebuild on their next request.
+"""
+import bisect
+import logging
+import sys
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from masters.models import Bouquet, BouquetOccasion
+
+logger = logging.getLogger(__name__)
+
+FACET_VERSION_KEY = 'shop:facets:version'
+
+# Rebuild at least this often (seconds) to pick up edits made outside the app
+FACET_INDEX_MAX_AGE = 300
+
+# Sort keys mirror store.views.SHOP_SORT_ORDERS, including where NULLs land
+SORT_KEYS = {
+    'price_low': lambda doc: (doc['effective_price'] is None, doc['effective_price'] or 0, doc['id']),
+    'price_high': lambda doc: (doc['effective_price'] is None, -(doc['effective_price'] or 0), -doc['id']),
+    'newest': lambda doc: (doc['created_at'] is None, -doc['created_ts'], -doc['id']),
+    'popular': lambda doc: (-doc['popularity_score'], -doc['id']),
+}
+DEFAULT_SORT = 'popular'
+
+# Search results only: keep the search engine's ranking
+RELEVANCE_SORT = 'relevance'
+
+
+class FacetResult:
+    """
+    Ordered matches for one shop request plus facet counts.
+
+    Behaves as a sequence so it can be handed straight to a Paginator:
+    len() is the match count and slicing loads only that slice of bouquets.
+    """
+
+    def __init__(self, index, matched, sort_by, occasion_counts, category_counts, ranked=None):
+        self.index = index
+        self.matched = matched
+        self.sort_by = sort_by
+        self.occasion_counts = occasion_counts
+        self.category_counts = category_counts
+        # Matches in search rank order, for RELEVANCE_SORT
+        self.ranked = [bouquet_id for bouquet_id in ranked if bouquet_id in matched] if ranked is not None else None
+
+    def __len__(self):
+        return len(self.matched)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+
+        start, stop, _ = item.indices(len(self.matched))
+        if self.sort_by == RELEVANCE_SORT:
+            bouquet_ids = self.ranked[start:stop]
+        else:
+            bouquet_ids = self.index.ordered_ids(self.matched, self.sort_by, start, stop)
+        bouquets = Bouquet.objects.select_related('category').in_bulk(bouquet_ids)
+        # Skip anything deleted since the index snapshot
+        return [bouquets[bouquet_id] for bouquet_id in bouquet_ids if bouquet_id in bouquets]
+
+
+class CatalogFacetIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._version = None
+        self._docs = {}
+        self._by_occasion = {}
+        self._by_category = {}
+        self._prices = []  # sorted (effective_price, id)
+        self._orders = {sort_by: [] for sort_by in SORT_KEYS}
+
+    # ---------------- LOADING ---------------- #
+
+    def _load_docs(self, bouquet_ids=None):
+        """Read the indexed fields of active bouquets in two queries"""
+        bouquets = Bouquet.objects.filter(is_active=1)
+        links = BouquetOccasion.objects.filter(bouquet__is_active=1, occasion__isnull=False)
+        if bouquet_ids is not None:
+            bouquets = bouquets.filter(id__in=bouquet_ids)
+            links = links.filter(bouquet_id__in=bouquet_ids)
+
+        docs = {}
+        rows = bouquets.values_list('id', 'category_id', 'effective_price', 'popularity_score', 'created_at')
+        for bouquet_id, category_id, effective_price, popularity_score, created_at in rows:
+            docs[bouquet_id] = {
+                'id': bouquet_id,
+                'category_id': category_id,
+                'effective_price': effective_price,
+                'popularity_score': popularity_score or 0,
+                'created_at': created_at,
+                'created_ts': created_at.timestamp() if created_at else 0,
+                'occasion_ids': set(),
+            }
+
+        for bouquet_id, occasion_id in links.values_list('bouquet_id', 'occasion_id'):
+            if bouquet_id in docs:
+                docs[bouquet_id]['occasion_ids'].add(occasion_id)
+
+        return docs
+
+    def _add(self, doc):
+        bouquet_id = doc['id']
+        self._docs[bouquet_id] = doc
+        for occasion_id in doc['occasion_ids']:
+            self._by_occasion.setdefault(occasion_id, set()).add(bouquet_id)
+        self._by_category.setdefault(doc['category_id'], set()).add(bouquet_id)
+        if doc['effective_price'] is not None:
+            bisect.insort(self._prices, (doc['effective_price'], bouquet_id))
+        for sort_by, sort_key in SORT_KEYS.items():
+            bisect.insort(self._orders[sort_by], (sort_key(doc), bouquet_id))
+
+    def _remove(self, bouquet_id):
+        doc = self._docs.pop(bouquet_id, None)
+        if doc is None:
+            return
+        for occasion_id in doc['occasion_ids']:
+            self._by_occasion.get(occasion_id, set()).discard(bouquet_id)
+        self._by_category.get(doc['category_id'], set()).discard(bouquet_id)
+        if doc['effective_price'] is not None:
+            _remove_sorted(self._prices, (doc['effective_price'], bouquet_id))
+        for sort_by, sort_key in SORT_KEYS.items():
+            _remove_sorted(self._orders[sort_by], (sort_key(doc), bouquet_id))
+
+    def rebuild(self):
+        """Load the whole active catalog (two queries)"""
+        version = cache.get(FACET_VERSION_KEY)
+        docs = self._load_docs()
+
+        with self._lock:
+            self._docs = {}
+            self._by_occasion = {}
+            self._by_category = {}
+            self._prices = []
+            self._orders = {sort_by: [] for sort_by in SORT_KEYS}
+
+            # Sort once instead of inserting one by one
+            for doc in docs.values():
+                self._docs[doc['id']] = doc
+                for occasion_id in doc['occasion_ids']:
+                    self._by_occasion.setdefault(occasion_id, set()).add(doc['id'])
+                self._by_category.setdefault(doc['category_id'], set()).add(doc['id'])
+            self._prices = sorted(
+                (d['effective_price'], d['id']) for d in docs.values() if d['effective_price'] is not None
+            )
+            for sort_by, sort_key in SORT_KEYS.items():
+                self._orders[sort_by] = sorted((sort_key(d), d['id']) for d in docs.values())
+
+            self._version = version
+            self._built_at = time.monotonic()
+
+        logger.info(f"Facet index rebuilt with {len(docs)} active bouquet(s)")
+
+    def refresh(self, bouquet_ids):
+        """Re-read the given bouquets and patch them into the index"""
+        bouquet_ids = {int(bouquet_id) for bouquet_id in bouquet_ids if bouquet_id is not None}
+        if not bouquet_ids:
+            return
+
+        with self._lock:
+            if self._built_at is None:
+                return  # Nothing built yet - the next request does a full build
+            docs = self._load_docs(bouquet_ids)
+            for bouquet_id in bouquet_ids:
+                self._remove(bouquet_id)
+                if bouquet_id in docs:
+                    self._add(docs[bouquet_id])
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.rebuild()
+            return
+
+        stale = time.monotonic() - self._built_at > FACET_INDEX_MAX_AGE
+        if stale or cache.get(FACET_VERSION_KEY) != self._version:
+            self.rebuild()
+
+    def mark_current(self, version):
+        """Adopt a version bumped by this process, after patching the index locally"""
+        with self._lock:
+            self._version = version
+
+    # ---------------- QUERIES ---------------- #
+
+    def _price_matches(self, min_price, max_price):
+        """IDs whose effective price is in the range, or None when there is no price filter"""
+        if min_price is None and max_price is None:
+            return None
+        low = bisect.bisect_left(self._prices, (min_price, -1)) if min_price is not None else 0
+        high = bisect.bisect_right(self._prices, (max_price, sys.maxsize)) if max_price is not None else len(self._prices)
+        return {bouquet_id for _, bouquet_id in self._prices[low:high]}
+
+    def search(self, occasion_ids, category_ids, min_price=None, max_price=None, sort_by=DEFAULT_SORT, ranked=None):
+        """
+        Match bouquets against the shop filters. Filters combine with AND,
+        values within one filter with OR. Facet counts for occasions and
+        categories ignore their own selection, so each option shows how many
+        results picking it would add.
+
+        ranked (text search hits, best first) restricts everything, facet
+        counts included, to those bouquets and enables RELEVANCE_SORT.
+        """
+        self._ensure_fresh()
+
+        with self._lock:
+            all_ids = set(self._docs)
+            if ranked is not None:
+                all_ids &= set(ranked)
+            occasion_matches = None
+            if occasion_ids:
+                occasion_matches = set().union(*(self._by_occasion.get(o, set()) for o in occasion_ids))
+            category_matches = None
+            if category_ids:
+                category_matches = set().union(*(self._by_category.get(c, set()) for c in category_ids))
+            price_matches = self._price_matches(min_price, max_price)
+
+            base_for_occasions = _intersect(all_ids, category_matches, price_matches)
+            base_for_categories = _intersect(all_ids, occasion_matches, price_matches)
+            matched = _intersect(base_for_occasions, occasion_matches)
+
+            occasion_counts = {
+                occasion_id: len(ids & base_for_occasions)
+                for occasion_id, ids in self._by_occasion.items()
+            }
+            category_counts = {
+                category_id: len(ids & base_for_categories)
+                for category_id, ids in self._by_category.items()
+                if category_id is not None
+            }
+
+        if sort_by not in SORT_KEYS and not (sort_by == RELEVANCE_SORT and ranked is not None):
+            sort_by = DEFAULT_SORT
+        return FacetResult(self, matched, sort_by, occasion_counts, category_counts, ranked)
+
+    def ordered_ids(self, matched, sort_by, start, stop):
+        """
+        IDs at positions [start, stop) of the matches in the given sort order.
+        An unfiltered request slices the order directly. A filtered one walks
+        it from the top and stops at the end of the page, so a page costs up
+        to one pass over the active catalog (the number of IDs before its last
+        match) - fine for thousands of bouquets, not for millions.
+        """
+        if stop <= start:
+            return []
+        page = []
+        position = 0
+        with self._lock:
+            order = self._orders[sort_by]
+            if len(matched) == len(order) and matched == self._docs.keys():
+                return [bouquet_id for _, bouquet_id in order[start:stop]]
+            for _, bouquet_id in order:
+                if bouquet_id not in matched:
+                    continue
+                if position >= start:
+                    page.append(bouquet_id)
+                    if len(page) == stop - start:
+                        break
+                position += 1
+        return page
+
+    def price_range(self):
+        """Lowest and highest effective price of the active catalog"""
+        self._ensure_fresh()
+        with self._lock:
+            if not self._prices:
+                return {'min_price': None, 'max_price': None}
+            return {'min_price': self._prices[0][0], 'max_price': self._prices[-1][0]}
+
+
+def _intersect(base, *filters):
+    result = base
+    for ids in filters:
+        if ids is not None:
+            result = result & ids
+    return result
+
+
+def _remove_sorted(items, item):
+    position = bisect.bisect_left(items, item)
+    if position < len(items) and items[position] == item:
+        del items[position]
+
+
+facet_index = CatalogFacetIndex()
+
+
+# ---------------- INVALIDATION ---------------- #
+
+def _bump_version():
+    version = time.time_ns()
+    cache.set(FACET_VERSION_KEY, version, None)
+    return version
+
+
+def bouquets_changed(bouquet_ids):
+    """
+    Call after bouquets were created, edited or deleted (including their
+    occasions or category). Runs once the surrounding transaction commits.
+    """
+    bouquet_ids = list(bouquet_ids)
+
+    def apply():
+        try:
+            was_current = facet_index._version == cache.get(FACET_VERSION_KEY)
+            facet_index.refresh(bouquet_ids)
+            version = _bump_version()
+            if was_current:
+                facet_index.mark_current(version)
+        except Exception as e:
+            logger.exception(f"Failed to update facet index: {str(e)}")
+
+    transaction.on_commit(apply)
+
+
+def catalog_changed():
+    """Call after changes that touch many bouquets at once - every worker rebuilds"""
+    transaction.on_commit(_bump_version)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store.dashboard_metrics import rebuild_order_stats, rebuild_review_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the admin dashboard rollup tables (daily_order_stats, bouquet_review_stats)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders-only', action='store_true', help='Only rebuild daily_order_stats')
+        parser.add_argument('--reviews-only', action='store_true', help='Only rebuild bouquet_review_stats')
+
+    def handle(self, *args, **options):
+        if not options['reviews_only']:
+            count = rebuild_order_stats()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily order stat row(s)."))
+
+        if not options['orders_only']:
+            count = rebuild_review_stats()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} bouquet review stat row(s)."))
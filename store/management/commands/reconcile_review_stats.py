@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from store.dashboard_metrics import reconcile_review_stats
+
+
+class Command(BaseCommand):
+    help = 'Compare bouquet_review_stats with the reviews table and repair bouquets whose stats drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the bouquets that drifted')
+
+    def handle(self, *args, **options):
+        drifted = reconcile_review_stats(fix=not options['dry_run'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Review stats match the reviews table.'))
+            return
+
+        ids = ', '.join(str(bouquet_id) for bouquet_id in drifted)
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} bouquet(s) with stale review stats: {ids}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Repaired review stats of {len(drifted)} bouquet(s): {ids}"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from store.popularity import rebuild_popularity, refresh_popularity
+
+
+class Command(BaseCommand):
+    help = 'Add recent orders, views, cart adds and reviews to the bouquet popularity scores (run every few minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every score from the source tables')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            count = rebuild_popularity()
+        else:
+            count = refresh_popularity()
+
+        if count is None:
+            self.stdout.write(self.style.WARNING('Another popularity refresh is running; nothing done.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Updated the popularity of {count} bouquet(s)."))
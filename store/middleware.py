@@ -1,131 +1,470 @@
 # store/middleware.py
+"""
+Request policy middleware.
 
-from django.shortcuts import redirect
+RequestPolicyMiddleware replaces DirectAccessMiddleware, the three
+middleware_navigation classes and settings.security_headers_middleware with a
+single pass over each request:
+
+* the page lists below and TRUSTED_REFERER_ORIGINS are compiled once at startup
+* each path is classified once (memoised) into a PathPolicy, which is attached
+  to the request as ``request.policy``
+* the direct-access, session and back/forward checks run off that decision
+* response headers are copied from blocks prebuilt at startup
+
+HeartbeatMiddleware answers the /check-session/ poll from a signed
+session-status cookie that RequestPolicyMiddleware keeps in step with the
+session, without loading the session or the user from the database.
+"""
+import hashlib
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+from importlib import import_module
+from typing import NamedTuple
+from urllib.parse import urlparse
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import logout
-import logging
+from django.core import signing
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.shortcuts import redirect
+from django.utils.crypto import constant_time_compare
 
 logger = logging.getLogger(__name__)
 
-class DirectAccessMiddleware:
+# Pages any logged-in user may open directly (home has its own rule)
+PUBLIC_PAGES = [
+    '/login/', '/register/', '/logout/',
+    '/admin/', '/static/', '/media/', '/accounts/',
+]
+
+# Pages that may be opened from an external referer
+EXTERNAL_ALLOWED_PAGES = []
+
+# Pages guarded against back/forward navigation
+PROTECTED_PAGES = [
+    '/dashboard/', '/profile/', '/checkout/', '/order-confirmation/',
+    '/shop/', '/cart_view', '/bouquets/', '/vendors/', '/occasions/',
+    '/users/', '/admin-dashboard/', '/cart/', '/place-order/',
+]
+
+# Pages exempt from the back/forward check. These are prefixes, so '/' exempts
+# every path, which keeps the check switched off as it has been so far.
+NAVIGATION_PUBLIC_PAGES = [
+    '/login/', '/register/', '/logout/',
+    '/static/', '/media/', '/admin/',
+    '/',  # Home page
+    '/check-session/',
+]
+
+# Login and register pages are always reachable
+AUTH_PAGES = ['/login', '/register']
+
+# Pages skipped by the session checks (besides AUTH_PAGES)
+SESSION_EXEMPT_PAGES = ['/static/', '/media/', '/admin/', '/check-session/']
+
+# Pages that keep their own caching headers for anonymous users
+CACHEABLE_PAGES = ['/static/', '/media/', '/login', '/register']
+
+SESSION_MAX_AGE = 1800  # 30 minutes
+
+SESSION_REFRESHED_MESSAGE = 'Your session has been refreshed. Please log in again to continue.'
+
+HEARTBEAT_PATH = '/check-session/'
+HEARTBEAT_COOKIE = 'session_status'
+HEARTBEAT_SALT = 'store.middleware.heartbeat'
+HEARTBEAT_ANONYMOUS_SALT = 'store.middleware.heartbeat.anonymous'
+
+# An idle session expires 25-30 minutes after the last request (see
+# rose_and_roots/session_store.py). Status cookies older than the lower bound
+# are not trusted; those polls go to the view, which loads the session.
+SESSION_REFRESH_INTERVAL = getattr(settings, 'SESSION_REFRESH_INTERVAL', 300)
+HEARTBEAT_MAX_IDLE = settings.SESSION_COOKIE_AGE - SESSION_REFRESH_INTERVAL
+
+
+def _prefix_matcher(prefixes):
+    """One compiled regex that tells whether a path starts with any of the prefixes"""
+    if not prefixes:
+        return lambda path: False
+    pattern = re.compile('|'.join(re.escape(prefix) for prefix in sorted(prefixes, key=len, reverse=True)))
+    return lambda path: pattern.match(path) is not None
+
+
+_is_public = _prefix_matcher(PUBLIC_PAGES)
+_is_external_allowed = _prefix_matcher(EXTERNAL_ALLOWED_PAGES)
+_is_protected = _prefix_matcher(PROTECTED_PAGES)
+_is_navigation_public = _prefix_matcher(NAVIGATION_PUBLIC_PAGES)
+_is_auth_page = _prefix_matcher(AUTH_PAGES)
+_is_session_exempt = _prefix_matcher(SESSION_EXEMPT_PAGES)
+_is_cacheable = _prefix_matcher(CACHEABLE_PAGES)
+
+
+class PathPolicy(NamedTuple):
+    is_home: bool
+    direct_access_exempt: bool
+    external_allowed: bool
+    session_exempt: bool
+    navigation_protected: bool
+    cacheable: bool
+
+
+@lru_cache(maxsize=2048)
+def classify_path(path):
+    """Everything the middleware needs to know about a path, computed once per path"""
+    auth_page = _is_auth_page(path)
+    return PathPolicy(
+        is_home=path == '/',
+        direct_access_exempt=_is_public(path),
+        external_allowed=_is_external_allowed(path),
+        session_exempt=auth_page or _is_session_exempt(path),
+        navigation_protected=not auth_page and not _is_navigation_public(path) and _is_protected(path),
+        cacheable=_is_cacheable(path),
+    )
+
+
+def _security_headers():
+    return (
+        ('Content-Security-Policy', settings.CONTENT_SECURITY_POLICY),
+        ('X-XSS-Protection', '1; mode=block'),
+        ('X-Content-Type-Options', 'nosniff'),
+        ('X-Frame-Options', 'DENY'),
+        ('Referrer-Policy', 'strict-origin-when-cross-origin'),
+        ('Permissions-Policy', settings.PERMISSIONS_POLICY),
+        ('Cross-Origin-Resource-Policy', 'same-origin'),
+        ('Cross-Origin-Opener-Policy', 'same-origin'),
+        ('Cross-Origin-Embedder-Policy', 'require-corp'),
+    )
+
+
+def _hsts_header():
+    # HSTS (only in production with HTTPS)
+    if settings.DEBUG:
+        return None
+    parts = [f"max-age={settings.SECURE_HSTS_SECONDS}"]
+    if settings.SECURE_HSTS_INCLUDE_SUBDOMAINS:
+        parts.append('includeSubDomains')
+    if settings.SECURE_HSTS_PRELOAD:
+        parts.append('preload')
+    return '; '.join(parts)
+
+
+# Authenticated pages must never come back from the browser cache
+AUTHENTICATED_CACHE_HEADERS = (
+    ('Cache-Control', 'no-store, no-cache, must-revalidate, max-age=0'),
+    ('Pragma', 'no-cache'),
+    ('Expires', '0'),
+)
+
+ANONYMOUS_CACHE_HEADERS = (
+    ('Cache-Control', 'no-cache, no-store, must-revalidate, private'),
+    ('Pragma', 'no-cache'),
+    ('Expires', '0'),
+)
+
+
+class RequestPolicyMiddleware:
     """
-    Strict middleware to block ALL direct URL access with active sessions.
+    Direct-access blocking, session validation, back/forward protection and
+    security/cache headers. Must come after the auth and messages middleware.
     """
-    
-    PUBLIC_PAGES = [
-        '/login/', '/register/', '/logout/', 
-        '/admin/', '/static/', '/media/', '/accounts/',
-    ]
-    
-    EXTERNAL_ALLOWED_PAGES = []
-    
+
     def __init__(self, get_response):
         self.get_response = get_response
-    
+        self.trusted_origins = tuple(settings.TRUSTED_REFERER_ORIGINS)
+        self.security_headers = _security_headers()
+        self.hsts_header = _hsts_header()
+
     def __call__(self, request):
-        current_path = request.path
-        
-        # Check if user has active session
+        policy = classify_path(request.path)
+        request.policy = policy
+
+        response = None
         if request.user.is_authenticated:
-            # For home page - special handling
-            if current_path == '/':
-                if self._is_direct_browser_access(request):
-                    return self._handle_logout_redirect(request, current_path)
-            
-            # For other pages
-            elif not self._is_public_path(current_path):
-                access_type = self._get_access_type(request)
-                
-                if access_type == 'direct':
-                    return self._handle_logout_redirect(request, current_path)
-                
-                elif access_type == 'external' and not self._is_external_allowed(current_path):
-                    return self._handle_logout_redirect(request, current_path)
-        
-        response = self.get_response(request)
-        return response
-    
-    def _is_public_path(self, path):
-        """Check if path is public (excluding home)"""
-        for public_page in self.PUBLIC_PAGES:
-            if path.startswith(public_page):
-                return True
-        return False
-    
-    def _is_direct_browser_access(self, request):
-        """Detect direct browser access (typing URL)"""
-        referer = request.META.get('HTTP_REFERER')
-        
+            response = self.check_request(request, policy)
+        if response is None:
+            response = self.get_response(request)
+
+        return self.apply_headers(request, policy, response)
+
+    # ---------------- REQUEST CHECKS ---------------- #
+
+    def check_request(self, request, policy):
+        """Redirect response if the authenticated request must be refused, else None"""
+        referer = request.META.get('HTTP_REFERER', '')
+        trusted_referer = referer.startswith(self.trusted_origins)
+
+        # Direct URL access (typed, bookmarked or from another site)
+        if policy.is_home:
+            if not trusted_referer:
+                return self.block_access(request)
+        elif not policy.direct_access_exempt and not trusted_referer:
+            if not referer:
+                return self.block_access(request)
+            if not policy.external_allowed and referer != request.build_absolute_uri():
+                return self.block_access(request)
+
+        if not policy.session_exempt:
+            response = self.validate_session(request)
+            if response is not None:
+                return response
+
+        if policy.navigation_protected and self.is_browser_navigation(request, referer):
+            logger.warning(
+                f"BACK/FORWARD NAVIGATION DETECTED - User: {request.user.email}, "
+                f"Path: {request.path}, IP: {request.META.get('REMOTE_ADDR')}, "
+                f"Referer: {referer}"
+            )
+            return self.end_session(request, SESSION_REFRESHED_MESSAGE)
+
+        return None
+
+    def validate_session(self, request):
+        user_email = request.user.email
+
+        # Check if logout was completed
+        if request.session.get('logout_completed', False):
+            logger.warning(f"Session marked as logged out for {user_email}")
+            return self.end_session(request, SESSION_REFRESHED_MESSAGE)
+
+        # Check session age
+        session_created = request.session.get('session_created_at')
+        if session_created and time.time() - session_created > SESSION_MAX_AGE:
+            logger.info(f"Session expired for {user_email}")
+            return self.end_session(request, 'Your session has expired. Please log in again to continue.')
+
+        # Check for session validation header from client
+        session_valid_header = request.META.get('HTTP_X_SESSION_VALID', '')
+        current_user_id = str(request.session.get('_auth_user_id', ''))
+        if session_valid_header and current_user_id and session_valid_header != current_user_id:
+            logger.warning(f"Session validation mismatch for {user_email}")
+            return self.end_session(request, SESSION_REFRESHED_MESSAGE)
+
+        return None
+
+    def is_browser_navigation(self, request, referer):
+        """Detect browser back/forward button navigation"""
+        # Don't block AJAX requests
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return False
+
+        # If no referer, it could be direct access or bookmark
         if not referer:
             return True
-        
-        our_domains = [
-            'http://127.0.0.1:8000',
-            'http://localhost:8000',
-            'https://littlecraftone.com',
-            'https://www.littlecraftone.com',
-        ]
-        
-        for domain in our_domains:
-            if referer.startswith(domain):
-                return False
-        
-        return True
-    
-    def _get_access_type(self, request):
-        """Determine how the page was accessed"""
-        referer = request.META.get('HTTP_REFERER')
-        
-        if not referer:
-            return 'direct'
-        
+
+        # Check for browser cache indicators
+        cache_control = request.META.get('HTTP_CACHE_CONTROL', '')
+        if 'max-age=0' in cache_control or 'no-cache' in cache_control or request.META.get('HTTP_PRAGMA') == 'no-cache':
+            return True
+
         current_full_url = request.build_absolute_uri()
-        
+
+        # If referer is exactly the same as current URL, it's likely a refresh
         if referer == current_full_url:
-            return 'internal'
-        
-        our_domains = [
-            'http://127.0.0.1:8000',
-            'http://localhost:8000',
-            'https://littlecraftone.com',
-            'https://www.littlecraftone.com',
-        ]
-        
-        for domain in our_domains:
-            if referer.startswith(domain):
-                return 'internal'
-        
-        return 'external'
-    
-    def _is_external_allowed(self, path):
-        """Check if external access is allowed"""
-        for allowed in self.EXTERNAL_ALLOWED_PAGES:
-            if path.startswith(allowed):
-                return True
-        return False
-    
-    def _handle_logout_redirect(self, request, path):
-        """Handle logout and redirect to home with generic message"""
-        user_email = request.user.email if request.user.is_authenticated else 'Anonymous'
-        
-        # Generic user-friendly message (security best practice)
-        message = 'Your session has been refreshed. Please log in again to continue.'
-        
+            return False
+
+        # Check if the request is coming from a different domain
+        referer_domain = urlparse(referer).netloc
+        return bool(referer_domain) and referer_domain != request.get_host()
+
+    def block_access(self, request):
         # Log detailed information for security monitoring (not shown to user)
         logger.warning(
-            f"ACCESS BLOCKED - User: {user_email}, "
-            f"Path: {path}, IP: {request.META.get('REMOTE_ADDR')}, "
+            f"ACCESS BLOCKED - User: {request.user.email}, "
+            f"Path: {request.path}, IP: {request.META.get('REMOTE_ADDR')}, "
             f"User-Agent: {request.META.get('HTTP_USER_AGENT')}"
         )
-        
+        return self.end_session(request, SESSION_REFRESHED_MESSAGE)
+
+    def end_session(self, request, message):
+        """Log the user out with a generic message and send them home"""
+        user_email = request.user.email
+
         # Add generic message BEFORE logout
         messages.info(request, message)
-        
+
         # Logout and clear session
         logout(request)
         request.session.flush()
-        
+
         logger.info(f"Session cleared for user: {user_email}")
-        
-        # Redirect to home page
-        return redirect('/')
\ No newline at end of file
+        return redirect('/')
+
+    # ---------------- RESPONSE HEADERS ---------------- #
+
+    def apply_headers(self, request, policy, response):
+        for name, value in self.security_headers:
+            response[name] = value
+
+        if self.hsts_header and request.is_secure():
+            response['Strict-Transport-Security'] = self.hsts_header
+
+        # Remove Server header to hide technology
+        if 'Server' in response:
+            del response['Server']
+
+        # Immutable responses (resized media) are the same for every visitor:
+        # keep their caching headers and leave out the per-user ones
+        if 'immutable' in response.get('Cache-Control', ''):
+            return response
+
+        if request.user.is_authenticated:
+            for name, value in AUTHENTICATED_CACHE_HEADERS:
+                response[name] = value
+            response['X-Session-Valid'] = str(request.session.get('_auth_user_id', ''))
+
+        elif not policy.cacheable:
+            for name, value in ANONYMOUS_CACHE_HEADERS:
+                response[name] = value
+
+        # Keep the heartbeat status cookie in step with the session
+        status_token = heartbeat_token(request)
+        if request.COOKIES.get(HEARTBEAT_COOKIE) != status_token:
+            response.set_cookie(
+                HEARTBEAT_COOKIE, status_token,
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Strict',
+            )
+
+        return response
+
+
+# ---------------- HEARTBEAT ---------------- #
+
+NOT_AUTHENTICATED_STATUS = {
+    'valid': False,
+    'authenticated': False,
+    'message': 'Not authenticated',
+    'redirect_to_login': False,  # Don't auto-redirect
+}
+
+
+def _session_digest(session_key):
+    """Ties a token to one session without putting the session key in the cookie"""
+    return hashlib.sha256((session_key or '').encode()).hexdigest()[:16]
+
+
+@lru_cache(maxsize=1024)
+def _anonymous_heartbeat_token(session_key):
+    return signing.Signer(salt=HEARTBEAT_ANONYMOUS_SALT).sign(f'anonymous:{_session_digest(session_key)}')
+
+
+def _heartbeat_value(request):
+    session = request.session
+    created_at = session.get('session_created_at')
+    return ':'.join([
+        str(getattr(request.user, 'pk', None) or ''),
+        str(session.get('role_id') or ''),
+        '1' if session.get('auth_flow_completed') else '0',
+        str(int(created_at)) if created_at else '',
+        _session_digest(session.session_key),
+    ])
+
+
+def heartbeat_token(request):
+    """
+    Timestamped, signed user id, role, auth flow flag, session start and
+    session digest; 'anonymous' and the session digest when logged out. The current cookie is kept
+    until it is SESSION_REFRESH_INTERVAL old, so the timestamp trails the
+    last request by at most that much.
+    """
+    if not request.user.is_authenticated:
+        return _anonymous_heartbeat_token(request.session.session_key)
+
+    value = _heartbeat_value(request)
+    signer = signing.TimestampSigner(salt=HEARTBEAT_SALT)
+    current = request.COOKIES.get(HEARTBEAT_COOKIE)
+    if current:
+        try:
+            if signer.unsign(current, max_age=SESSION_REFRESH_INTERVAL) == value:
+                return current
+        except (signing.BadSignature, ValueError):
+            pass  # Expired, tampered, or issued before tokens were timestamped
+    return signer.sign(value)
+
+
+def heartbeat_status(token, session_key):
+    """
+    check_session_validity() payload for a heartbeat token, or None if it
+    can't be trusted: bad signature, issued for another session, or older than
+    HEARTBEAT_MAX_IDLE (the session itself may have idled out by then).
+    """
+    if constant_time_compare(token, _anonymous_heartbeat_token(session_key)):
+        return NOT_AUTHENTICATED_STATUS
+
+    try:
+        value = signing.TimestampSigner(salt=HEARTBEAT_SALT).unsign(token, max_age=HEARTBEAT_MAX_IDLE)
+        _user_id, role_id, auth_flow, created_at, session_digest = value.split(':')
+    except (signing.BadSignature, ValueError):
+        return None
+
+    if not constant_time_compare(session_digest, _session_digest(session_key)):
+        return None
+
+    if created_at and time.time() - int(created_at) > SESSION_MAX_AGE:
+        return {'valid': False, 'authenticated': False, 'message': 'Session expired'}
+
+    return {
+        'valid': True,
+        'authenticated': True,
+        'auth_flow_completed': auth_flow == '1',
+        'role_id': int(role_id) if role_id else None,
+    }
+
+
+class HeartbeatMiddleware:
+    """
+    Answers GET /check-session/ from the session-status cookie, before the
+    session and auth middleware run, with an ETag so unchanged answers are a
+    304. Requests it cannot answer safely (a session cookie without a status
+    cookie, a bad, stale or other session's token, a session no longer in the
+    session cache) fall through to store.views.check_session_validity.
+    Place it right after SecurityMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+    def session_is_cached(self, session_key):
+        """Whether the session is still in the session cache (checked without the database)"""
+        store = self.SessionStore(session_key)
+        if store.session_key is None or not hasattr(store, 'cache_key'):
+            return False
+        return caches[settings.SESSION_CACHE_ALIAS].get(store.cache_key) is not None
+
+    def __call__(self, request):
+        if request.path != HEARTBEAT_PATH or request.method != 'GET':
+            return self.get_response(request)
+
+        token = request.COOKIES.get(HEARTBEAT_COOKIE)
+        session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+
+        if not session_key:
+            # No session at all, whatever the status cookie says
+            status = NOT_AUTHENTICATED_STATUS
+        elif token:
+            status = heartbeat_status(token, session_key)
+            if status is None:
+                return self.get_response(request)
+            # Logged out elsewhere or expired: the session is gone from the store
+            if status['authenticated'] and not self.session_is_cached(session_key):
+                return self.get_response(request)
+        else:
+            return self.get_response(request)
+
+        body = json.dumps(status)
+        etag = '"%s"' % hashlib.md5(body.encode()).hexdigest()
+
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        # The browser must revalidate every time, which is what makes the 304 cheap
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Cookie'
+        return response
@@ -0,0 +1,75 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_order_stats(apps, schema_editor):
+    """Fill daily_order_stats from existing orders (same rows as rebuild_order_stats)"""
+    Order = apps.get_model('store', 'Order')
+    DailyOrderStat = apps.get_model('store', 'DailyOrderStat')
+
+    rows = Order.objects.annotate(
+        stat_date=TruncDate('order_date', tzinfo=timezone.get_current_timezone())
+    ).values('stat_date', 'status').annotate(
+        order_count=Count('id'),
+        revenue=Sum('total'),
+    ).order_by()
+
+    DailyOrderStat.objects.all().delete()
+    DailyOrderStat.objects.bulk_create(
+        (
+            DailyOrderStat(
+                stat_date=row['stat_date'],
+                status=row['status'],
+                order_count=row['order_count'],
+                revenue=row['revenue'] or 0,
+            )
+            for row in rows
+            if row['stat_date'] is not None
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0009_bouquetlisting'),
+        ('store', '0004_order_orderitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BouquetReviewStat',
+            fields=[
+                ('bouquet', models.OneToOneField(db_column='bouquet_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_stat', serialize=False, to='masters.bouquet')),
+                ('review_count', models.IntegerField(default=0)),
+                ('avg_rating', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'bouquet_review_stats',
+                'indexes': [models.Index(fields=['-review_count'], name='review_stat_count_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyOrderStat',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('stat_date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'daily_order_stats',
+                'constraints': [models.UniqueConstraint(fields=('stat_date', 'status'), name='unique_daily_order_stat')],
+            },
+        ),
+        migrations.RunPython(backfill_order_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:20
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    """Rebuild every bouquet's stats from its active reviews (counts now exclude inactive ones)"""
+    Review = apps.get_model('store', 'Review')
+    BouquetReviewStat = apps.get_model('store', 'BouquetReviewStat')
+
+    per_bouquet = {}
+    rows = Review.objects.filter(is_active=1).values_list('bouquet_id', 'rating').annotate(count=Count('id')).order_by()
+    for bouquet_id, rating, count in rows:
+        fields = per_bouquet.setdefault(bouquet_id, {f'rating_{stars}': 0 for stars in range(1, 6)})
+        if 1 <= rating <= 5:
+            fields[f'rating_{rating}'] += count
+
+    stats = []
+    for bouquet_id, fields in per_bouquet.items():
+        review_count = sum(fields.values())
+        rating_sum = sum(stars * fields[f'rating_{stars}'] for stars in range(1, 6))
+        stats.append(BouquetReviewStat(
+            bouquet_id=bouquet_id,
+            review_count=review_count,
+            rating_sum=rating_sum,
+            avg_rating=round(Decimal(rating_sum) / review_count, 2) if review_count else Decimal('0'),
+            **fields,
+        ))
+
+    BouquetReviewStat.objects.all().delete()
+    BouquetReviewStat.objects.bulk_create(stats, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0013_bouquet_search'),
+        ('store', '0006_order_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bouquetreviewstat',
+            name='rating_1',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bouquetreviewstat',
+            name='rating_2',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bouquetreviewstat',
+            name='rating_3',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bouquetreviewstat',
+            name='rating_4',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bouquetreviewstat',
+            name='rating_5',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bouquetreviewstat',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['bouquet', 'is_active', '-created_at', '-id'], name='review_bouquet_page_idx'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-18 17:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0016_bouquet_popularity_score'),
+        ('store', '0007_review_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BouquetPopularity',
+            fields=[
+                ('bouquet', models.OneToOneField(db_column='bouquet_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='masters.bouquet')),
+                ('orders', models.FloatField(default=0)),
+                ('views', models.FloatField(default=0)),
+                ('cart_adds', models.FloatField(default=0)),
+                ('reviews', models.FloatField(default=0)),
+                ('computed_through', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'bouquet_popularity',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['added_at'], name='cart_item_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['created_at'], name='order_item_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bouquetpopularity',
+            index=models.Index(fields=['-computed_through'], name='popularity_computed_idx'),
+        ),
+    ]
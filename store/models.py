@@ -69,6 +69,10 @@ class CartItem(models.Model):
     class Meta:
         db_table = 'cart_item'
         unique_together = ['cart', 'bouquet']
+        indexes = [
+            # Cart adds since the last popularity refresh (store.popularity)
+            models.Index(fields=['added_at'], name='cart_item_added_idx'),
+        ]
     
     def __str__(self):
         return f"{self.bouquet_name or 'Product'} in cart"
@@ -102,6 +106,11 @@ class Review(models.Model):
     class Meta:
         db_table = 'product_reviews'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pages of a bouquet's active reviews, newest first
+            models.Index(fields=['bouquet', 'is_active', '-created_at', '-id'], name='review_bouquet_page_idx'),
+            models.Index(fields=['created_at'], name='review_created_idx'),
+        ]
     
     def __str__(self):
         return f"Review for {self.bouquet.name} by {self.user.email}"
@@ -181,6 +190,16 @@ class Order(models.Model):
     class Meta:
         db_table = 'orders'
         ordering = ['-order_date']
+        indexes = [
+            # Admin order list: status filter / customer history, newest first
+            models.Index(fields=['status', 'order_date'], name='orders_status_date_idx'),
+            models.Index(fields=['user', 'order_date'], name='orders_user_date_idx'),
+            # Order search lookups (store.order_search)
+            models.Index(fields=['phone'], name='orders_phone_idx'),
+            models.Index(fields=['email'], name='orders_email_idx'),
+            models.Index(fields=['last_name', 'first_name'], name='orders_name_idx'),
+            models.Index(fields=['first_name'], name='orders_first_name_idx'),
+        ]
     
     def __str__(self):
         return f"Order #{self.order_number}"
@@ -230,6 +249,108 @@ class OrderItem(models.Model):
     
     class Meta:
         db_table = 'order_items'
+        indexes = [
+            # Order lines since the last popularity refresh (store.popularity)
+            models.Index(fields=['created_at'], name='order_item_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.bouquet_name} x {self.quantity}"
+# ------------------- DASHBOARD ROLLUPS -------------------
+
+class DailyOrderStat(models.Model):
+    """Orders and revenue per day and status, kept up to date by store.dashboard_metrics"""
+    id = models.AutoField(primary_key=True)
+    
+    stat_date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS)
+    
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'daily_order_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['stat_date', 'status'], name='unique_daily_order_stat'),
+        ]
+    
+    def __str__(self):
+        return f"{self.stat_date} {self.status}: {self.order_count}"
+
+class BouquetReviewStat(models.Model):
+    """
+    Rating aggregates of a bouquet's active reviews (count, sum, 1-5 star
+    histogram), kept up to date by store.dashboard_metrics
+    """
+    bouquet = models.OneToOneField(
+        Bouquet,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='review_stat',
+        db_column='bouquet_id'
+    )
+    
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    
+    # Star histogram: active reviews per rating
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
     
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    @property
+    def histogram(self):
+        """[(stars, count, percent of reviews)] from 5 stars down to 1"""
+        return [
+            (stars, count, round(count * 100 / self.review_count) if self.review_count else 0)
+            for stars in range(5, 0, -1)
+            for count in [getattr(self, f'rating_{stars}')]
+        ]
+    
+    class Meta:
+        db_table = 'bouquet_review_stats'
+        indexes = [
+            models.Index(fields=['-review_count'], name='review_stat_count_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Review stats for bouquet {self.bouquet_id}"
+
+class BouquetPopularity(models.Model):
+    """
+    Demand signals of a bouquet, each the sum of its events weighted by
+    2 ** ((event time - POPULARITY_EPOCH) / half-life); maintained by
+    store.popularity, which copies their weighted sum to Bouquet.popularity_score
+    """
+    bouquet = models.OneToOneField(
+        Bouquet,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='popularity',
+        db_column='bouquet_id'
+    )
+
+    orders = models.FloatField(default=0)
+    views = models.FloatField(default=0)
+    cart_adds = models.FloatField(default=0)
+    # Active reviews, each weighted by its rating / 5
+    reviews = models.FloatField(default=0)
+
+    # Events up to this time are included
+    computed_through = models.DateTimeField()
+
+    class Meta:
+        db_table = 'bouquet_popularity'
+        indexes = [
+            models.Index(fields=['-computed_through'], name='popularity_computed_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.bouquet_name} x {self.quantity}"
\ No newline at end of file
+        return f"Popularity of bouquet {self.bouquet_id}"
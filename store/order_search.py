@@ -0,0 +1,96 @@
+# store/order_search.py
+"""
+Order search for the admin order list.
+
+Support staff mostly paste an order number, a phone number or an email, so
+the query's shape picks the lookup and each one is served by an index instead
+of a leading-wildcard LIKE over five columns:
+
+* ORD-YYYYMMDD-NNNN      exact order_number (unique index)
+* ORD-2026..., 2026...   order_number prefix (same index, range scan)
+* 10-digit phone         exact phone (checkout stores 10 digits; a +91/91/0
+                         prefix or spaces/dashes are dropped first)
+* email address          exact email, case-insensitively
+* anything else          name prefix: every word must start the customer's
+                         first or last name (indexed name columns)
+"""
+import re
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db.models import Q
+
+ORDER_NUMBER_RE = re.compile(r'^ORD-\d{8}-\d{4}$', re.IGNORECASE)
+ORDER_NUMBER_PREFIX_RE = re.compile(r'^(ORD-?)?\d{4,8}(-\d{0,4})?$', re.IGNORECASE)
+PHONE_RE = re.compile(r'^\+?[\d\s\-()]+$')
+PHONE_DIGITS = 10
+
+MAX_NAME_TERMS = 4
+
+
+def _phone_number(query):
+    """The 10 stored digits of a phone query, or None"""
+    if not PHONE_RE.match(query):
+        return None
+    digits = re.sub(r'\D', '', query)
+    if len(digits) == PHONE_DIGITS + 2 and digits.startswith('91'):
+        digits = digits[2:]
+    elif len(digits) == PHONE_DIGITS + 1 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits if len(digits) == PHONE_DIGITS else None
+
+
+def _is_email(query):
+    try:
+        validate_email(query)
+    except ValidationError:
+        return False
+    return True
+
+
+def classify_order_query(query):
+    """
+    (kind, value) for a search query, kind being 'order_number',
+    'order_number_prefix', 'phone', 'email' or 'name' (value: list of words)
+    """
+    query = query.strip()
+    if ORDER_NUMBER_RE.match(query):
+        return 'order_number', query.upper()
+
+    phone = _phone_number(query)
+    if phone:
+        return 'phone', phone
+
+    if ORDER_NUMBER_PREFIX_RE.match(query):
+        prefix = query.upper()
+        if not prefix.startswith('ORD'):
+            prefix = f"ORD-{prefix}"
+        elif not prefix.startswith('ORD-'):
+            prefix = f"ORD-{prefix[3:]}"
+        return 'order_number_prefix', prefix
+
+    if _is_email(query):
+        return 'email', query
+
+    return 'name', query.split()[:MAX_NAME_TERMS]
+
+
+def search_orders(orders, query):
+    """Filter an Order queryset by an admin search query"""
+    query = (query or '').strip()
+    if not query:
+        return orders
+
+    kind, value = classify_order_query(query)
+    if kind == 'order_number':
+        return orders.filter(order_number=value)
+    if kind == 'order_number_prefix':
+        return orders.filter(order_number__startswith=value)
+    if kind == 'phone':
+        return orders.filter(phone=value)
+    if kind == 'email':
+        return orders.filter(email__iexact=value)
+
+    for term in value:
+        orders = orders.filter(Q(first_name__istartswith=term) | Q(last_name__istartswith=term))
+    return orders
@@ -0,0 +1,139 @@
+# store/order_stats.py
+"""
+Order statistics API.
+
+get_order_stats() returns per-status counts, revenue totals and date-window
+counts in one conditional-aggregate query:
+
+* unscoped - read from the daily_order_stats rollup (see dashboard_metrics)
+* scoped   - aggregated over the orders matching the given filters
+
+Results are cached for a short time under the order_stats cache namespace,
+which order saves invalidate.
+"""
+import hashlib
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from rose_and_roots.caching import ORDER_STATS, cached
+from store.models import DailyOrderStat, Order
+from store.order_search import search_orders
+
+logger = logging.getLogger(__name__)
+
+ORDER_STATS_CACHE_TIMEOUT = 30
+
+# Window name -> number of calendar days it covers, today included
+DATE_WINDOWS = {
+    'today': 1,
+    'week': 7,
+    'month': 30,
+}
+
+
+def scope_orders(status=None, date=None, search=None):
+    """Orders matching the admin order list filters"""
+    orders = Order.objects.all()
+
+    if status:
+        orders = orders.filter(status=status)
+
+    if date in DATE_WINDOWS:
+        orders = orders.filter(order_date__gte=_window_start(date, as_datetime=True))
+
+    if search:
+        orders = search_orders(orders, search)
+
+    return orders
+
+
+def _window_start(window, as_datetime=False):
+    start = timezone.localdate() - timedelta(days=DATE_WINDOWS[window] - 1)
+    if as_datetime:
+        return timezone.make_aware(datetime.combine(start, time.min))
+    return start
+
+
+def _empty_stats():
+    return {
+        'status_counts': {status: 0 for status, _ in Order.ORDER_STATUS},
+        'total_orders': 0,
+        'total_revenue': Decimal('0'),
+        'monthly_orders': 0,
+        'monthly_revenue': Decimal('0'),
+        'window_counts': {window: 0 for window in DATE_WINDOWS},
+    }
+
+
+def _stats_from_rollup():
+    """All-order stats from daily_order_stats in one query"""
+    month_start = timezone.localdate().replace(day=1)
+
+    aggregates = {
+        'total_orders': Sum('order_count'),
+        'total_revenue': Sum('revenue'),
+        'monthly_orders': Sum('order_count', filter=Q(stat_date__gte=month_start)),
+        'monthly_revenue': Sum('revenue', filter=Q(stat_date__gte=month_start)),
+    }
+    for status, _ in Order.ORDER_STATUS:
+        aggregates[f'status_{status}'] = Sum('order_count', filter=Q(status=status))
+    for window in DATE_WINDOWS:
+        aggregates[f'window_{window}'] = Sum('order_count', filter=Q(stat_date__gte=_window_start(window)))
+
+    return _to_stats(DailyOrderStat.objects.aggregate(**aggregates))
+
+
+def _stats_from_orders(orders):
+    """Stats over an order queryset in one query"""
+    month_start = timezone.make_aware(datetime.combine(timezone.localdate().replace(day=1), time.min))
+
+    aggregates = {
+        'total_orders': Count('id'),
+        'total_revenue': Sum('total'),
+        'monthly_orders': Count('id', filter=Q(order_date__gte=month_start)),
+        'monthly_revenue': Sum('total', filter=Q(order_date__gte=month_start)),
+    }
+    for status, _ in Order.ORDER_STATUS:
+        aggregates[f'status_{status}'] = Count('id', filter=Q(status=status))
+    for window in DATE_WINDOWS:
+        aggregates[f'window_{window}'] = Count('id', filter=Q(order_date__gte=_window_start(window, as_datetime=True)))
+
+    return _to_stats(orders.order_by().aggregate(**aggregates))
+
+
+def _to_stats(row):
+    stats = _empty_stats()
+    stats['total_orders'] = row['total_orders'] or 0
+    stats['total_revenue'] = row['total_revenue'] or Decimal('0')
+    stats['monthly_orders'] = row['monthly_orders'] or 0
+    stats['monthly_revenue'] = row['monthly_revenue'] or Decimal('0')
+    for status in stats['status_counts']:
+        stats['status_counts'][status] = row[f'status_{status}'] or 0
+    for window in stats['window_counts']:
+        stats['window_counts'][window] = row[f'window_{window}'] or 0
+    return stats
+
+
+def get_order_stats(status=None, date=None, search=None, cache_timeout=ORDER_STATS_CACHE_TIMEOUT):
+    """
+    Order statistics, optionally scoped to the admin order list filters.
+    Pass cache_timeout=None to skip the cache.
+    """
+    scoped = bool(status or date in DATE_WINDOWS or search)
+
+    def build():
+        if scoped:
+            return _stats_from_orders(scope_orders(status=status, date=date, search=search))
+        return _stats_from_rollup()
+
+    if not cache_timeout:
+        return build()
+
+    # Date windows move with the calendar day
+    signature = repr((status or '', date or '', search or '', str(timezone.localdate())))
+    name = f"order_stats:{hashlib.md5(signature.encode()).hexdigest()}"
+    return cached((ORDER_STATS,), name, build, timeout=cache_timeout)
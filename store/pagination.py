@@ -0,0 +1,101 @@
+# store/pagination.py
+import logging
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+logger = logging.getLogger(__name__)
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator over a queryset that only evaluates the requested page
+    (LIMIT/OFFSET) and keeps the total COUNT in the cache for a short time.
+    """
+
+    def __init__(self, object_list, per_page, count_cache_key=None, count_timeout=60, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_cache_key = count_cache_key
+        self.count_timeout = count_timeout
+
+    @cached_property
+    def count(self):
+        if not self.count_cache_key:
+            return Paginator.count.func(self)
+
+        count = cache.get(self.count_cache_key)
+        if count is None:
+            count = Paginator.count.func(self)
+            cache.set(self.count_cache_key, count, self.count_timeout)
+        return count
+
+
+class KeysetPage:
+    """
+    One page of a queryset ordered newest first by (timestamp, id), fetched
+    with a WHERE on the last row seen instead of OFFSET, so deep pages cost
+    the same as the first. Pages are addressed by opaque cursors:
+    ``after`` continues with older rows, ``before`` goes back to newer ones.
+    """
+
+    def __init__(self, queryset, per_page, after=None, before=None, field='created_at'):
+        self.field = field
+        after_key = self.decode_cursor(after)
+        before_key = self.decode_cursor(before) if after_key is None else None
+
+        if before_key is not None:
+            # Walk back towards the newest rows, then restore newest-first order
+            rows = list(
+                queryset.filter(self._newer_than(before_key))
+                .order_by(field, 'id')[:per_page + 1]
+            )
+            self.has_previous = len(rows) > per_page
+            rows = rows[:per_page][::-1]
+            self.has_next = True
+        else:
+            if after_key is not None:
+                queryset = queryset.filter(self._older_than(after_key))
+            rows = list(queryset.order_by(f'-{field}', '-id')[:per_page + 1])
+            self.has_next = len(rows) > per_page
+            rows = rows[:per_page]
+            self.has_previous = after_key is not None
+
+        self.object_list = rows
+        self.next_cursor = self.encode_cursor(rows[-1]) if self.has_next and rows else None
+        self.previous_cursor = self.encode_cursor(rows[0]) if self.has_previous and rows else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def _older_than(self, key):
+        timestamp, row_id = key
+        return Q(**{f'{self.field}__lt': timestamp}) | Q(**{self.field: timestamp, 'id__lt': row_id})
+
+    def _newer_than(self, key):
+        timestamp, row_id = key
+        return Q(**{f'{self.field}__gt': timestamp}) | Q(**{self.field: timestamp, 'id__gt': row_id})
+
+    def encode_cursor(self, row):
+        value = f"{getattr(row, self.field).isoformat()}|{row.id}"
+        return urlsafe_base64_encode(value.encode())
+
+    @staticmethod
+    def decode_cursor(cursor):
+        if not cursor:
+            return None
+        try:
+            timestamp, row_id = urlsafe_base64_decode(cursor).decode().split('|')
+            return datetime.fromisoformat(timestamp), int(row_id)
+        except (ValueError, UnicodeDecodeError):
+            logger.warning(f"Invalid pagination cursor: {cursor}")
+            return None
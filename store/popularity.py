@@ -0,0 +1,204 @@
+# store/popularity.py
+"""
+Bouquet popularity: the shop's 'popular' sort and the admin dashboard's
+popular products.
+
+Four demand signals are blended, each event decaying with a half-life of
+POPULARITY_HALF_LIFE_DAYS:
+
+* orders     order lines of orders that were not cancelled
+* views      recently viewed rows (one per customer and bouquet per refresh)
+* cart_adds  cart items added
+* reviews    active reviews, weighted by rating / 5
+
+Decay is applied forward: an event at time t adds 2 ** ((t - EPOCH) / half-life)
+instead of decaying every stored score as time passes. Scores keep their
+relative order, so a refresh only touches the bouquets that had events since
+the previous one. bouquet_popularity holds the per-signal sums, and their
+weighted sum is copied to Bouquet.popularity_score. That column is indexed
+with is_active, so the popular sort is an index scan.
+
+refresh_popularity() (the refresh_popularity command, run every few minutes
+from cron) adds the events between the last refresh and now minus
+POPULARITY_EVENT_LAG. The lag covers rows written after the event, such as
+recently viewed flushes. rebuild_popularity() recomputes everything from the
+source tables; run it after bulk imports, and to forget cancelled orders or
+hidden reviews. Scores double every half-life, so they stay within float
+range for about 1,000 half-lives of EPOCH.
+"""
+import logging
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, FloatField, Max, Sum, Value, When
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from masters.models import Bouquet, RecentlyViewed
+from store.facets import bouquets_changed, catalog_changed
+from store.models import BouquetPopularity, CartItem, OrderItem, Review
+
+logger = logging.getLogger(__name__)
+
+POPULARITY_HALF_LIFE_DAYS = getattr(settings, 'POPULARITY_HALF_LIFE_DAYS', 7)
+POPULARITY_EVENT_LAG = timedelta(seconds=getattr(settings, 'POPULARITY_EVENT_LAG', 10 * 60))
+# Events older than this many half-lives add under 0.1% and are skipped by a rebuild
+POPULARITY_REBUILD_HALF_LIVES = 10
+
+EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+SIGNAL_WEIGHTS = {
+    'orders': 10.0,
+    'cart_adds': 3.0,
+    'reviews': 2.0,
+    'views': 1.0,
+}
+
+# Held while a refresh runs, so two cron runs cannot count the same events twice
+REFRESH_LOCK_KEY = 'popularity:refresh:lock'
+REFRESH_LOCK_TIMEOUT = 30 * 60
+
+WRITE_BATCH_SIZE = 500
+
+
+def event_weight(when):
+    """Forward-decay weight of an event at ``when``"""
+    half_lives = (when - EPOCH).total_seconds() / (POPULARITY_HALF_LIFE_DAYS * 24 * 60 * 60)
+    return math.pow(2.0, half_lives)
+
+
+def popularity_score(popularity):
+    """Blended score of a BouquetPopularity's signal sums"""
+    return sum(weight * getattr(popularity, signal) for signal, weight in SIGNAL_WEIGHTS.items())
+
+
+def _signal_events(start, end):
+    """
+    {signal: queryset of (bouquet_id, hour, events)} for events after start
+    (None: all) up to end, bucketed by hour
+    """
+    def window(queryset, field):
+        queryset = queryset.filter(**{f'{field}__lte': end, 'bouquet__isnull': False})
+        if start is not None:
+            queryset = queryset.filter(**{f'{field}__gt': start})
+        return queryset.annotate(hour=TruncHour(field, tzinfo=dt_timezone.utc)).values('bouquet_id', 'hour')
+
+    return {
+        'orders': window(OrderItem.objects.exclude(order__status='cancelled'), 'created_at').annotate(
+            events=Count('id')
+        ),
+        'views': window(RecentlyViewed.objects.all(), 'viewed_at').annotate(events=Count('id')),
+        'cart_adds': window(CartItem.objects.all(), 'added_at').annotate(events=Count('id')),
+        # Rating / 5 per review
+        'reviews': window(Review.objects.filter(is_active=1), 'created_at').annotate(
+            events=Sum('rating', output_field=FloatField()) / 5.0
+        ),
+    }
+
+
+def decayed_signals(start, end):
+    """{bouquet_id: {signal: weighted sum}} of the events after start up to end"""
+    per_bouquet = {}
+    for signal, rows in _signal_events(start, end).items():
+        for row in rows.order_by():
+            # Half an hour past the bucket start: the bucket's events on average
+            weight = event_weight(row['hour'] + timedelta(minutes=30))
+            signals = per_bouquet.setdefault(row['bouquet_id'], {})
+            signals[signal] = signals.get(signal, 0) + (row['events'] or 0) * weight
+    return per_bouquet
+
+
+def _write_scores(scores):
+    """Copy {bouquet_id: score} to Bouquet.popularity_score, one UPDATE per batch"""
+    items = list(scores.items())
+    for offset in range(0, len(items), WRITE_BATCH_SIZE):
+        batch = items[offset:offset + WRITE_BATCH_SIZE]
+        Bouquet.objects.filter(id__in=[bouquet_id for bouquet_id, _score in batch]).update(
+            popularity_score=Case(
+                *[When(id=bouquet_id, then=Value(score)) for bouquet_id, score in batch],
+                output_field=FloatField(),
+            )
+        )
+
+
+def _apply(per_bouquet, computed_through):
+    """Add decayed signals to the stored sums and scores of their bouquets"""
+    bouquet_ids = set(Bouquet.objects.filter(id__in=per_bouquet).values_list('id', flat=True))
+    with transaction.atomic():
+        stored = BouquetPopularity.objects.select_for_update().in_bulk(bouquet_ids)
+        created, updated, scores = [], [], {}
+        for bouquet_id in bouquet_ids:
+            popularity = stored.get(bouquet_id)
+            if popularity is None:
+                popularity = BouquetPopularity(bouquet_id=bouquet_id)
+                created.append(popularity)
+            else:
+                updated.append(popularity)
+            for signal, value in per_bouquet[bouquet_id].items():
+                setattr(popularity, signal, getattr(popularity, signal) + value)
+            popularity.computed_through = computed_through
+            scores[bouquet_id] = popularity_score(popularity)
+
+        BouquetPopularity.objects.bulk_create(created, batch_size=WRITE_BATCH_SIZE)
+        BouquetPopularity.objects.bulk_update(
+            updated, [*SIGNAL_WEIGHTS, 'computed_through'], batch_size=WRITE_BATCH_SIZE
+        )
+        _write_scores(scores)
+        bouquets_changed(scores)
+    return len(scores)
+
+
+def _locked(job):
+    def run(*args, **kwargs):
+        if not cache.add(REFRESH_LOCK_KEY, 1, REFRESH_LOCK_TIMEOUT):
+            logger.warning("Popularity refresh already running, skipped")
+            return None
+        try:
+            return job(*args, **kwargs)
+        finally:
+            cache.delete(REFRESH_LOCK_KEY)
+    return run
+
+
+def _rebuild(now):
+    through = now - POPULARITY_EVENT_LAG
+    start = through - timedelta(days=POPULARITY_HALF_LIFE_DAYS * POPULARITY_REBUILD_HALF_LIVES)
+    per_bouquet = decayed_signals(start, through)
+
+    with transaction.atomic():
+        BouquetPopularity.objects.all().delete()
+        Bouquet.objects.exclude(popularity_score=0).update(popularity_score=0)
+        count = _apply(per_bouquet, through)
+        catalog_changed()
+    logger.info(f"Popularity rebuilt for {count} bouquet(s)")
+    return count
+
+
+@_locked
+def rebuild_popularity(now=None):
+    """Recompute every bouquet's popularity from the source tables; returns bouquets scored"""
+    return _rebuild(now or timezone.now())
+
+
+@_locked
+def refresh_popularity(now=None):
+    """
+    Add the events since the last refresh; returns the number of bouquets
+    updated (rebuilds everything when nothing has been scored yet)
+    """
+    now = now or timezone.now()
+    since = BouquetPopularity.objects.aggregate(through=Max('computed_through'))['through']
+    if since is None:
+        return _rebuild(now)
+
+    through = now - POPULARITY_EVENT_LAG
+    if through <= since:
+        return 0
+    per_bouquet = decayed_signals(since, through)
+    count = _apply(per_bouquet, through) if per_bouquet else 0
+    if count:
+        logger.info(f"Popularity refreshed for {count} bouquet(s)")
+    return count
@@ -0,0 +1,208 @@
+# store/search.py
+"""
+Product search.
+
+Full-text matching runs against ``bouquet_search`` (one row per bouquet with
+its name, descriptions and occasion/category names, maintained by
+masters.catalog.refresh_listings):
+
+* MySQL: MATCH ... AGAINST in boolean mode over FULLTEXT indexes, with name
+  matches weighted up
+* SQLite (tests, local runs): the FTS5 mirror table, ranked with bm25()
+* anything else: a LIKE scan, ranked in Python
+
+ranked_bouquet_ids() returns bouquet IDs best match first; the shop combines
+them with the facet filters (see store.views.build_shop_paginator).
+
+Autocomplete does not touch the database: each process keeps a trie of active
+bouquet and occasion names, where every node already holds its best few
+suggestions, so a lookup is one walk down the typed prefix. It is rebuilt when
+the catalog version (store.facets) changes.
+"""
+import logging
+import re
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.urls import reverse
+
+from masters.models import Bouquet, BouquetSearchDocument, Occasion
+from rose_and_roots.encryption import enc
+from store.facets import FACET_INDEX_MAX_AGE, FACET_VERSION_KEY
+
+logger = logging.getLogger(__name__)
+
+# Ranked matches considered per query (before the facet filters)
+SEARCH_RESULT_LIMIT = 500
+MAX_SEARCH_TERMS = 8
+
+# bm25() column weights for (name, body, tags) on SQLite
+SQLITE_WEIGHTS = (10.0, 1.0, 4.0)
+# Name relevance multiplier on MySQL
+MYSQL_NAME_WEIGHT = 3
+
+AUTOCOMPLETE_LIMIT = 8
+# Longest prefix indexed per word start; longer input is matched up to here
+AUTOCOMPLETE_KEY_LENGTH = 32
+
+_TERM_RE = re.compile(r'\w+')
+
+
+def search_terms(query):
+    """Lower-cased words of a query; punctuation and operators are dropped"""
+    return _TERM_RE.findall((query or '').lower())[:MAX_SEARCH_TERMS]
+
+
+def _mysql_search(terms, limit):
+    against = ' '.join(f'+{term}*' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT bouquet_id FROM bouquet_search '
+            'WHERE MATCH(name, body, tags) AGAINST (%s IN BOOLEAN MODE) '
+            'ORDER BY MATCH(name) AGAINST (%s IN BOOLEAN MODE) * %s '
+            '+ MATCH(name, body, tags) AGAINST (%s IN BOOLEAN MODE) DESC, bouquet_id DESC '
+            'LIMIT %s',
+            [against, against, MYSQL_NAME_WEIGHT, against, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _sqlite_search(terms, limit):
+    match = ' '.join(f'"{term}"*' for term in terms)
+    weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT rowid FROM bouquet_search_fts WHERE bouquet_search_fts MATCH %s '
+            f'ORDER BY bm25(bouquet_search_fts, {weights}), rowid DESC LIMIT %s',
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _like_search(terms, limit):
+    documents = BouquetSearchDocument.objects.all()
+    for term in terms:
+        documents = documents.filter(Q(name__icontains=term) | Q(body__icontains=term) | Q(tags__icontains=term))
+
+    def score(row):
+        _bouquet_id, name, tags = row
+        name, tags = name.lower(), tags.lower()
+        return sum(3 * (term in name) + (term in tags) for term in terms)
+
+    rows = list(documents.values_list('bouquet_id', 'name', 'tags')[:limit])
+    rows.sort(key=lambda row: (-score(row), -row[0]))
+    return [row[0] for row in rows]
+
+
+def ranked_bouquet_ids(query, limit=SEARCH_RESULT_LIMIT):
+    """IDs of bouquets matching every word of query (as a prefix), best match first"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    vendor = connection.vendor
+    try:
+        if vendor == 'mysql':
+            return _mysql_search(terms, limit)
+        if vendor == 'sqlite':
+            return _sqlite_search(terms, limit)
+    except Exception as e:
+        logger.exception(f"Full-text search failed, falling back to LIKE: {str(e)}")
+    return _like_search(terms, limit)
+
+
+# ---------------- AUTOCOMPLETE ---------------- #
+
+class _TrieNode:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # Indexes into the suggestion list, best first
+
+
+def _normalize(text):
+    return ' '.join(_TERM_RE.findall((text or '').lower()))
+
+
+class AutocompleteIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root = _TrieNode()
+        self._suggestions = []
+        self._built_at = None
+        self._version = None
+
+    def _load_suggestions(self):
+        """Active occasions and bouquets, best first (occasions, then featured bouquets)"""
+        suggestions = []
+        occasions = Occasion.objects.filter(is_active=1).exclude(name__isnull=True).exclude(name='')
+        for occasion_id, name in occasions.order_by('name').values_list('id', 'name'):
+            suggestions.append({
+                'label': name,
+                'type': 'occasion',
+                'url': f"{reverse('shop')}?occasion={enc(str(occasion_id))}",
+            })
+
+        bouquets = Bouquet.objects.filter(is_active=1).exclude(name__isnull=True).exclude(name='')
+        for bouquet_id, name in bouquets.order_by('-is_featured', 'name').values_list('id', 'name'):
+            suggestions.append({
+                'label': name,
+                'type': 'product',
+                'url': f"{reverse('product_detail')}?id={enc(str(bouquet_id))}",
+            })
+        return suggestions
+
+    def rebuild(self):
+        version = cache.get(FACET_VERSION_KEY)
+        suggestions = self._load_suggestions()
+
+        root = _TrieNode()
+        for position, suggestion in enumerate(suggestions):
+            label = _normalize(suggestion['label'])
+            # Every word start is a key, so "red rose bouquet" is found by "ros" and "bou"
+            starts = [0] + [match.start() + 1 for match in re.finditer(' ', label)]
+            for start in starts:
+                node = root
+                for character in label[start:start + AUTOCOMPLETE_KEY_LENGTH]:
+                    node = node.children.setdefault(character, _TrieNode())
+                    # Suggestions arrive best first, so the first few to reach a node are its best
+                    if len(node.top) < AUTOCOMPLETE_LIMIT and (not node.top or node.top[-1] != position):
+                        node.top.append(position)
+
+        with self._lock:
+            self._root = root
+            self._suggestions = suggestions
+            self._version = version
+            self._built_at = time.monotonic()
+
+        logger.info(f"Autocomplete index rebuilt with {len(suggestions)} suggestion(s)")
+
+    def _ensure_fresh(self):
+        if self._built_at is None:
+            self.rebuild()
+            return
+        stale = time.monotonic() - self._built_at > FACET_INDEX_MAX_AGE
+        if stale or cache.get(FACET_VERSION_KEY) != self._version:
+            self.rebuild()
+
+    def suggest(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        """Up to limit suggestions ({'label', 'type', 'url'}) with a word starting with prefix"""
+        key = _normalize(prefix)[:AUTOCOMPLETE_KEY_LENGTH]
+        if not key:
+            return []
+        self._ensure_fresh()
+
+        with self._lock:
+            node = self._root
+            for character in key:
+                node = node.children.get(character)
+                if node is None:
+                    return []
+            return [self._suggestions[position] for position in node.top[:limit]]
+
+
+autocomplete_index = AutocompleteIndex()
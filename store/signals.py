@@ -0,0 +1,12 @@
+# store/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from rose_and_roots.caching import ORDER_STATS, bump_namespaces
+from store.models import Order, OrderItem
+
+
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=OrderItem)
+def order_changed(sender, instance, **kwargs):
+    bump_namespaces(ORDER_STATS)
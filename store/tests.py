@@ -1,3 +1,539 @@
-from django.test import TestCase
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase
+
+from accounts.models import CustomUser, OutboundEmail, UserProfile
+from masters.models import Bouquet, BouquetOccasion, Occasion, parameter_master
+from rose_and_roots.encryption import enc
+from store.dashboard_metrics import record_review_added, set_review_active
+from store.facets import SORT_KEYS, CatalogFacetIndex, facet_index
+from store.middleware import HEARTBEAT_COOKIE, HEARTBEAT_MAX_IDLE, HEARTBEAT_PATH, HEARTBEAT_SALT, SESSION_MAX_AGE
+from store.models import BouquetPopularity, BouquetReviewStat, Order, OrderItem, Review
+from store.order_search import classify_order_query
+from store.popularity import (
+    EPOCH, POPULARITY_HALF_LIFE_DAYS, REFRESH_LOCK_KEY, event_weight, rebuild_popularity, refresh_popularity,
+)
+from store.views import filter_shop_bouquets
+
+
+class PlaceOrderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email='customer@example.com', password='Passw0rd!', role_id=2,
+            first_name='Asha', last_name='Rao', phone='9876543210', full_name='Asha Rao',
+        )
+        UserProfile.objects.create(user=self.user)
+        self.bouquet = Bouquet.objects.create(name='Red Roses', slug='red-roses', price=Decimal('500.00'))
+        self.client.defaults.update(HTTP_HOST='localhost:8000', HTTP_REFERER='http://localhost:8000/checkout/')
+        self.client.force_login(self.user)
+
+    def place_order(self):
+        return self.client.post('/place-order/', {
+            'email': 'customer@example.com',
+            'phone': '9876543210',
+            'first_name': 'Asha',
+            'last_name': 'Rao',
+            'address_line1': '12 Garden Road',
+            'city': 'Pune',
+            'state': 'Maharashtra',
+            'pincode': '411001',
+            'buy_now_id': enc(str(self.bouquet.id)),
+        })
+
+    def test_order_queues_confirmation_email(self):
+        response = self.place_order()
+
+        order = Order.objects.get()
+        self.assertRedirects(response, f'/order-confirmation/{enc(str(order.id))}/', fetch_redirect_response=False)
+        self.assertEqual(OutboundEmail.objects.get().to, ['customer@example.com'])
+
+    def test_order_survives_failed_email_insert(self):
+        with mock.patch.object(OutboundEmail, '_do_insert', side_effect=DatabaseError('insert failed')):
+            response = self.place_order()
+
+        order = Order.objects.get()
+        self.assertRedirects(response, f'/order-confirmation/{enc(str(order.id))}/', fetch_redirect_response=False)
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 1)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+
+class FilterShopBouquetsTests(TestCase):
+    def setUp(self):
+        roses = parameter_master.objects.create(parameter_name='Product Categories', parameter_value='Roses')
+        lilies = parameter_master.objects.create(parameter_name='Product Categories', parameter_value='Lilies')
+        self.bouquets = [
+            Bouquet.objects.create(name=f'Bouquet {i}', slug=f'bouquet-{i}', price=Decimal(100 * (i + 1)),
+                                   category=roses if i % 2 else lilies)
+            for i in range(4)
+        ]
+        self.roses = roses
+
+    def test_relevance_sort_keeps_filters(self):
+        ranked = [bouquet.id for bouquet in reversed(self.bouquets)]
+
+        bouquets = filter_shop_bouquets([], [self.roses.pk], None, '300', 'relevance', ranked)
+
+        self.assertEqual([bouquet.id for bouquet in bouquets], [self.bouquets[1].id])
+
+    def test_relevance_sort_keeps_rank_order(self):
+        ranked = [self.bouquets[3].id, self.bouquets[1].id]
+
+        bouquets = filter_shop_bouquets([], [self.roses.pk], None, None, 'relevance', ranked)
+
+        self.assertEqual([bouquet.id for bouquet in bouquets], ranked)
+
+
+class ReviewStatsTests(TestCase):
+    def setUp(self):
+        self.bouquet = Bouquet.objects.create(name='Red Roses', slug='red-roses', price=Decimal('500.00'))
+        self.users = [
+            CustomUser.objects.create_user(email=f'reviewer{i}@example.com', password='Passw0rd!', full_name=f'Reviewer {i}')
+            for i in range(3)
+        ]
+
+    def add_review(self, user, rating):
+        review = Review.objects.create(bouquet=self.bouquet, user=user, rating=rating, comment='Lovely flowers')
+        record_review_added(review)
+        return review
+
+    def test_first_review_creates_the_stats_row(self):
+        self.add_review(self.users[0], 4)
+
+        stat = BouquetReviewStat.objects.get(bouquet=self.bouquet)
+        self.assertEqual((stat.review_count, stat.rating_sum, stat.rating_4), (1, 4, 1))
+
+    def test_reviews_update_the_stats_row(self):
+        self.add_review(self.users[0], 4)
+        hidden = self.add_review(self.users[1], 1)
+        self.add_review(self.users[2], 5)
+        set_review_active(hidden.id, False)
+
+        stat = BouquetReviewStat.objects.get(bouquet=self.bouquet)
+        self.assertEqual((stat.review_count, stat.rating_sum, stat.rating_1), (2, 9, 0))
+        self.assertEqual(stat.avg_rating, Decimal('4.50'))
+
+
+class HeartbeatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='shopper@example.com', password='Passw0rd!', role_id=2, full_name='Shopper')
+        self.client.defaults.update(HTTP_HOST='localhost:8000', HTTP_REFERER='http://localhost:8000/shop/')
+        self.client.force_login(self.user)
+        session = self.client.session
+        session['role_id'] = 2
+        session.save()
+        # The first poll goes to the view and hands out the status cookie
+        self.assertNotIn('ETag', self.client.get(HEARTBEAT_PATH))
+
+    def poll(self):
+        return self.client.get(HEARTBEAT_PATH)
+
+    def assertFastPath(self, response, valid=True):
+        self.assertIn('ETag', response)
+        self.assertEqual(response.json()['valid'], valid)
+
+    def assertFellThrough(self, response):
+        self.assertNotIn('ETag', response)
+
+    def test_poll_is_answered_without_the_database(self):
+        with self.assertNumQueries(0):
+            response = self.poll()
+        self.assertFastPath(response)
+        self.assertEqual(response.json()['role_id'], 2)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(HEARTBEAT_PATH, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_forged_token_falls_through(self):
+        token = self.client.cookies[HEARTBEAT_COOKIE].value
+        value = signing.TimestampSigner(salt=HEARTBEAT_SALT).unsign(token)
+        self.client.cookies[HEARTBEAT_COOKIE] = token.replace(value, value.replace(':2:', ':1:', 1))
+
+        self.assertFellThrough(self.poll())
+        self.assertFastPath(self.poll())
+
+    def test_token_of_another_session_falls_through(self):
+        token = self.client.cookies[HEARTBEAT_COOKIE].value
+        self.client.logout()
+        self.client.force_login(self.user)
+        self.client.cookies[HEARTBEAT_COOKIE] = token
+
+        self.assertFellThrough(self.poll())
+
+    def test_idle_token_falls_through(self):
+        later = time.time() + HEARTBEAT_MAX_IDLE + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertFellThrough(self.poll())
+            self.assertFastPath(self.poll())
+
+    def test_login_replaces_the_anonymous_token(self):
+        self.client.logout()
+        self.client.get('/login/')
+        self.assertEqual(self.poll().json()['authenticated'], False)
+
+        self.client.force_login(self.user)
+        self.assertFellThrough(self.poll())
+        self.assertFastPath(self.poll())
+
+    def test_token_from_before_timestamps_is_replaced(self):
+        self.client.cookies[HEARTBEAT_COOKIE] = signing.Signer(salt=HEARTBEAT_SALT).sign('anonymous')
+
+        self.assertFellThrough(self.poll())
+        self.assertFastPath(self.poll())
+
+    def test_session_removed_from_the_store_falls_through(self):
+        session_key = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        import_module(settings.SESSION_ENGINE).SessionStore(session_key).delete()
+
+        response = self.poll()
+        self.assertFellThrough(response)
+        self.assertFalse(response.json()['authenticated'])
+
+
+class FacetIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.roses = parameter_master.objects.create(parameter_name='Product Categories', parameter_value='Roses')
+        self.lilies = parameter_master.objects.create(parameter_name='Product Categories', parameter_value='Lilies')
+        self.birthday = Occasion.objects.create(name='Birthday', slug='birthday')
+        self.anniversary = Occasion.objects.create(name='Anniversary', slug='anniversary')
+
+        # (category, occasions, price, discount price, popularity)
+        specs = [
+            (self.roses, [self.birthday], '100', None, 5),
+            (self.roses, [self.anniversary], '300', '150', 1),
+            (self.lilies, [self.birthday, self.anniversary], '200', None, 5),
+            (self.lilies, [self.birthday], None, None, 0),
+        ]
+        self.bouquets = []
+        for i, (category, occasions, price, discount_price, popularity) in enumerate(specs):
+            bouquet = Bouquet.objects.create(
+                name=f'Bouquet {i}', slug=f'bouquet-{i}', category=category,
+                price=Decimal(price) if price else None,
+                discount_price=Decimal(discount_price) if discount_price else None,
+                popularity_score=popularity,
+            )
+            for occasion in occasions:
+                BouquetOccasion.objects.create(bouquet=bouquet, occasion=occasion)
+            self.bouquets.append(bouquet)
+        inactive = Bouquet.objects.create(name='Hidden', slug='hidden', price=Decimal('50'), category=self.roses, is_active=0)
+        BouquetOccasion.objects.create(bouquet=inactive, occasion=self.birthday)
+
+        # Oldest first, and one without a creation date
+        start = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+        for days, bouquet in enumerate(self.bouquets):
+            Bouquet.objects.filter(pk=bouquet.pk).update(created_at=start + timedelta(days=days))
+        Bouquet.objects.filter(pk=self.bouquets[2].pk).update(created_at=None)
+
+        self.index = CatalogFacetIndex()
+
+    def ids(self, *positions):
+        return [self.bouquets[position].id for position in positions]
+
+    def matched(self, *args, **kwargs):
+        return self.index.search(*args, **kwargs).matched
+
+    def test_facet_counts_ignore_their_own_selection(self):
+        facets = self.index.search([self.birthday.id], [self.roses.pk])
+
+        self.assertEqual(facets.matched, set(self.ids(0)))
+        # Occasions counted within Roses, categories within Birthday
+        self.assertEqual(facets.occasion_counts, {self.birthday.id: 1, self.anniversary.id: 1})
+        self.assertEqual(facets.category_counts, {self.roses.pk: 1, self.lilies.pk: 2})
+
+        facets = self.index.search([self.birthday.id, self.anniversary.id], [])
+        self.assertEqual(facets.matched, set(self.ids(0, 1, 2, 3)))
+        self.assertEqual(facets.occasion_counts, {self.birthday.id: 3, self.anniversary.id: 2})
+
+    def test_price_range_bounds_are_inclusive(self):
+        self.assertEqual(self.matched([], [], Decimal('150'), Decimal('200')), set(self.ids(1, 2)))
+        self.assertEqual(self.matched([], [], Decimal('150.01'), None), set(self.ids(2)))
+        self.assertEqual(self.matched([], [], None, Decimal('100')), set(self.ids(0)))
+        self.assertEqual(self.matched([], [], Decimal('201'), None), set())
+        # No price filter keeps bouquets without a price
+        self.assertEqual(self.matched([], []), set(self.ids(0, 1, 2, 3)))
+        self.assertEqual(self.index.price_range(), {'min_price': Decimal('100'), 'max_price': Decimal('200')})
+
+    def test_discount_price_is_what_sorts_and_filters(self):
+        # Bouquet 1 lists at 300 but sells at 150
+        for sort_by, ids in (('price_low', self.ids(1, 2)), ('price_high', self.ids(2, 1))):
+            with self.subTest(sort_by=sort_by):
+                facets = self.index.search([], [], Decimal('120'), Decimal('250'), sort_by=sort_by)
+                self.assertEqual([bouquet.id for bouquet in facets[0:10]], ids)
+                database = filter_shop_bouquets([], [], '120', '250', sort_by)
+                self.assertEqual([bouquet.id for bouquet in database], ids)
+
+        self.assertEqual(self.matched([], [], Decimal('250'), None), set())
+        self.assertEqual(list(filter_shop_bouquets([], [], '250', None, 'price_low')), [])
+
+    def test_sort_orders_match_the_database(self):
+        expected = {
+            'price_low': self.ids(0, 1, 2, 3),
+            'price_high': self.ids(2, 1, 0, 3),
+            'newest': self.ids(3, 1, 0, 2),
+            'popular': self.ids(2, 0, 1, 3),
+        }
+        self.assertEqual(set(expected), set(SORT_KEYS))
+
+        for sort_by, ids in expected.items():
+            with self.subTest(sort_by=sort_by):
+                facets = self.index.search([], [], sort_by=sort_by)
+                self.assertEqual([bouquet.id for bouquet in facets[0:10]], ids)
+                database = filter_shop_bouquets([], [], None, None, sort_by)
+                self.assertEqual([bouquet.id for bouquet in database], ids)
+
+    def test_pages_of_filtered_and_unfiltered_results(self):
+        facets = self.index.search([], [], sort_by='price_high')
+        self.assertEqual([bouquet.id for bouquet in facets[1:3]], self.ids(1, 0))
+
+        facets = self.index.search([self.birthday.id], [], sort_by='price_high')
+        self.assertEqual([bouquet.id for bouquet in facets[1:3]], self.ids(0, 3))
+        self.assertEqual([bouquet.id for bouquet in facets[3:6]], [])
+
+    def test_refresh_patches_edits_and_deactivations(self):
+        self.index.search([], [])
+        built_at = self.index._built_at
+
+        Bouquet.objects.filter(pk=self.bouquets[0].pk).update(discount_price=Decimal('80'))
+        BouquetOccasion.objects.create(bouquet=self.bouquets[0], occasion=self.anniversary)
+        Bouquet.objects.filter(pk=self.bouquets[2].pk).update(is_active=0)
+        self.index.refresh(self.ids(0, 2))
+
+        facets = self.index.search([self.anniversary.id], [], sort_by='price_low')
+        self.assertEqual([bouquet.id for bouquet in facets[0:10]], self.ids(0, 1))
+        self.assertEqual(facets.occasion_counts, {self.birthday.id: 2, self.anniversary.id: 2})
+        self.assertEqual(facets.category_counts, {self.roses.pk: 2, self.lilies.pk: 0})
+        self.assertEqual(self.index.price_range(), {'min_price': Decimal('80'), 'max_price': Decimal('150')})
+        self.assertEqual(self.index._built_at, built_at)
+
+
+class ClassifyOrderQueryTests(SimpleTestCase):
+    def assertClassified(self, cases):
+        for query, expected in cases:
+            with self.subTest(query=query):
+                self.assertEqual(classify_order_query(query), expected)
+
+    def test_order_numbers(self):
+        self.assertClassified([
+            ('ORD-20260101-0042', ('order_number', 'ORD-20260101-0042')),
+            (' ord-20260101-0042 ', ('order_number', 'ORD-20260101-0042')),
+            ('ORD-2026', ('order_number_prefix', 'ORD-2026')),
+            ('ORD20260101', ('order_number_prefix', 'ORD-20260101')),
+            ('ORD-20260101-00', ('order_number_prefix', 'ORD-20260101-00')),
+            ('2026', ('order_number_prefix', 'ORD-2026')),
+            ('20260101-0042', ('order_number_prefix', 'ORD-20260101-0042')),
+        ])
+
+    def test_eight_digit_date_is_an_order_number_prefix(self):
+        self.assertEqual(classify_order_query('20260101'), ('order_number_prefix', 'ORD-20260101'))
+
+    def test_phone_numbers(self):
+        self.assertClassified([
+            ('9876543210', ('phone', '9876543210')),
+            ('+91 98765 43210', ('phone', '9876543210')),
+            ('+91-9876543210', ('phone', '9876543210')),
+            ('919876543210', ('phone', '9876543210')),
+            ('09876543210', ('phone', '9876543210')),
+            ('(987) 654-3210', ('phone', '9876543210')),
+        ])
+
+    def test_emails_and_names(self):
+        self.assertClassified([
+            ('asha.rao@example.com', ('email', 'asha.rao@example.com')),
+            ('Asha', ('name', ['Asha'])),
+            ('Asha Rao', ('name', ['Asha', 'Rao'])),
+            ('a b c d e', ('name', ['a', 'b', 'c', 'd'])),
+            ('12345678901234', ('name', ['12345678901234'])),
+        ])
+
+
+class PopularityTests(TestCase):
+    NOW = datetime(2026, 3, 1, 12, tzinfo=dt_timezone.utc)
+    HALF_LIFE = timedelta(days=POPULARITY_HALF_LIFE_DAYS)
+
+    def setUp(self):
+        cache.clear()
+        self.bouquets = [
+            Bouquet.objects.create(name=f'Bouquet {i}', slug=f'bouquet-{i}', price=Decimal('100.00'))
+            for i in range(2)
+        ]
+
+    def order(self, bouquet, when, status='pending'):
+        order = Order.objects.create(
+            order_number=f'ORD-{Order.objects.count() + 1:04d}', email='customer@example.com', phone='9876543210',
+            first_name='Asha', last_name='Rao', address_line1='12 Garden Road', city='Pune', state='Maharashtra',
+            pincode='411001', subtotal=Decimal('100.00'), total=Decimal('100.00'), status=status,
+        )
+        item = OrderItem.objects.create(order=order, bouquet=bouquet, bouquet_name=bouquet.name, price=Decimal('100.00'))
+        OrderItem.objects.filter(pk=item.pk).update(created_at=when)
+
+    def scores(self):
+        return list(
+            Bouquet.objects.filter(pk__in=[bouquet.pk for bouquet in self.bouquets])
+            .order_by('id').values_list('popularity_score', flat=True)
+        )
+
+    def popular_ids(self):
+        return [bouquet.id for bouquet in filter_shop_bouquets([], [], None, None, 'popular')]
+
+    def test_event_weight_doubles_every_half_life(self):
+        self.assertEqual(event_weight(EPOCH), 1.0)
+        self.assertAlmostEqual(event_weight(EPOCH + self.HALF_LIFE), 2.0)
+        self.assertAlmostEqual(event_weight(EPOCH + 3 * self.HALF_LIFE) / event_weight(EPOCH + self.HALF_LIFE), 4.0)
+
+    def test_older_orders_count_less(self):
+        recent = self.NOW - timedelta(hours=1)
+        self.order(self.bouquets[0], recent - 2 * self.HALF_LIFE)
+        self.order(self.bouquets[1], recent)
+        self.order(self.bouquets[1], recent, status='cancelled')
+
+        rebuild_popularity(now=self.NOW)
+
+        old, new = (BouquetPopularity.objects.get(bouquet=bouquet) for bouquet in self.bouquets)
+        self.assertAlmostEqual(new.orders / old.orders, 4.0)
+        self.assertAlmostEqual(self.scores()[1], 10 * new.orders)
+
+    def test_incremental_refreshes_add_up_to_a_rebuild(self):
+        self.order(self.bouquets[0], self.NOW - timedelta(days=3))
+        rebuild_popularity(now=self.NOW - timedelta(days=2))
+
+        self.order(self.bouquets[0], self.NOW - timedelta(days=1))
+        self.order(self.bouquets[1], self.NOW - timedelta(days=1, hours=5))
+        self.assertEqual(refresh_popularity(now=self.NOW - timedelta(hours=12)), 2)
+        self.order(self.bouquets[1], self.NOW - timedelta(hours=2))
+        self.assertEqual(refresh_popularity(now=self.NOW), 1)
+        refreshed = self.scores()
+
+        rebuild_popularity(now=self.NOW)
+        for score, rebuilt in zip(refreshed, self.scores()):
+            self.assertAlmostEqual(score / rebuilt, 1.0)
+
+    def test_refresh_is_skipped_while_another_holds_the_lock(self):
+        self.order(self.bouquets[0], self.NOW - timedelta(days=1))
+        cache.add(REFRESH_LOCK_KEY, 1)
+
+        self.assertIsNone(refresh_popularity(now=self.NOW))
+        self.assertFalse(BouquetPopularity.objects.exists())
+
+        cache.delete(REFRESH_LOCK_KEY)
+        self.assertEqual(refresh_popularity(now=self.NOW), 1)
+
+    def test_refresh_after_new_orders_reorders_the_popular_sort(self):
+        self.order(self.bouquets[0], self.NOW - timedelta(days=3))
+        with self.captureOnCommitCallbacks(execute=True):
+            rebuild_popularity(now=self.NOW - timedelta(days=1))
+        facet_index.rebuild()
+        ids = [bouquet.id for bouquet in self.bouquets]
+        self.assertEqual(self.popular_ids(), ids)
+        self.assertEqual(facet_index.ordered_ids(set(ids), 'popular', 0, 2), ids)
+
+        self.order(self.bouquets[1], self.NOW - timedelta(hours=2))
+        self.order(self.bouquets[1], self.NOW - timedelta(hours=2))
+        with self.captureOnCommitCallbacks(execute=True):
+            refresh_popularity(now=self.NOW)
+
+        self.assertEqual(self.popular_ids(), ids[::-1])
+        self.assertEqual(facet_index.ordered_ids(set(ids), 'popular', 0, 2), ids[::-1])
+
+
+class RequestPolicyTests(TestCase):
+    TRUSTED = 'http://localhost:8000/'
+
+    def setUp(self):
+        cache.clear()
+        self.client.defaults.update(HTTP_HOST='localhost:8000')
+        self.customer = CustomUser.objects.create_user(
+            email='customer@example.com', password='Passw0rd!', role_id=2,
+            first_name='Asha', last_name='Rao', full_name='Asha Rao',
+        )
+        self.admin = CustomUser.objects.create_user(
+            email='admin@example.com', password='Passw0rd!', role_id=1,
+            first_name='Ravi', last_name='Kumar', full_name='Ravi Kumar',
+        )
+
+    def login(self, user, **session_values):
+        self.client.force_login(user)
+        session = self.client.session
+        session.update(session_values)
+        session.save()
+
+    def get(self, path, referer=None, **extra):
+        if referer is not None:
+            extra['HTTP_REFERER'] = referer
+        return self.client.get(path, **extra)
+
+    def assertPassedThrough(self, response, status_code=200):
+        self.assertEqual(response.status_code, status_code)
+        self.assertIn('_auth_user_id', self.client.session)
+
+    def assertSessionEnded(self, response):
+        self.assertRedirects(response, '/', fetch_redirect_response=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_anonymous_requests_pass_through(self):
+        response = self.get('/shop/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-cache, no-store, must-revalidate, private')
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+
+        response = self.get('/bouquets/')
+        self.assertEqual(response.status_code, 302)
+        self.assertNotEqual(response['Location'], '/')
+
+    def test_direct_access_ends_the_session(self):
+        self.login(self.customer)
+        self.assertSessionEnded(self.get('/shop/'))
+
+        self.login(self.customer)
+        self.assertSessionEnded(self.get('/shop/', referer='https://elsewhere.example/'))
+
+        self.login(self.customer)
+        self.assertSessionEnded(self.get('/'))
+
+    def test_trusted_navigation_passes_through(self):
+        self.login(self.customer)
+        response = self.get('/shop/', referer=self.TRUSTED)
+        self.assertPassedThrough(response)
+        self.assertEqual(response['Cache-Control'], 'no-store, no-cache, must-revalidate, max-age=0')
+
+        # A reload of the same page, bypassing the browser cache
+        self.assertPassedThrough(self.get('/shop/', referer='http://localhost:8000/shop/', HTTP_CACHE_CONTROL='max-age=0'))
+
+    def test_mid_auth_flow_sessions(self):
+        # Logged out in another tab: the next protected page ends the session
+        self.login(self.customer, logout_completed=True)
+        self.assertSessionEnded(self.get('/shop/', referer=self.TRUSTED))
+
+        # Auth pages skip the direct-access and session checks: the login view sends the user on
+        self.login(self.customer)
+        self.assertEqual(self.get('/login/')['Location'], '/dashboard/')
+        self.assertIn('_auth_user_id', self.client.session)
+
+        self.login(self.customer, session_created_at=int(time.time()) - SESSION_MAX_AGE - 1)
+        self.assertSessionEnded(self.get('/shop/', referer=self.TRUSTED))
+
+        self.login(self.customer, session_created_at=int(time.time()), auth_flow_completed=True)
+        self.assertPassedThrough(self.get('/shop/', referer=self.TRUSTED))
+
+    def test_role_restricted_pages(self):
+        # The middleware lets the request through; the view applies the role
+        self.login(self.customer)
+        response = self.get('/bouquets/', referer=self.TRUSTED)
+        self.assertPassedThrough(response, 302)
+        self.assertEqual(response['Location'], '/')
+
+        self.login(self.admin)
+        self.assertPassedThrough(self.get('/bouquets/', referer=self.TRUSTED))
+
+        # Typed into the address bar, whatever the role
+        self.assertSessionEnded(self.get('/bouquets/'))
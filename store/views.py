@@ -1,6 +1,7 @@
 import uuid
 import os
 import json
+import hashlib
 import logging
 from decimal import Decimal, InvalidOperation
 from django.http import HttpResponse, JsonResponse
@@ -22,9 +23,20 @@ from django.db.models import Q, Avg, Min, Max
 from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
-from django.db.models import F
+from django.db.models import F, Case, When
 from store.models import *
 from accounts.views import *
+from masters.catalog import (
+    attach_listings, get_active_occasions, get_category_summary, get_featured_bouquets, get_product_page,
+)
+from store.pagination import CachedCountPaginator, KeysetPage
+from masters.image_variants import variant_widths_for
+from store.facets import facet_index
+from store.search import autocomplete_index, ranked_bouquet_ids, search_terms
+from masters.site_settings import get_site_setting
+from masters.recently_viewed import record_view
+from rose_and_roots.caching import BOUQUET, cached
+from store.dashboard_metrics import attach_review_stats, record_order_placed, record_review_added, set_review_active
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -126,7 +138,8 @@ def shop_view(request):
         
         min_price = request.GET.get('min_price')
         max_price = request.GET.get('max_price')
-        sort_by = request.GET.get('sort', 'popular')
+        search_query = request.GET.get('q', '').strip()
+        sort_by = request.GET.get('sort', 'relevance' if search_query else 'popular')
         
         # ❌ REMOVE THESE DUPLICATE LINES - they were overwriting the values above!
         # selected_occasions_encrypted = request.GET.getlist('occasion')
@@ -153,52 +166,16 @@ def shop_view(request):
             except:
                 pass
         
-        # Base queryset - only active bouquets
-        bouquets = Bouquet.objects.filter(is_active=1).select_related('category').prefetch_related('occasions', 'images')
+        # Filtered, sorted matches with facet counts - evaluated one page at a time below
+        paginator, facets = build_shop_paginator(
+            selected_occasions, selected_categories, min_price, max_price, sort_by, search_query
+        )
         
         # Get featured bouquets for homepage or sidebar
-        featured_bouquets = Bouquet.objects.filter(is_active=1, is_featured=1).prefetch_related('images')[:4]
-        
-        # Filter by occasions
-        if selected_occasions:
-            bouquets = bouquets.filter(occasions__id__in=selected_occasions).distinct()
-        
-        # Filter by categories
-        if selected_categories:
-            bouquets = bouquets.filter(category_id__in=selected_categories).distinct()
-        
-        # Filter by price range
-        if min_price and max_price:
-            bouquets = bouquets.filter(
-                Q(price__gte=min_price) | Q(discount_price__gte=min_price),
-                Q(price__lte=max_price) | Q(discount_price__lte=max_price)
-            ).distinct()
-        elif min_price:
-            bouquets = bouquets.filter(
-                Q(price__gte=min_price) | Q(discount_price__gte=min_price)
-            ).distinct()
-        elif max_price:
-            bouquets = bouquets.filter(
-                Q(price__lte=max_price) | Q(discount_price__lte=max_price)
-            ).distinct()
-        
-        # Sorting
-        if sort_by == 'price_low':
-            bouquets = bouquets.order_by('price')
-        elif sort_by == 'price_high':
-            bouquets = bouquets.order_by('-price')
-        elif sort_by == 'newest':
-            bouquets = bouquets.order_by('-created_at')
-        elif sort_by == 'popular':
-            bouquets = bouquets.order_by('-is_featured', '-created_at')
-        else:
-            bouquets = bouquets.order_by('-is_featured', '-created_at')
+        featured_list = get_featured_bouquets(4)
         
         # Get price range for filter
-        price_range = Bouquet.objects.filter(is_active=1).aggregate(
-            min_price=Min('price'),
-            max_price=Max('price')
-        )
+        price_range = get_shop_price_range(facets)
         
         # Ensure min_price and max_price are set correctly
         min_price_value = min_price if min_price else price_range['min_price']
@@ -209,72 +186,26 @@ def shop_view(request):
             min_price_value, max_price_value = max_price_value, min_price_value
         
         # Get all occasions for filter with encrypted IDs
-        occasions = Occasion.objects.filter(is_active=1).order_by('name')
-        occasion_list = []
-        for occasion in occasions:
-            occasion.encrypted_id = enc(str(occasion.id))
-            occasion_list.append(occasion)
-        
-        # Get all categories from parameter_master for filter
-        categories = parameter_master.objects.filter(
-            parameter_name='Product Categories',
-            isactive=1
-        ).order_by('parameter_value')
-
-        category_list = []
-        for category in categories:
-            category.encrypted_id = enc(str(category.parameter_id))
-            # Count bouquets in this category
-            category.bouquet_count = Bouquet.objects.filter(
-                category_id=category.parameter_id, 
-                is_active=1
-            ).count()
-            category_list.append(category)
-        
-        # Add encrypted ID and primary image to each bouquet
-        bouquet_list = []
-        for bouquet in bouquets:
-            # Add encrypted ID
-            bouquet.encrypted_id = enc(str(bouquet.id))
-            
-            # Get primary image (first active image)
-            primary_image = bouquet.images.filter(is_active=1).first()
-            if primary_image:
-                bouquet.primary_image = primary_image.image_path
-            else:
-                bouquet.primary_image = None
-            
-            # Get all images for gallery
-            bouquet.all_images = bouquet.images.filter(is_active=1)
-            
-            # Get occasion names for display
-            bouquet.occasion_names = [occ.name for occ in bouquet.occasions.all()]
-            
-            # Get category name for display
-            bouquet.category_name = bouquet.category.parameter_value if bouquet.category else 'Uncategorized'
-            
-            # Add buy_now status
-            bouquet.buy_now = bouquet.buy_now
-            
-            bouquet_list.append(bouquet)
-        
-        # Add images to featured bouquets
-        featured_list = []
-        for bouquet in featured_bouquets:
-            bouquet.encrypted_id = enc(str(bouquet.id))
-            primary_image = bouquet.images.filter(is_active=1).first()
-            bouquet.primary_image = primary_image.image_path if primary_image else None
-            featured_list.append(bouquet)
-        
-        # Get admin user's WhatsApp number
-        admin_user = CustomUser.objects.filter(role_id=1, is_active=True).first()
-        admin_whatsapp = admin_user.phone if admin_user else '918805433102'
-
-        # Pagination
-        paginator = Paginator(bouquet_list, 12)
+        occasion_list = get_active_occasions()
+        if facets is not None:
+            for occasion in occasion_list:
+                occasion.bouquet_count = facets.occasion_counts.get(occasion.id, 0)
+        
+        # Get all categories from parameter_master for filter, with active bouquet counts
+        category_list = get_category_summary()
+        
+        # Live count of bouquets in each category for the current filters
+        if facets is not None:
+            for category in category_list:
+                category.bouquet_count = facets.category_counts.get(category.parameter_id, 0)
+        
+        # Pagination - only the requested page is fetched and enriched
         page_number = request.GET.get('page')
         page_obj = paginator.get_page(page_number)
         
+        # Add encrypted ID, images, occasions and category from the listing projection
+        page_obj.object_list = attach_review_stats(attach_listings(page_obj.object_list))
+        
         # Encrypt selected items for template
         selected_occasions_encrypted_list = [enc(str(id)) for id in selected_occasions]
         selected_categories_encrypted_list = [enc(str(id)) for id in selected_categories]
@@ -296,10 +227,10 @@ def shop_view(request):
             'min_price': min_price,
             'max_price': max_price,
             'sort_by': sort_by,
+            'search_query': search_query,
             "MEDIA_URL": settings.MEDIA_URL,
             'min_price_value': min_price_value,
             'max_price_value': max_price_value,
-            'admin_whatsapp': admin_whatsapp,
             'total_active_filters': total_active_filters,
         }
         
@@ -403,11 +334,12 @@ def filter_products_ajax(request):
         # ========== Get other parameters ==========
         min_price = request.GET.get('min_price', '').strip()
         max_price = request.GET.get('max_price', '').strip()
-        sort_by = request.GET.get('sort', 'popular')
+        search_query = request.GET.get('q', '').strip()
+        sort_by = request.GET.get('sort', 'relevance' if search_query else 'popular')
         page = request.GET.get('page', 1)
         
         logger.info(f"Price range: min={min_price}, max={max_price}")
-        logger.info(f"Sort: {sort_by}, Page: {page}")
+        logger.info(f"Search: {search_query}, Sort: {sort_by}, Page: {page}")
         
         # ========== Decrypt occasion IDs ==========
         selected_occasions = []
@@ -429,109 +361,39 @@ def filter_products_ajax(request):
         
         logger.info(f"Decrypted - Occasions: {selected_occasions}, Categories: {selected_categories}")
         
-        # ========== Base queryset ==========
-        bouquets = Bouquet.objects.filter(is_active=1).select_related('category').prefetch_related('occasions', 'images')
-        
-        # First you apply occasion filter
-        if selected_occasions:
-            bouquets = bouquets.filter(occasions__id__in=selected_occasions).distinct()
-            logger.info(f"After occasion filter: {bouquets.count()} bouquets")
-
-        # THEN you apply category filter
-        if selected_categories:
-            bouquets = bouquets.filter(category_id__in=selected_categories).distinct()
-            logger.info(f"After category filter: {bouquets.count()} bouquets")
-        
-        # Filter by price range
-        if min_price and max_price:
-            try:
-                min_price_dec = Decimal(min_price)
-                max_price_dec = Decimal(max_price)
-                bouquets = bouquets.filter(
-                    Q(price__gte=min_price_dec) | Q(discount_price__gte=min_price_dec),
-                    Q(price__lte=max_price_dec) | Q(discount_price__lte=max_price_dec)
-                ).distinct()
-                logger.info(f"After price filter (both): {bouquets.count()} bouquets")
-            except (InvalidOperation, ValueError) as e:
-                logger.warning(f"Invalid price values: {e}")
-        elif min_price:
-            try:
-                min_price_dec = Decimal(min_price)
-                bouquets = bouquets.filter(
-                    Q(price__gte=min_price_dec) | Q(discount_price__gte=min_price_dec)
-                ).distinct()
-                logger.info(f"After min price filter: {bouquets.count()} bouquets")
-            except (InvalidOperation, ValueError) as e:
-                logger.warning(f"Invalid min price: {e}")
-        elif max_price:
-            try:
-                max_price_dec = Decimal(max_price)
-                bouquets = bouquets.filter(
-                    Q(price__lte=max_price_dec) | Q(discount_price__lte=max_price_dec)
-                ).distinct()
-                logger.info(f"After max price filter: {bouquets.count()} bouquets")
-            except (InvalidOperation, ValueError) as e:
-                logger.warning(f"Invalid max price: {e}")
-        
-        # Sorting
-        if sort_by == 'price_low':
-            bouquets = bouquets.order_by('price')
-        elif sort_by == 'price_high':
-            bouquets = bouquets.order_by('-price')
-        elif sort_by == 'newest':
-            bouquets = bouquets.order_by('-created_at')
-        elif sort_by == 'popular':
-            bouquets = bouquets.order_by('-is_featured', '-created_at')
-        else:
-            bouquets = bouquets.order_by('-is_featured', '-created_at')
-        
-        # ========== Build bouquet list ==========
-        bouquet_list = []
-        for bouquet in bouquets:
-            bouquet.encrypted_id = enc(str(bouquet.id))
-            
-            # Get primary image
-            primary_image = bouquet.images.filter(is_active=1).first()
-            if primary_image:
-                bouquet.primary_image = primary_image.image_path
-            else:
-                bouquet.primary_image = None
-            
-            # Get all images for gallery
-            bouquet.all_images = bouquet.images.filter(is_active=1)
-            
-            # Get occasion names for display
-            bouquet.occasion_names = [occ.name for occ in bouquet.occasions.all()]
-            
-            # Get category name
-            bouquet.category_name = bouquet.category.parameter_value if bouquet.category else 'Uncategorized'
-            
-            bouquet_list.append(bouquet)
+        # ========== Filtered, sorted matches ==========
+        paginator, facets = build_shop_paginator(
+            selected_occasions, selected_categories, min_price, max_price, sort_by, search_query
+        )
         
         # ========== Pagination ==========
-        paginator = Paginator(bouquet_list, 12)
+        # Only the requested page is fetched and enriched
         page_obj = paginator.get_page(page)
+        page_obj.object_list = attach_review_stats(attach_listings(page_obj.object_list))
         
         # ========== Get admin WhatsApp ==========
-        admin_user = CustomUser.objects.filter(role_id=1, is_active=True).first()
-        admin_whatsapp = admin_user.phone if admin_user else '918805433102'
+        admin_whatsapp = get_site_setting('admin_whatsapp')
         
         # ========== Get occasions and categories for display ==========
-        occasions = Occasion.objects.filter(is_active=1).order_by('name')
-        for occasion in occasions:
-            occasion.encrypted_id = enc(str(occasion.id))
+        occasions = get_active_occasions()
             
-        categories = parameter_master.objects.filter(
-            parameter_name='Product Categories',
-            isactive=1
-        ).order_by('parameter_value')
-        for category in categories:
-            category.encrypted_id = enc(str(category.parameter_id))
-        
-        price_range = Bouquet.objects.filter(is_active=1).aggregate(
-            min_price=Min('price'),
-            max_price=Max('price')
-        )
+        categories = get_category_summary()
+        
+        price_range = get_shop_price_range(facets)
+        
+        # ========== Live facet counts for the filter sidebar ==========
+        facet_counts = None
+        if facets is not None:
+            facet_counts = {
+                'occasions': {
+                    occasion.encrypted_id: facets.occasion_counts.get(occasion.id, 0)
+                    for occasion in occasions
+                },
+                'categories': {
+                    category.encrypted_id: facets.category_counts.get(category.parameter_id, 0)
+                    for category in categories
+                },
+            }
         
         # ========== Render HTML ==========
         products_html = render_to_string('store/includes/products_grid.html', {
@@ -564,9 +426,7 @@ def filter_products_ajax(request):
         if min_price or max_price:
             total_filters += 1
         
-        # After filtering
-        logger.info(f"FINAL bouquets count: {bouquets.count()}")
-        print(f"FINAL bouquets count: {bouquets.count()}")  # Force print to console
+        logger.info(f"FINAL bouquets count: {page_obj.paginator.count}")
 
         return JsonResponse({
             'success': True,
@@ -577,6 +437,7 @@ def filter_products_ajax(request):
             'showing_start': page_obj.start_index(),
             'showing_end': page_obj.end_index(),
             'active_filter_count': total_filters,
+            'facet_counts': facet_counts,
         })
         
     except Exception as e:
@@ -586,6 +447,125 @@ def filter_products_ajax(request):
             'message': 'An error occurred while filtering products.'
         }, status=500)
 
+def search_suggest(request):
+    """
+    Autocomplete for the shop search box: occasions and products with a word
+    starting with ?q=, answered from the in-memory index (no database query)
+    """
+    suggestions = autocomplete_index.suggest(request.GET.get('q', ''))
+    return JsonResponse({'success': True, 'suggestions': suggestions})
+
+# ------------------- SHOP QUERY HELPERS -------------------
+
+SHOP_PAGE_SIZE = 12
+
+# Bouquets without a price go last in both price sorts ('-effective_price'
+# already puts NULLs last on MySQL; ascending needs it spelled out)
+SHOP_SORT_ORDERS = {
+    'price_low': (F('effective_price').asc(nulls_last=True), 'id'),
+    'price_high': ('-effective_price', '-id'),
+    'newest': ('-created_at', '-id'),
+    # Bouquet.popularity_score, maintained by store.popularity
+    'popular': ('-popularity_score', '-id'),
+}
+
+def _parse_price(value):
+    """Return a Decimal for a price filter value, or None if empty/invalid"""
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        logger.warning(f"Invalid price value: {value}")
+        return None
+
+def filter_shop_bouquets(selected_occasions, selected_categories, min_price, max_price, sort_by, ranked=None):
+    """
+    Build the shop queryset for the given filters and sort order, limited to
+    ranked (full-text matches, best first) when given.
+    Nothing is evaluated here, so callers can paginate in the database.
+    """
+    bouquets = Bouquet.objects.filter(is_active=1)
+    
+    if ranked is not None:
+        bouquets = bouquets.filter(id__in=ranked)
+    
+    # Occasion filter as a subquery instead of a join, so no DISTINCT is needed
+    if selected_occasions:
+        bouquets = bouquets.filter(
+            id__in=BouquetOccasion.objects.filter(
+                occasion_id__in=selected_occasions
+            ).values('bouquet_id')
+        )
+    
+    if selected_categories:
+        bouquets = bouquets.filter(category_id__in=selected_categories)
+    
+    min_price_dec = _parse_price(min_price)
+    max_price_dec = _parse_price(max_price)
+    if min_price_dec is not None:
+        bouquets = bouquets.filter(effective_price__gte=min_price_dec)
+    if max_price_dec is not None:
+        bouquets = bouquets.filter(effective_price__lte=max_price_dec)
+    
+    if ranked is not None and sort_by == 'relevance':
+        if not ranked:
+            return bouquets.order_by('-id')
+        rank = Case(*[When(id=bouquet_id, then=position) for position, bouquet_id in enumerate(ranked)])
+        return bouquets.order_by(rank, '-id')
+    
+    # Trailing id keeps the order stable across pages
+    return bouquets.order_by(*SHOP_SORT_ORDERS.get(sort_by, SHOP_SORT_ORDERS['popular']))
+
+def build_shop_paginator(selected_occasions, selected_categories, min_price, max_price, sort_by, query=''):
+    """
+    Paginator over the shop matches plus the facet result they came from.
+    Served from the in-memory facet index; falls back to the database
+    queryset (facets is None) if the index cannot be used.
+    With a search query only full-text matches are listed, and the
+    'relevance' sort keeps their ranking.
+    """
+    ranked = ranked_bouquet_ids(query) if query else None
+    try:
+        facets = facet_index.search(
+            selected_occasions, selected_categories,
+            _parse_price(min_price), _parse_price(max_price), sort_by, ranked
+        )
+        return Paginator(facets, SHOP_PAGE_SIZE), facets
+    except Exception as e:
+        logger.exception(f"Facet index unavailable, filtering in the database: {str(e)}")
+
+    bouquets = filter_shop_bouquets(
+        selected_occasions, selected_categories, min_price, max_price, sort_by, ranked
+    )
+    paginator = CachedCountPaginator(
+        bouquets, SHOP_PAGE_SIZE,
+        count_cache_key=shop_count_cache_key(selected_occasions, selected_categories, min_price, max_price, query)
+    )
+    return paginator, None
+
+def get_shop_price_range(facets=None):
+    """Min/max effective price of the active catalog for the price slider"""
+    if facets is not None:
+        return facets.index.price_range()
+    return cached((BOUQUET,), 'shop:price_range', lambda: Bouquet.objects.filter(is_active=1).aggregate(
+        min_price=Min('effective_price'),
+        max_price=Max('effective_price')
+    ))
+
+def shop_count_cache_key(selected_occasions, selected_categories, min_price, max_price, query=''):
+    """Cache key for the total match count of a filter combination (sort does not matter)"""
+    signature = repr((
+        sorted(selected_occasions),
+        sorted(selected_categories),
+        str(_parse_price(min_price)),
+        str(_parse_price(max_price)),
+        ' '.join(search_terms(query)),
+    ))
+    return f"shop:count:{hashlib.md5(signature.encode()).hexdigest()}"
+
+REVIEWS_PAGE_SIZE = 5
+
 def product_detail(request):
     """
     Display single product details with reviews
@@ -626,92 +606,58 @@ def product_detail(request):
         # Decrypt the ID
         bouquet_id = dec(str(encrypted_id))
         
-        # Get bouquet with related data
-        bouquet = Bouquet.objects.filter(
-            id=bouquet_id, 
-            is_active=1
-        ).prefetch_related('occasions', 'images', 'reviews').first()
+        # Get bouquet, images and related products (cached catalog data)
+        product_page = get_product_page(bouquet_id)
         
-        if not bouquet:
+        if not product_page:
             messages.error(request, 'Product not found.')
             return redirect('shop')
         
-        # ========== TRACK RECENTLY VIEWED ==========
-        if request.user.is_authenticated:
-            try:
-                from masters.models import RecentlyViewed
-                
-                # Update or create recently viewed entry
-                RecentlyViewed.objects.update_or_create(
-                    user=request.user,
-                    bouquet=bouquet,
-                    defaults={'viewed_at': timezone.now()}
-                )
-                
-                # Keep only last 20 viewed items (optional cleanup)
-                user_views = RecentlyViewed.objects.filter(user=request.user).order_by('-viewed_at')
-                if user_views.count() > 20:
-                    ids_to_delete = user_views.values_list('id', flat=True)[20:]
-                    RecentlyViewed.objects.filter(id__in=list(ids_to_delete)).delete()
-                    
-            except ImportError:
-                # Model not available yet
-                pass
-            except Exception as e:
-                logger.warning(f"Failed to track recently viewed: {e}")
-        # ===========================================================
-        
-        # Get all images
-        images = bouquet.images.filter(is_active=1).order_by('id')
+        bouquet = product_page['bouquet']
         
-        # Get related products (same occasions)
-        occasion_ids = bouquet.occasions.values_list('id', flat=True)
-        related_bouquets = Bouquet.objects.filter(
-            is_active=1,
-            occasions__id__in=occasion_ids
-        ).exclude(id=bouquet.id).distinct()[:4]
+        # Buffered in the cache and flushed in batches, see masters.recently_viewed
+        if request.user.is_authenticated:
+            record_view(request.user.id, bouquet.id)
         
-        # Add encrypted IDs and images to related products
-        for related in related_bouquets:
-            related.encrypted_id = enc(str(related.id))
-            primary_image = related.images.filter(is_active=1).first()
-            related.primary_image = primary_image.image_path if primary_image else None
+        images = product_page['images']
+        related_bouquets = product_page['related_bouquets']
+        bought_together = product_page['bought_together']
         
-        # Get admin user's WhatsApp number
-        admin_user = CustomUser.objects.filter(role_id=1, is_active=True).first()
-        admin_whatsapp = admin_user.phone if admin_user else '918805433102'
+        # Active reviews, one keyset page at a time (newest first)
+        active_reviews = Review.objects.filter(bouquet_id=bouquet.id, is_active=1).select_related('user')
+        page_obj = KeysetPage(
+            active_reviews, REVIEWS_PAGE_SIZE,
+            after=request.GET.get('after'), before=request.GET.get('before')
+        )
         
-        # Get all active reviews for this bouquet
-        all_reviews = bouquet.reviews.filter(is_active=1).select_related('user')
+        is_admin = request.user.is_authenticated and request.user.role_id == 1
+        if is_admin:
+            for review in page_obj:
+                review.encrypted_id = enc(str(review.id))
         
         # Check if current user has already reviewed
         user_review = None
         if request.user.is_authenticated:
-            user_review = all_reviews.filter(user=request.user).first()
+            user_review = active_reviews.filter(user=request.user).first()
         
-        # Get ALL reviews (including user's review) for pagination
-        combined_reviews = list(all_reviews.order_by('-created_at'))
-        
-        # Paginate all reviews
-        paginator = Paginator(combined_reviews, 5)
-        page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
-        
-        # Calculate average rating
-        avg_rating = all_reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-        total_reviews = all_reviews.count()
+        # Rating count, average and star histogram from the bouquet's stats row
+        review_stat = BouquetReviewStat.objects.filter(bouquet_id=bouquet.id).first()
+        avg_rating = review_stat.avg_rating if review_stat else 0
+        total_reviews = review_stat.review_count if review_stat else 0
         
         context = {
             'bouquet': bouquet,
             'images': images,
             'related_bouquets': related_bouquets,
+            'bought_together': bought_together,
             'encrypted_id': encrypted_id,
             'reviews': page_obj,
             'page_obj': page_obj,
             'avg_rating': round(avg_rating, 1),
             'total_reviews': total_reviews,
+            'rating_histogram': review_stat.histogram if review_stat else [],
+            'can_hide_reviews': is_admin,
             'user_review': user_review,
-            'admin_whatsapp': admin_whatsapp,
             "MEDIA_URL": settings.MEDIA_URL,
         }
         return render(request, 'store/product_detail.html', context)
@@ -767,12 +713,14 @@ def add_review(request):
             return redirect(f"{reverse('product_detail')}?id={bouquet_id}")
         
         # Create review
-        Review.objects.create(
-            bouquet=bouquet,
-            user=request.user,
-            rating=rating,
-            comment=comment
-        )
+        with transaction.atomic():
+            review = Review.objects.create(
+                bouquet=bouquet,
+                user=request.user,
+                rating=rating,
+                comment=comment
+            )
+            record_review_added(review)
         
         messages.success(request, 'Thank you for your review!')
         return redirect(f"{reverse('product_detail')}?id={bouquet_id}")
@@ -782,6 +730,33 @@ def add_review(request):
         messages.error(request, 'Something went wrong. Please try again.')
         return redirect(request.META.get('HTTP_REFERER', 'shop'))
 
+@login_required
+@require_POST
+def hide_review(request):
+    """Admin: deactivate a review (it leaves the product page and its rating stats)"""
+    try:
+        bouquet_id = request.POST.get('bouquet_id', '')
+        if request.user.role_id != 1:
+            messages.error(request, 'You do not have permission to perform this action.')
+            return redirect('shop')
+        
+        try:
+            review_id = int(dec(request.POST.get('review_id', '')))
+        except Exception:
+            messages.error(request, 'Invalid review')
+            return redirect(f"{reverse('product_detail')}?id={bouquet_id}")
+        
+        if set_review_active(review_id, False) is None:
+            messages.error(request, 'Review not found')
+        else:
+            messages.success(request, 'Review hidden')
+        return redirect(f"{reverse('product_detail')}?id={bouquet_id}#reviewsList")
+        
+    except Exception as e:
+        logger.exception(f"Error in hide_review: {str(e)}")
+        messages.error(request, 'Something went wrong. Please try again.')
+        return redirect(request.META.get('HTTP_REFERER', 'shop'))
+
 # ------------------- HELPER FUNCTIONS -------------------
 
 def get_or_create_cart(request):
@@ -846,7 +821,8 @@ def get_remaining_slots(cart):
 
 def get_cart_items_details(cart):
     """Get cart items with bouquet details for display"""
-    items = CartItem.objects.filter(cart=cart)
+    items = list(CartItem.objects.filter(cart=cart))
+    image_widths = variant_widths_for(item.bouquet_image for item in items)
     cart_items = []
     
     for item in items:
@@ -856,6 +832,7 @@ def get_cart_items_details(cart):
             'name': item.bouquet_name,
             'price': item.price_at_add,
             'image': item.bouquet_image,
+            'image_widths': image_widths.get(item.bouquet_image, []),
             'slug': item.bouquet_slug,
             'item': item
         })
@@ -1170,10 +1147,6 @@ def cart_view(request):
     if not request.user.is_authenticated:
         request.session['checkout_after_login'] = True
     
-    # Get admin WhatsApp number
-    admin_user = CustomUser.objects.filter(role_id=1, is_active=True).first()
-    admin_whatsapp = admin_user.phone if admin_user else '918805433102'
-    
     context = {
         'cart_items': cart_items,
         'item_count': len(cart_items),
@@ -1189,7 +1162,6 @@ def cart_view(request):
         'remaining_for_free_shipping': float(remaining_for_free_shipping),
         'needs_shipping': shipping > 0,
         'is_authenticated': request.user.is_authenticated,
-        'admin_whatsapp': admin_whatsapp,  # Add this
         'MEDIA_URL': settings.MEDIA_URL,
     }
     
@@ -1498,6 +1470,7 @@ def place_order(request):
                 status='pending',
                 payment_status='pending'
             )
+            record_order_placed(order)
             
             # Create order items
             for item_data in order_items_data:
@@ -1547,16 +1520,15 @@ def place_order(request):
             
             if user_updated:
                 user.save()
-        
-        # After creating the order successfully
-        encrypted_order_id = enc(str(order.id))
-
-        # Send confirmation email
-        try:
-            send_order_confirmation_email(order, order_items_data, encrypted_order_id)
-        except Exception as email_error:
-            logger.warning(f"Failed to send confirmation email: {email_error}")
-            # Don't fail the order if email fails
+            
+            encrypted_order_id = enc(str(order.id))
+            
+            # Queue the confirmation email with the order so it is only sent if the order commits
+            try:
+                send_order_confirmation_email(order, order_items_data, encrypted_order_id)
+            except Exception as email_error:
+                logger.warning(f"Failed to queue confirmation email: {email_error}")
+                # Don't fail the order if email fails
 
         messages.success(request, f'Order placed successfully! Order #{order.order_number}')
         return redirect('order_confirmation', order_id=encrypted_order_id)